@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class AnswerCache:
+    """Bounded LRU cache with a per-entry TTL, cleared when the data changes.
+
+    version_source is a callable returning the current data version (for
+    example football_db.get_data_version); it is polled at most every
+    version_check_interval seconds, and a new value empties the cache.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0,
+                 version_source: Optional[Callable[[], Any]] = None,
+                 version_check_interval: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_source = version_source
+        self.version_check_interval = version_check_interval
+        self.version = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._last_version_check = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_version(self) -> bool:
+        """Poll the data version; returns True (after emptying the cache)
+        if it changed since the last poll"""
+        if self.version_source is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if (self._last_version_check is not None
+                    and now - self._last_version_check < self.version_check_interval):
+                return False
+            first_check = self._last_version_check is None
+            self._last_version_check = now
+        version = self.version_source()
+        with self._lock:
+            if first_check:
+                self.version = version
+                return False
+            if version == self.version:
+                return False
+            self.version = version
+            self._entries.clear()
+            self.invalidations += 1
+            return True
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (True, value) on a hit, (False, None) on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version': self.version,
+            }
@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import football_db
+from football_db import DB_CONFIG, close_database, get_database
+from metrics import percentile
+
+IMPORT_MODES = ['bulk', 'stream', 'parallel', 'incremental']
+BACKENDS = ['postgres', 'sqlite']
+# Metrics checked by --compare; p99 and max are too noisy on short runs
+LOWER_IS_BETTER = ('mean_ms', 'p50_ms', 'p95_ms')
+HIGHER_IS_BETTER = ('rows_per_s',)
+# Latency changes smaller than this are ignored as timer noise
+MIN_CHANGE_MS = 0.05
+
+QUESTION_TEMPLATES = [
+    "Show stats for {team} in {season}",
+    "Compare {team} and {other}",
+    "Show form for {team} in {season}",
+    "How many goals did {team} score in {season}?",
+    "Which team scored the most goals in {season}?",
+]
+
+# Run in a fresh interpreter: imports, connection, team index and the first answer
+COLD_START = """
+import time
+start = time.perf_counter()
+from football_chatbot import FootballChatbot
+FootballChatbot().process_query({question!r})
+print(time.perf_counter() - start)
+"""
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    return {
+        'count': len(latencies),
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(1000 * percentile(latencies, 0.50), 3),
+        'p95_ms': round(1000 * percentile(latencies, 0.95), 3),
+        'p99_ms': round(1000 * percentile(latencies, 0.99), 3),
+        'max_ms': round(1000 * max(latencies), 3) if latencies else 0.0,
+    }
+
+def measure(function: Callable[[], Any], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    for _ in range(warmup):
+        function()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def count_rows(path: str) -> int:
+    with open(path, 'r', encoding='utf-8') as file:
+        return sum(len(season['teams']) for season in json.load(file))
+
+def benchmark_import(path: str, modes: List[str], workers: Optional[int]) -> Dict[str, Any]:
+    import import_data
+    rows = count_rows(path)
+    results = {}
+    for mode in modes:
+        if mode == 'parallel' and football_db.using_sqlite():
+            print("\nSkipping the parallel import: SQLite has a single writer")
+            continue
+        print(f"\n== Import ({mode}, {football_db.BACKEND}) ==")
+        import_data.create_database()
+        import_data.apply_schema()
+        start = time.perf_counter()
+        if mode == 'bulk':
+            import_data.import_data_bulk(path)
+        elif mode == 'stream':
+            import_data.import_data_streaming(path)
+        elif mode == 'parallel':
+            import_data.import_data_parallel(path, workers)
+        else:
+            import_data.import_data_incremental(path)
+        elapsed = time.perf_counter() - start
+        # The importers report errors instead of raising; check what arrived
+        with football_db.connect() as conn, conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM team_statistics")
+            loaded = cur.fetchone()[0]
+        conn.close()
+        results[mode] = {
+            'rows': rows, 'loaded_rows': loaded, 'seconds': round(elapsed, 3),
+            'rows_per_s': round(rows / elapsed, 1) if elapsed else 0.0,
+        }
+    return results
+
+def use_backend(backend: str, sqlite_path: str):
+    """Point this process (and the processes it starts) at backend"""
+    close_database()
+    football_db.BACKEND = os.environ['FOOTBALL_DB_BACKEND'] = backend
+    football_db.SQLITE_PATH = os.environ['FOOTBALL_SQLITE_PATH'] = sqlite_path
+    import import_data
+    import_data.SQLITE_PATH = sqlite_path
+
+def benchmark_cold_start(runs: int) -> Dict[str, Any]:
+    print(f"\n== Cold start ({football_db.BACKEND}) ==")
+    team = get_database().fetchone("SELECT t.name FROM teams t JOIN team_statistics ts ON ts.team_id = t.id LIMIT 1")[0]
+    code = COLD_START.format(question=f"Show stats for {team}")
+    first_answer, process = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        process.append(time.perf_counter() - start)
+        first_answer.append(float(output.strip().splitlines()[-1]))
+    results = {'first_answer': summarize(first_answer), 'process': summarize(process)}
+    print(f"first answer p50 {results['first_answer']['p50_ms']:8.1f} ms  "
+          f"whole process p50 {results['process']['p50_ms']:8.1f} ms")
+    return results
+
+def benchmark_chatbot(iterations: int, seed: int) -> Dict[str, Any]:
+    from football_chatbot import FootballChatbot
+    from stats_engine import StatsEngine
+
+    db = get_database()
+    teams = [row[0] for row in db.fetchall("SELECT DISTINCT t.name FROM teams t JOIN team_statistics ts ON ts.team_id = t.id")]
+    seasons = [row[0] for row in db.fetchall("SELECT DISTINCT s.year FROM seasons s JOIN team_statistics ts ON ts.season_id = s.id")]
+    rng = random.Random(seed)
+
+    def pick():
+        team, other = rng.sample(teams, 2)
+        return team, other, rng.choice(seasons)
+
+    def question():
+        team, other, season = pick()
+        return rng.choice(QUESTION_TEMPLATES).format(team=team, other=other, season=season)
+
+    backends = {
+        'database': lambda: FootballChatbot(cache=False),
+        'engine': lambda: FootballChatbot(engine=StatsEngine.from_database(), cache=False),
+    }
+    results = {}
+    for backend, create in backends.items():
+        print(f"\n== Chatbot ({backend}) ==")
+        chatbot = create()
+        methods = {
+            'get_team_basic_stats': lambda: chatbot.get_team_basic_stats(pick()[0], pick()[2]),
+            'get_team_comparison': lambda: chatbot.get_team_comparison(*pick()),
+            'get_team_form': lambda: chatbot.get_team_form(pick()[0], pick()[2]),
+            'get_team_stat': lambda: chatbot.get_team_stat(pick()[0], 'goalsScored', pick()[2]),
+            'get_stat_leaders': lambda: chatbot.get_stat_leaders('goalsScored', pick()[2]),
+            'process_query': lambda: chatbot.process_query(question()),
+        }
+        results[backend] = {name: measure(method, iterations) for name, method in methods.items()}
+        for name, summary in results[backend].items():
+            print(f"{name:22} p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms  "
+                  f"p99 {summary['p99_ms']:8.3f} ms")
+
+    # Repeated questions with the answer cache on
+    chatbot = FootballChatbot()
+    questions = [question() for _ in range(20)]
+    results['database_cached'] = {
+        'process_query': measure(lambda: chatbot.process_query(rng.choice(questions)), iterations)
+    }
+    return results
+
+def benchmark_llm(iterations: int, latency: float) -> Dict[str, Any]:
+    from llm_football_assistant import FootballAssistant
+    from openai_stub import start_stub_server
+    from result_renderer import encode_result, render_answer
+
+    print(f"\n== LLM pipeline (stub, {latency:g}s per call) ==")
+    team = get_database().fetchone("SELECT t.name FROM teams t JOIN team_statistics ts ON ts.team_id = t.id LIMIT 1")[0]
+    server, base_url = start_stub_server(latency=latency)
+    server.sql = f"""SELECT t.name, s.year, ts.goalsScored, ts.goalsConceded, ts.avgRating
+FROM team_statistics ts
+JOIN teams t ON ts.team_id = t.id
+JOIN seasons s ON ts.season_id = s.id
+WHERE t.name = '{team.replace("'", "''")}'
+ORDER BY s.start_year DESC"""
+    question = f"How has {team} performed over the seasons?"
+
+    assistant = FootballAssistant('benchmark', sql_cache_path=None, base_url=base_url, router=False)
+    stages = {name: [] for name in ('sql_generation', 'query', 'template', 'response_generation', 'end_to_end')}
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            sql_query = assistant.generate_sql_query(question)
+            stages['sql_generation'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            result = assistant.db.run_guarded_query(sql_query)
+            stages['query'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            render_answer(question, result.columns, result.rows, result.error, 'template')
+            stages['template'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            encoded = encode_result(result.columns, result.rows, result.truncated, assistant.result_token_budget)
+            assistant.generate_natural_response(question, encoded, sql_query)
+            stages['response_generation'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            assistant.answer_question(question, 'llm')
+            stages['end_to_end'].append(time.perf_counter() - start)
+    finally:
+        assistant.close()
+
+    # Share of a mixed workload the router answers without the model
+    routed = FootballAssistant('benchmark', sql_cache_path=None, base_url=base_url)
+    try:
+        for i in range(iterations):
+            routed.answer_question(f"Show stats for {team}" if i % 2 else question)
+        router_stats = routed.router.stats()
+    finally:
+        routed.close()
+        server.shutdown()
+
+    results = {name: summarize(latencies) for name, latencies in stages.items()}
+    results['router'] = {'share': round(router_stats['rules']['share'], 3),
+                         'rules_p50_ms': round(router_stats['rules']['p50_ms'], 3),
+                         'llm_p50_ms': round(router_stats['llm']['p50_ms'], 3)}
+    results['model_requests'] = server.requests
+    for name, summary in results.items():
+        if isinstance(summary, dict) and 'p50_ms' in summary:
+            print(f"{name:22} p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms")
+    return results
+
+def print_backend_comparison(results: Dict[str, Any]):
+    backends = list(results)
+    print("\n== Backends (p50 ms) ==")
+    print(f"{'':34}" + ''.join(f"{backend:>12}" for backend in backends))
+    rows = [('cold start: first answer', ('cold_start', 'first_answer')),
+            ('cold start: whole process', ('cold_start', 'process'))]
+    rows += [(f"{method}", ('chatbot', 'database', method)) for method in results[backends[0]]['chatbot']['database']]
+    for label, keys in rows:
+        values = []
+        for backend in backends:
+            value = results[backend]
+            for key in keys:
+                value = value.get(key, {}) if isinstance(value, dict) else {}
+            values.append(f"{value['p50_ms']:12.3f}" if 'p50_ms' in value else f"{'-':>12}")
+        print(f"{label:34}" + ''.join(values))
+
+def flatten(results: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than baseline by more than tolerance (0.2 = 20%)"""
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    regressions = []
+    for name, value in new.items():
+        metric = name.rsplit('.', 1)[-1]
+        if name not in old or not old[name] or metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            continue
+        if metric in LOWER_IS_BETTER and value - old[name] < MIN_CHANGE_MS:
+            continue
+        change = (value - old[name]) / old[name]
+        if metric in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{name}: {old[name]} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark: import, chatbot and LLM pipeline")
+    parser.add_argument('--database', default='turkish_football_benchmark',
+                        help="Database to (re)create for the benchmark; it is dropped first")
+    parser.add_argument('--backends', default=football_db.BACKEND,
+                        help=f"Comma-separated backends to measure and compare ({', '.join(BACKENDS)})")
+    parser.add_argument('--sqlite-path', default='turkish_football_benchmark.sqlite3',
+                        help="Database file for the sqlite backend; it is replaced")
+    parser.add_argument('--data', help="JSON data file (default: generate one)")
+    parser.add_argument('--leagues', type=int, default=3, help="Generated leagues")
+    parser.add_argument('--seasons', type=int, default=10, help="Generated seasons per league")
+    parser.add_argument('--teams', type=int, default=20, help="Generated teams per league")
+    parser.add_argument('--import-modes', default='bulk,stream',
+                        help=f"Comma-separated import modes to time ({', '.join(IMPORT_MODES)})")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for the parallel import")
+    parser.add_argument('--iterations', type=int, default=200, help="Calls per chatbot method")
+    parser.add_argument('--llm-iterations', type=int, default=20, help="Questions through the LLM pipeline")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Stub model latency per call (seconds)")
+    parser.add_argument('--skip-import', action='store_true', help="Use the data already in --database")
+    parser.add_argument('--skip-llm', action='store_true')
+    parser.add_argument('--cold-starts', type=int, default=5, help="Fresh processes timed per backend")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help="Report regressions against earlier results")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+    # Imported here, like the generator itself in main()
+    from generate_data import MAX_SEASONS
+    if args.data is None and args.seasons > MAX_SEASONS:
+        parser.error(f"--seasons can be at most {MAX_SEASONS}: two-digit season years would wrap")
+    return args
+
+def main():
+    args = parse_args()
+    # Everything below (including import worker processes) uses the benchmark database
+    DB_CONFIG['dbname'] = args.database
+    os.environ['FOOTBALL_DB_NAME'] = args.database
+
+    modes = [mode.strip() for mode in args.import_modes.split(',') if mode.strip()]
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    unknown = (set(modes) - set(IMPORT_MODES)) | (set(backends) - set(BACKENDS))
+    if unknown:
+        print(f"Unknown import modes or backends: {', '.join(sorted(unknown))}")
+        sys.exit(2)
+
+    generated = None
+    path = args.data
+    if path is None and not args.skip_import:
+        from generate_data import generate, load_templates, write_data
+        generated = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        generated.close()
+        path = generated.name
+        rows = write_data(path, generate(load_templates('turkish_football_data.json'),
+                                         args.leagues, args.seasons, args.teams))
+        print(f"Generated {rows} team-season records in {path}")
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': {},
+    }
+    try:
+        for backend in backends:
+            use_backend(backend, args.sqlite_path)
+            results = report['results'][backend] = {}
+            if not args.skip_import:
+                results['import'] = benchmark_import(path, modes, args.workers)
+            if args.cold_starts:
+                results['cold_start'] = benchmark_cold_start(args.cold_starts)
+            results['chatbot'] = benchmark_chatbot(args.iterations, seed=1)
+            if not args.skip_llm:
+                results['llm'] = benchmark_llm(args.llm_iterations, args.llm_latency)
+        if len(backends) > 1:
+            print_backend_comparison(report['results'])
+    finally:
+        close_database()
+        if generated is not None:
+            os.unlink(generated.name)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, report, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import re
+from typing import Dict, List, Optional, Set
+
+# Question words mapped onto the vocabulary of the column names
+SYNONYMS = {
+    'score': 'goal', 'scored': 'goal', 'scoring': 'goal', 'scorer': 'goal',
+    'concede': 'conceded', 'conceding': 'conceded', 'allowed': 'conceded',
+    'passing': 'pass', 'passed': 'pass',
+    'header': 'headed', 'headers': 'headed', 'heading': 'headed',
+    'card': 'card', 'booking': 'card', 'bookings': 'card', 'booked': 'card',
+    'yellow': 'yellow', 'red': 'red',
+    'penalty': 'penalty', 'penalties': 'penalty', 'pen': 'penalty',
+    'tackling': 'tackle', 'dribbling': 'dribble', 'crossing': 'cross',
+    'keeper': 'save', 'goalkeeper': 'save', 'saved': 'save',
+    'clean': 'clean', 'sheet': 'sheet', 'shutout': 'clean', 'shutouts': 'clean',
+    'chance': 'chance', 'chances': 'chance',
+    'shooting': 'shot', 'shoot': 'shot', 'attempt': 'shot', 'attempts': 'shot',
+    'possession': 'possession', 'ball': 'ball',
+    'rating': 'rating', 'rated': 'rating', 'ratings': 'rating',
+    'game': 'match', 'games': 'match', 'played': 'match',
+    'offside': 'offside', 'fouled': 'foul', 'fouling': 'foul',
+    'duel': 'duel', 'aerial': 'aerial', 'air': 'aerial', 'ground': 'ground',
+    'accuracy': 'accurate', 'accurately': 'accurate', 'percentage': 'percentage', 'percent': 'percentage',
+    'counter': 'fast', 'counterattack': 'fast', 'break': 'break',
+    'recover': 'recovery', 'recoveries': 'recovery',
+    'mistake': 'error', 'mistakes': 'error', 'errors': 'error', 'woodwork': 'woodwork',
+    'post': 'woodwork', 'crossbar': 'woodwork', 'assist': 'assist', 'assists': 'assist',
+}
+
+# Question words that select a whole schema.sql group
+GROUP_KEYWORDS = {
+    'attack': 'Offensive', 'attacking': 'Offensive', 'offensive': 'Offensive', 'offence': 'Offensive',
+    'possession': 'Possession', 'passing': 'Possession', 'build': 'Possession',
+    'defence': 'Defensive', 'defense': 'Defensive', 'defensive': 'Defensive', 'defending': 'Defensive',
+    'duels': 'Duels', 'physical': 'Duels',
+    'discipline': 'Other', 'disciplinary': 'Other',
+}
+
+# Words too common to say anything about a column ("goalsFromInsideTheBox")
+STOPWORDS = {'the', 'from', 'of', 'in', 'to', 'a', 'an', 'by', 'for', 'and', 'team', 'teams', 'most'}
+
+# Always offered so that per-match rates and season filters are possible
+CORE_COLUMNS = ['matches']
+# Used when nothing in the question points at particular statistics
+DEFAULT_COLUMNS = ['matches', 'goalsScored', 'goalsConceded', 'assists', 'cleanSheets',
+                   'averageBallPossession', 'avgRating']
+
+COLUMN_PATTERN = re.compile(r'^\s+(\w+)\s+(?:INTEGER|DECIMAL)', re.IGNORECASE)
+GROUP_PATTERN = re.compile(r'^\s+--\s+(\w+)(?:\s+Statistics)?\s*$')
+
+def load_column_groups(path: str = 'schema.sql') -> Dict[str, List[str]]:
+    """Statistic columns of team_statistics by their schema.sql comment group"""
+    groups: Dict[str, List[str]] = {}
+    group = None
+    in_table = False
+    with open(path, 'r') as file:
+        for line in file:
+            if re.match(r'\s*CREATE TABLE (IF NOT EXISTS )?team_statistics\b', line, re.IGNORECASE):
+                in_table = True
+                continue
+            if not in_table:
+                continue
+            if line.startswith(')'):
+                break
+            match = GROUP_PATTERN.match(line)
+            if match:
+                group = match.group(1)
+                continue
+            match = COLUMN_PATTERN.match(line)
+            if match and group and match.group(1) != 'season_id':
+                groups.setdefault(group, []).append(match.group(1))
+    return groups
+
+def _stem(word: str) -> str:
+    word = word.lower()
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return word
+
+def column_tokens(column: str) -> Set[str]:
+    """'accurateLongBallsPercentage' -> {'accurate', 'long', 'ball', 'percentage'}"""
+    return {_stem(part) for part in re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])', column)}
+
+class ColumnIndex:
+    """Keyword index over the team_statistics columns, used to put only the
+    columns relevant to a question into an LLM prompt"""
+    def __init__(self, groups: Dict[str, List[str]], available: Optional[List[str]] = None):
+        # available: column names reported by the database (case-insensitive)
+        if available is not None:
+            lowered = {column.lower() for column in available}
+            groups = {group: [column for column in columns if column.lower() in lowered]
+                      for group, columns in groups.items()}
+        self.groups = groups
+        self.columns = [column for columns in groups.values() for column in columns]
+        self.group_of = {column: group for group, columns in groups.items() for column in columns}
+        self.tokens = {column: column_tokens(column) for column in self.columns}
+        self.postings: Dict[str, List[str]] = {}
+        for column, tokens in self.tokens.items():
+            for token in tokens:
+                self.postings.setdefault(token, []).append(column)
+
+    @classmethod
+    def from_schema(cls, path: str = 'schema.sql', available: Optional[List[str]] = None) -> 'ColumnIndex':
+        return cls(load_column_groups(path), available)
+
+    def select(self, question: str, limit: int = 12) -> List[str]:
+        """The columns most relevant to question, in schema order"""
+        words = re.findall(r'[a-z]+', question.lower())
+        words = [word for word in words if word not in STOPWORDS]
+        terms = {_stem(word) for word in words} | {_stem(SYNONYMS[word]) for word in words if word in SYNONYMS}
+        mentions_against = bool(terms & {'against', 'opponent', 'opposition', 'conceded'})
+        wanted_groups = {GROUP_KEYWORDS[word] for word in words if word in GROUP_KEYWORDS}
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            if term in STOPWORDS:
+                continue
+            for column in self.postings.get(term, []):
+                scores[column] = scores.get(column, 0) + 1
+        for column in list(scores):
+            # Prefer columns matching more of the question, shorter (more
+            # general) names, and the "Against" group only when asked for
+            scores[column] -= 0.1 * (len(self.tokens[column]) - 1)
+            if self.group_of[column] == 'Against' and not mentions_against:
+                scores[column] -= 1
+        for group in wanted_groups:
+            for column in self.groups.get(group, []):
+                scores[column] = scores.get(column, 0) + 0.5
+
+        # Drop weak matches (a lone "against") when better ones exist
+        best = max(scores.values(), default=0)
+        ranked = sorted((column for column, score in scores.items() if score > 0 and score >= best / 2),
+                        key=lambda column: -scores[column])
+        chosen = set(ranked[:limit])
+        if not chosen:
+            chosen = {column for column in DEFAULT_COLUMNS if column in self.group_of}
+        chosen.update(column for column in CORE_COLUMNS if column in self.group_of)
+        return [column for column in self.columns if column in chosen]
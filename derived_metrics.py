@@ -0,0 +1,98 @@
+from typing import List, Optional, Sequence
+
+# Rates derived from team_statistics: name -> (numerator, denominator, scale)
+RATES = {
+    'goals_per_match': ('goalsScored', 'matches', 1),
+    'conceded_per_match': ('goalsConceded', 'matches', 1),
+    'shots_per_match': ('shots', 'matches', 1),
+    'shot_conversion': ('goalsScored', 'shots', 100),
+    'big_chance_conversion': ('goalsScored', 'bigChances', 100),
+    'shots_on_target_percentage': ('shotsOnTarget', 'shots', 100),
+    'clean_sheet_percentage': ('cleanSheets', 'matches', 100),
+}
+# Columns of team_season_metrics besides season_id and team_id
+SEASON_METRICS = ['goal_difference', *RATES, 'league_position']
+
+# Metrics ranked in team_statistic_ranks next to the statistic columns
+RANKED_METRICS = SEASON_METRICS[:-1]
+
+# team_statistics columns that are not statistics
+KEY_COLUMNS = ('id', 'season_id', 'team_id', 'start_year', 'stats_hash')
+
+def _rate(numerator: str, denominator: str, scale: int) -> str:
+    rate = f"ts.{numerator}::float / NULLIF(ts.{denominator}, 0)"
+    return rate if scale == 1 else f"{scale} * {rate}"
+
+# Teams without goal figures are placed last, as NULLS LAST would
+SEASON_METRICS_QUERY = f"""
+INSERT INTO team_season_metrics (season_id, team_id, {', '.join(SEASON_METRICS)})
+SELECT
+    ts.season_id,
+    ts.team_id,
+    ts.goalsScored - ts.goalsConceded,
+    {', '.join(_rate(*rate) for rate in RATES.values())},
+    RANK() OVER (
+        PARTITION BY ts.season_id
+        ORDER BY (ts.goalsScored - ts.goalsConceded) IS NULL,
+                 ts.goalsScored - ts.goalsConceded DESC, ts.goalsScored DESC
+    )
+FROM team_statistics ts
+WHERE {{seasons}}
+"""
+
+def rank_source_query(statistics: Sequence[str], seasons: str = "TRUE") -> str:
+    """Values ranked in team_statistic_ranks, as (season_id, team_id, *values)"""
+    columns = [f"ts.{column}" for column in statistics] + [f"m.{column}" for column in RANKED_METRICS]
+    return f"""
+SELECT ts.season_id, ts.team_id, {', '.join(columns)}
+FROM team_statistics ts
+JOIN team_season_metrics m ON m.season_id = ts.season_id AND m.team_id = ts.team_id
+WHERE {seasons}
+"""
+
+def rank_rows(rows) -> List[tuple]:
+    """(season_id, team_id, *values) rows -> (season_id, team_id, *ranks):
+    each value's rank among the season's teams, 1 for the highest, equal
+    values sharing a rank (as RANK() does) and NULL staying NULL"""
+    seasons = {}
+    for row in rows:
+        seasons.setdefault(row[0], []).append(row)
+    ranked = []
+    for season_rows in seasons.values():
+        ranks = [[None] * (len(row) - 2) for row in season_rows]
+        for column in range(len(ranks[0])):
+            values = sorted(((row[column + 2], i) for i, row in enumerate(season_rows)
+                             if row[column + 2] is not None), reverse=True)
+            previous, rank = None, 0
+            for position, (value, i) in enumerate(values, 1):
+                if value != previous:
+                    previous, rank = value, position
+                ranks[i][column] = rank
+        ranked.extend((row[0], row[1], *row_ranks) for row, row_ranks in zip(season_rows, ranks))
+    return ranked
+
+def statistic_columns(cur) -> List[str]:
+    """Lowercase statistic columns of team_statistics"""
+    from football_db import table_columns
+    return [column for column in table_columns(cur, 'team_statistics') if column not in KEY_COLUMNS]
+
+def ensure_ranks_table(cur, statistics: Sequence[str]) -> bool:
+    """(Re)create team_statistic_ranks unless it already has a column for
+    every statistic; True when it was created and so holds no rows"""
+    from football_db import table_columns
+    expected = ['season_id', 'team_id', *statistics, *RANKED_METRICS]
+    if table_columns(cur, 'team_statistic_ranks') == expected:
+        return False
+    cur.execute("DROP TABLE IF EXISTS team_statistic_ranks")
+    cur.execute(
+        f"""
+        CREATE TABLE team_statistic_ranks (
+            season_id INTEGER REFERENCES seasons(id),
+            team_id VARCHAR(20) REFERENCES teams(id),
+            {', '.join(f'{column} INTEGER' for column in expected[2:])},
+            PRIMARY KEY (season_id, team_id)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX idx_team_statistic_ranks_team ON team_statistic_ranks(team_id)")
+    return True
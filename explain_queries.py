@@ -0,0 +1,120 @@
+import argparse
+import re
+from typing import Any, Dict, List, Sequence
+from football_chatbot import (BASIC_STATS_COLUMNS, LEADERS_QUERY, STATEMENTS, batch_query, column_ref,
+                              metrics_join)
+from football_db import connect, using_sqlite
+from migrate_schema import needs_migration
+from seasons import DEFAULT_LEAGUE_ID, season_start_year
+
+def legacy_query(query: str) -> str:
+    """A chatbot query as it was written before season start years: seasons
+    filtered and ordered by their year string"""
+    query = re.sub(r"\bt?s\.start_year\b", "s.year", query)
+    query = query.replace("MAX(start_year)", "MAX(year)")
+    # ... and without leagues
+    query = query.replace(" WHERE league_id = $3", "").replace(" AND s.league_id = $3", "")
+    return query.replace(",\n        s.year,\n", ",\n").replace("ORDER BY start_year DESC", "ORDER BY year DESC")
+
+def sample(cur) -> Dict[str, Any]:
+    # The team with the most seasons, another one, and the latest season
+    cur.execute("SELECT team_id FROM team_statistics GROUP BY team_id ORDER BY COUNT(*) DESC, team_id LIMIT 2")
+    teams = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT DISTINCT team_id FROM team_statistics ORDER BY team_id")
+    every_team = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT DISTINCT year FROM seasons")
+    year = max((row[0] for row in cur.fetchall()), key=season_start_year)
+    return {'team': teams[0], 'teams': teams, 'every_team': every_team, 'year': year}
+
+def cases(values: Dict[str, Any], legacy: bool) -> List[tuple]:
+    """(label, query, parameters) for the chatbot's statements"""
+    # The old layout compares year strings, the new one start years
+    season = values['year'] if legacy else season_start_year(values['year'])
+    leaders = LEADERS_QUERY.format(column=column_ref('goalsScored'), join=metrics_join(['goalsScored']),
+                                   direction='DESC')
+    batch = batch_query(BASIC_STATS_COLUMNS, 1, lateral=not legacy)
+    queries = [
+        ("latest season for team", STATEMENTS['chatbot_basic_stats'][0], [values['team']]),
+        ("given season for team", STATEMENTS['chatbot_basic_stats_season'][0], [values['team'], season]),
+        ("form, latest season", STATEMENTS['chatbot_form'][0], [values['team']]),
+        ("comparison, latest season", STATEMENTS['chatbot_comparison'][0], [values['teams']]),
+        ("leaders, latest season", leaders, [None, 5, DEFAULT_LEAGUE_ID]),
+        ("leaders, given season", leaders, [season, 5, DEFAULT_LEAGUE_ID]),
+        ("batch, latest for every team", batch.format(season=""), [values['every_team']]),
+    ]
+    if legacy:
+        queries = [(label, legacy_query(query), params) for label, query, params in queries]
+    return queries
+
+def plan_nodes(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get('Plans', []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+def with_placeholders(query: str, params: Sequence[Any]):
+    # $n -> %(pn)s, so psycopg2 sends the parameters as literals and the
+    # planner sees them, as it does for the custom plans of prepared statements
+    return re.sub(r"\$(\d+)", r"%(p\1)s", query), {f"p{i}": value for i, value in enumerate(params, 1)}
+
+def explain(cur, query: str, params: Sequence[Any], runs: int) -> Dict[str, Any]:
+    """Best of runs EXPLAIN (ANALYZE, BUFFERS) executions of a $n query"""
+    text, values = with_placeholders(query, params)
+    best = None
+    for _ in range(runs):
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {text}", values)
+        result = cur.fetchone()[0][0]
+        if best is None or result['Execution Time'] < best['Execution Time']:
+            best = result
+    nodes = plan_nodes(best['Plan'])
+    statistics_scans = [node for node in nodes if node.get('Relation Name', '').startswith('team_statistics')]
+    return {
+        'planning_ms': best['Planning Time'],
+        'execution_ms': best['Execution Time'],
+        'buffers': best['Plan'].get('Shared Hit Blocks', 0) + best['Plan'].get('Shared Read Blocks', 0),
+        'statistics_rows': sum(node.get('Actual Rows', 0) * node.get('Actual Loops', 1) for node in statistics_scans),
+        'scans': sorted({node['Node Type'] for node in statistics_scans}),
+    }
+
+def plan_text(cur, query: str, params: Sequence[Any]) -> str:
+    text, values = with_placeholders(query, params)
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {text}", values)
+    return '\n'.join(row[0] for row in cur.fetchall())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the chatbot's queries against the database "
+                                                 "(PostgreSQL), in either schema layout")
+    parser.add_argument('--runs', type=int, default=5, help="Executions per query; the fastest is reported")
+    parser.add_argument('--plans', action='store_true', help="Also print each query's plan")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if using_sqlite():
+        print("explain_queries.py needs PostgreSQL (EXPLAIN ANALYZE)")
+        return
+    conn = connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        legacy = needs_migration(cur)
+        values = sample(cur)
+        cur.execute("SELECT COUNT(*) FROM team_statistics")
+        rows = cur.fetchone()[0]
+        layout = "before leagues and partitioning" if legacy else "partitioned, with start years"
+        print(f"{rows} statistics rows, schema {layout}; best of {args.runs} runs\n")
+        print(f"{'query':30} {'planning':>10} {'execution':>10} {'buffers':>8} {'rows read':>10}  scans")
+        for label, query, params in cases(values, legacy):
+            result = explain(cur, query, params, args.runs)
+            print(f"{label:30} {result['planning_ms']:8.3f}ms {result['execution_ms']:8.3f}ms "
+                  f"{result['buffers']:8} {result['statistics_rows']:10}  {', '.join(result['scans'])}")
+            if args.plans:
+                print(plan_text(cur, query, params) + '\n')
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,181 +1,795 @@
-import psycopg2
-from tabulate import tabulate
+import argparse
+import contextvars
+import json
 import re
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from answer_cache import AnswerCache
+from derived_metrics import SEASON_METRICS
+from football_db import SQLiteDatabase, close_database, get_data_version, get_database
+from metrics import EXPORT_FORMATS, count, metrics, note, stage
+from seasons import DEFAULT_LEAGUE_ID, normalize_season, season_start_year
+from team_resolver import TeamResolver
+
+# A team name in a question: letters (including Turkish ones) and spaces
+TEAM_NAME = r'((?:[^\W\d_]|\s)+)'
+
+# Statistics returned (after team name and season) by each chatbot query
+BASIC_STATS_COLUMNS = [
+    'matches', 'goalsScored', 'goalsConceded', 'assists',
+    'cleanSheets', 'averageBallPossession', 'avgRating'
+]
+COMPARISON_COLUMNS = [
+    'goalsScored', 'goalsConceded', 'assists', 'averageBallPossession', 'avgRating'
+]
+FORM_COLUMNS = [
+    'matches', 'goalsScored', 'goalsConceded', 'bigChances',
+    'bigChancesMissed', 'shotsOnTarget', 'avgRating',
+    'big_chance_conversion', 'league_position'
+]
+
+# Statistics that can be asked about one at a time: column -> (label, phrases)
+STATISTICS = {
+    'goalsScored': ('goals scored', ['goals scored', 'goals', 'scored', 'score']),
+    'goalsConceded': ('goals conceded', ['goals conceded', 'goals against', 'conceded', 'concede']),
+    'assists': ('assists', ['assists']),
+    'cleanSheets': ('clean sheets', ['clean sheets', 'clean sheet']),
+    'averageBallPossession': ('average possession', ['possession']),
+    'avgRating': ('average rating', ['rating']),
+    'matches': ('matches played', ['matches', 'games']),
+    'shots': ('shots', ['shots']),
+    'shotsOnTarget': ('shots on target', ['shots on target']),
+    'bigChances': ('big chances', ['big chances']),
+    'bigChancesMissed': ('big chances missed', ['big chances missed']),
+    'corners': ('corners', ['corners']),
+    'yellowCards': ('yellow cards', ['yellow cards']),
+    'redCards': ('red cards', ['red cards']),
+    'fouls': ('fouls', ['fouls']),
+    'offsides': ('offsides', ['offsides']),
+    'tackles': ('tackles', ['tackles']),
+    'interceptions': ('interceptions', ['interceptions']),
+    'saves': ('saves', ['saves']),
+    'penaltyGoals': ('penalty goals', ['penalty goals']),
+    'headedGoals': ('headed goals', ['headed goals', 'headers']),
+    'ownGoals': ('own goals', ['own goals']),
+    'accuratePassesPercentage': ('pass accuracy', ['pass accuracy', 'passing accuracy']),
+    'totalPasses': ('passes', ['passes']),
+    'successfulDribbles': ('successful dribbles', ['dribbles']),
+    'clearances': ('clearances', ['clearances']),
+    'duelsWon': ('duels won', ['duels won', 'duels']),
+    'aerialDuelsWon': ('aerial duels won', ['aerial duels']),
+    'goal_difference': ('goal difference', ['goal difference']),
+    'shot_conversion': ('shot conversion rate', ['shot conversion', 'conversion rate']),
+}
+# Longest phrase first, so "shots on target" wins over "shots"
+STAT_PHRASES = sorted(
+    ((phrase, column) for column, (_, phrases) in STATISTICS.items() for phrase in phrases),
+    key=lambda item: -len(item[0])
+)
+# Words asking for a ranking ("which team scored the most goals")
+LEADER_WORDS = re.compile(r'\b(most|highest|top|best|fewest|least|lowest|worst)\b')
+ASCENDING_WORDS = re.compile(r'\b(fewest|least|lowest)\b')
+# "Teams like Galatasaray", "similar to Besiktas in 23/24"
+SIMILAR_PATTERN = re.compile(r'\b(?:similar (?:to|as)|teams? like|plays? like|resembles?)\s+' + TEAM_NAME)
+# Words that make a question more than a lookup of one season
+COMPLEX_WORDS = re.compile(
+    r'\b(per|than|all|every|each|total|trend|since|between|career|history|rank|ranked|'
+    r'why|how did|over the|against|compared|versus|last \d+|over the years|seasons)\b'
+)
+# Words a question about one team's statistic may contain besides the
+# team, the statistic and the season; anything else may qualify the
+# question in a way the lookup would ignore
+QUESTION_WORDS = {
+    'how', 'many', 'much', 'what', 'whats', 'which', 'was', 'were', 'is', 'are', 'did', 'does', 'do',
+    'has', 'have', 'had', 'get', 'got', 'make', 'made', 'score', 'scored', 'concede', 'conceded',
+    'keep', 'kept', 'play', 'played', 'win', 'won', 'commit', 'committed', 'record', 'recorded',
+    'the', 'a', 'an', 'in', 'of', 'for', 'by', 'this', 'last', 'season', 'team', 'their', 'its',
+    'average', 'number', 'show', 'me', 'tell', 'give',
+}
+SEASON = re.compile(r'\d{2}/\d{2}')
+
+class Intent(NamedTuple):
+    """A question the chatbot can answer without an LLM"""
+    name: str                    # 'stats', 'compare', 'form', 'stat', 'leaders' or 'similar'
+    teams: Tuple[str, ...]
+    season: Optional[str]
+    confidence: float            # 1.0 when nothing in the question is left unparsed
+    statistic: Optional[str] = None
+    ascending: bool = False
+    limit: int = 5
+
+def format_value(value):
+    if value is None:
+        return "n/a"
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.2f}"
+
+# Derived metrics are read from team_season_metrics, filled by the importer
+METRICS_JOIN = "\nLEFT JOIN team_season_metrics m ON m.season_id = ts.season_id AND m.team_id = ts.team_id"
+
+def column_ref(column):
+    return f"m.{column}" if column in SEASON_METRICS else f"ts.{column}"
+
+def metrics_join(columns):
+    return METRICS_JOIN if any(column in SEASON_METRICS for column in columns) else ""
+
+def stats_query(columns, team_filter):
+    return f"""
+SELECT 
+    t.name,
+    s.year,
+    {', '.join(column_ref(column) for column in columns)}
+FROM team_statistics ts
+JOIN teams t ON ts.team_id = t.id
+JOIN seasons s ON ts.season_id = s.id{metrics_join(columns)}
+WHERE {team_filter}
+"""
+
+# Team names are resolved to ids up front (see team_resolver.py), so the
+# queries filter on the indexed team_id instead of a leading-wildcard ILIKE
+BASIC_STATS_QUERY = stats_query(BASIC_STATS_COLUMNS, "ts.team_id = $1")
+COMPARISON_QUERY = stats_query(COMPARISON_COLUMNS, "ts.team_id = ANY($1)")
+FORM_QUERY = stats_query(FORM_COLUMNS, "ts.team_id = $1")
+
+# Teams of league $3 ranked by one statistic in a season (the league's
+# latest when $1 is NULL), as league positions are ranked. The season is
+# given as its start year. team_statistics is filtered on its partition
+# key; seasons are filtered too, so that the planner starts from the
+# season's few seasons rows rather than hashing all of them
+LEADERS_QUERY = """
+SELECT t.name, s.year, {column}
+FROM team_statistics ts
+JOIN teams t ON ts.team_id = t.id
+JOIN seasons s ON ts.season_id = s.id{join}
+WHERE s.start_year = COALESCE($1, (SELECT MAX(start_year) FROM seasons WHERE league_id = $3))
+  AND s.league_id = $3 AND ts.start_year = s.start_year
+  AND {column} IS NOT NULL
+ORDER BY {column} {direction}, t.name
+LIMIT $2
+"""
+
+def batch_query(columns, per_team, lateral=True):
+    """Rows of (team_id, name, year, *columns) for all teams in $1: the
+    per_team newest seasons of each, newest first, then by name.
+
+    With lateral, each team's seasons are read newest first from the
+    (team_id, start_year) index, stopping after per_team rows, as the
+    single-team queries do. SQLite has no LATERAL: there every season of
+    the teams is numbered with ROW_NUMBER() instead.
+    """
+    selected = ',\n        '.join(f"{column_ref(column)} AS value_{i}" for i, column in enumerate(columns))
+    values = ', '.join(f'value_{i}' for i in range(len(columns)))
+    if lateral:
+        return f"""
+SELECT team_id, name, year, {values}
+FROM unnest($1) AS wanted(id)
+CROSS JOIN LATERAL (
+    SELECT
+        ts.team_id,
+        t.name,
+        s.year,
+        ts.start_year,
+        {selected}
+    FROM team_statistics ts
+    JOIN teams t ON ts.team_id = t.id
+    JOIN seasons s ON ts.season_id = s.id{metrics_join(columns)}
+    WHERE ts.team_id = wanted.id{{season}}
+    ORDER BY ts.start_year DESC
+    LIMIT {per_team}
+) team_seasons
+ORDER BY start_year DESC, name
+"""
+    return f"""
+SELECT team_id, name, year, {values}
+FROM (
+    SELECT
+        ts.team_id,
+        t.name,
+        s.year,
+        ts.start_year,
+        {selected},
+        ROW_NUMBER() OVER (PARTITION BY ts.team_id ORDER BY ts.start_year DESC) AS newest
+    FROM team_statistics ts
+    JOIN teams t ON ts.team_id = t.id
+    JOIN seasons s ON ts.season_id = s.id{metrics_join(columns)}
+    WHERE ts.team_id = ANY($1){{season}}
+) team_seasons
+WHERE newest <= {per_team}
+ORDER BY start_year DESC, name
+"""
+
+# Intent -> (statement name, columns, rows per lookup) for the lookups
+# process_batch groups; single statistics use their own statement names
+BATCH_LOOKUPS = {
+    'stats': ('chatbot_basic_stats', BASIC_STATS_COLUMNS, 1),
+    'compare': ('chatbot_comparison', COMPARISON_COLUMNS, 2),
+    'form': ('chatbot_form', FORM_COLUMNS, 1),
+}
+
+# Latest season first, or only the given season ($2, its start year):
+# the order of the (team_id, start_year DESC) index, so the newest row of
+# a team is the first one read
+LATEST = " ORDER BY ts.start_year DESC LIMIT 1"
+IN_SEASON = " AND ts.start_year = $2" + LATEST
+
+# Prepared statement name -> (query, parameter types); every query has a
+# variant for the latest season and one for a given season
+STATEMENTS = {
+    'chatbot_basic_stats': (BASIC_STATS_QUERY + LATEST, ['varchar']),
+    'chatbot_basic_stats_season': (BASIC_STATS_QUERY + IN_SEASON, ['varchar', 'integer']),
+    'chatbot_comparison': (COMPARISON_QUERY + " ORDER BY ts.start_year DESC, t.name LIMIT 2", ['varchar[]']),
+    'chatbot_comparison_season': (COMPARISON_QUERY + " AND ts.start_year = $2 ORDER BY ts.start_year DESC, t.name LIMIT 2",
+                                  ['varchar[]', 'integer']),
+    'chatbot_form': (FORM_QUERY + LATEST, ['varchar']),
+    'chatbot_form_season': (FORM_QUERY + IN_SEASON, ['varchar', 'integer']),
+}
+
+# Rows fetched ahead for the batch of questions being answered, by answer
+# cache key. Kept per thread and task, as the chatbot is shared by the
+# service's threads
+_prefetched: contextvars.ContextVar = contextvars.ContextVar('chatbot_prefetched', default={})
 
 class FootballChatbot:
-    def __init__(self):
-        self.conn = psycopg2.connect(
-            dbname='turkish_football',
-            user='postgres',
-            password='postgres',
-            host='localhost'
-        )
-        self.cur = self.conn.cursor()
+    def __init__(self, db=None, engine=None, cache=True, similarity=None):
+        # With an in-memory StatsEngine the database is not used for
+        # answers; without one, queries borrow a pooled connection per call
+        self.engine = engine
+        self.db = db
+        self._resolver = None
+        # SimilarityIndex for "teams like X" questions, built on first use
+        # unless one (e.g. over chosen columns or with weights) is given
+        self._similarity = similarity
+        # Guards building the resolver and similarity index on first use
+        self._lock = threading.Lock()
+        # Lookups and queries of the most recent batch
+        self.batch_stats = {}
+        if engine is None:
+            self.db = db or get_database()
+            for name, (query, types) in STATEMENTS.items():
+                self.db.register_statement(name, query, types)
+
+        # Query results are cached per (query, team ids, season) until they
+        # expire or an import bumps the data version
+        if cache is True:
+            if engine is not None:
+                version_source = engine.version
+            else:
+                version_source = lambda: get_data_version(self.db)
+            cache = AnswerCache(version_source=version_source)
+        self.cache = cache or None
 
     def close(self):
-        self.cur.close()
-        self.conn.close()
+        # Nothing is held between queries; the pool is closed by its owner
+        pass
+
+    def refresh(self):
+        """Reload the in-memory engine and team index, e.g. after import_data.py has run"""
+        if self.engine is not None:
+            self.engine.refresh()
+        self._resolver = None
+        if self.cache is not None:
+            self.cache.clear()
+
+    @property
+    def similarity(self):
+        with self._lock:
+            if self._similarity is None:
+                # numpy is only imported once a similarity question is asked
+                from similarity import SimilarityIndex
+                from stats_engine import StatsEngine
+                self._similarity = SimilarityIndex(self.engine or StatsEngine.from_database(self.db))
+            else:
+                self._similarity.refresh()
+            return self._similarity
+
+    @property
+    def resolver(self):
+        # refresh() drops the resolver; a thread still using the old one
+        # keeps it until its question is answered
+        resolver = self._resolver
+        if resolver is None:
+            with self._lock:
+                if self._resolver is None:
+                    if self.engine is not None:
+                        self._resolver = TeamResolver.from_engine(self.engine)
+                    else:
+                        self._resolver = TeamResolver.from_database(self.db)
+                resolver = self._resolver
+        return resolver
+
+    def _execute(self, name, params, season):
+        if season:
+            return self.db.execute_prepared(f"{name}_season", params + [season_start_year(season)])
+        return self.db.execute_prepared(name, params)
+
+    def _fetch(self, name, columns, team_names, season, limit):
+        if self.cache is not None and self.cache.check_version():
+            # New data was imported: reload the engine and team index
+            self.refresh()
+
+        team_ids = [self.resolver.resolve(team_name) for team_name in team_names]
+        team_ids = [team_id for team_id in team_ids if team_id is not None]
+        if not team_ids:
+            return []
+
+        key = (name, tuple(team_ids), season)
+        prefetched = _prefetched.get()
+        if key in prefetched:
+            rows = prefetched[key]
+            note('rows', len(rows))
+            if self.cache is not None:
+                self.cache.put(key, rows)
+            return rows
+        if self.cache is not None:
+            hit, rows = self.cache.get(key)
+            if hit:
+                count('answer_cache_hits')
+                note('rows', len(rows))
+                return rows
+            count('answer_cache_misses')
+
+        with stage('query'):
+            if self.engine is not None:
+                rows = self.engine.select(columns, team_ids, season, limit)
+            elif name == 'chatbot_comparison':
+                rows = self._execute(name, [team_ids], season)
+            else:
+                rows = self._execute(name, [team_ids[0]], season)
+        note('rows', len(rows))
+
+        if self.cache is not None:
+            self.cache.put(key, rows)
+        return rows
+
+    def _stat_statement(self, column):
+        # Single-statistic statements are registered the first time they are asked for
+        name = f"chatbot_stat_{column.lower()}"
+        if self.engine is None and name not in self.db.statements:
+            query = stats_query([column], "ts.team_id = $1")
+            self.db.register_statement(name, query + LATEST, ['varchar'])
+            self.db.register_statement(f"{name}_season", query + IN_SEASON, ['varchar', 'integer'])
+        return name
+
+    def _fetch_leaders(self, column, season, limit, ascending):
+        if self.cache is not None and self.cache.check_version():
+            self.refresh()
+
+        key = ('chatbot_leaders', column, season, limit, ascending)
+        prefetched = _prefetched.get()
+        if key in prefetched:
+            rows = prefetched[key]
+            note('rows', len(rows))
+            return rows
+        if self.cache is not None:
+            hit, rows = self.cache.get(key)
+            if hit:
+                count('answer_cache_hits')
+                note('rows', len(rows))
+                return rows
+            count('answer_cache_misses')
+
+        with stage('query'):
+            if self.engine is not None:
+                rows = self.engine.top(column, season, limit, ascending, DEFAULT_LEAGUE_ID)
+            else:
+                direction = 'ASC' if ascending else 'DESC'
+                name = f"chatbot_leaders_{column.lower()}_{direction.lower()}"
+                if name not in self.db.statements:
+                    query = LEADERS_QUERY.format(column=column_ref(column), join=metrics_join([column]),
+                                                 direction=direction)
+                    self.db.register_statement(name, query, ['integer', 'integer', 'integer'])
+                rows = self.db.execute_prepared(name, [season_start_year(season) if season else None, limit,
+                                                       DEFAULT_LEAGUE_ID])
+        note('rows', len(rows))
+
+        if self.cache is not None:
+            self.cache.put(key, rows)
+        return rows
 
     def get_team_basic_stats(self, team_name, season=None):
-        try:
-            query = """
-            SELECT 
-                t.name,
-                s.year,
-                ts.matches,
-                ts.goalsScored,
-                ts.goalsConceded,
-                ts.assists,
-                ts.cleanSheets,
-                ts.averageBallPossession,
-                ts.avgRating
-            FROM team_statistics ts
-            JOIN teams t ON ts.team_id = t.id
-            JOIN seasons s ON ts.season_id = s.id
-            WHERE t.name ILIKE %s
-            """
-            params = [f"%{team_name}%"]
-            
-            if season:
-                query += " AND s.year = %s"
-                params.append(season)
-            
-            query += " ORDER BY s.year DESC LIMIT 1"
-            
-            self.cur.execute(query, params)
-            result = self.cur.fetchone()
-            
-            if result:
-                return f"{result[0]} in {result[1]} season:\n" \
-                       f"• Played {result[2]} matches\n" \
-                       f"• Scored {result[3]} goals and conceded {result[4]} (difference: {result[3]-result[4]})\n" \
-                       f"• Made {result[5]} assists\n" \
-                       f"• Kept {result[6]} clean sheets\n" \
-                       f"• Average possession: {result[7]:.1f}%\n" \
-                       f"• Average rating: {result[8]:.2f}"
-            return "No data found for the specified team and season."
-        except Exception as e:
-            return f"An error occurred: {str(e)}"
+        return self._guarded(self._basic_stats, team_name, season)[0]
+
+    def _basic_stats(self, team_name, season):
+        rows = self._fetch('chatbot_basic_stats', BASIC_STATS_COLUMNS, [team_name], season, 1)
+        result = rows[0] if rows else None
+        
+        if result:
+            return f"{result[0]} in {result[1]} season:\n" \
+                   f"• Played {result[2]} matches\n" \
+                   f"• Scored {result[3]} goals and conceded {result[4]} (difference: {result[3]-result[4]})\n" \
+                   f"• Made {result[5]} assists\n" \
+                   f"• Kept {result[6]} clean sheets\n" \
+                   f"• Average possession: {result[7]:.1f}%\n" \
+                   f"• Average rating: {result[8]:.2f}"
+        return "No data found for the specified team and season."
 
     def get_team_comparison(self, team1, team2, season=None):
-        try:
-            query = """
-            SELECT 
-                t.name,
-                s.year,
-                ts.goalsScored,
-                ts.goalsConceded,
-                ts.assists,
-                ts.averageBallPossession,
-                ts.avgRating
-            FROM team_statistics ts
-            JOIN teams t ON ts.team_id = t.id
-            JOIN seasons s ON ts.season_id = s.id
-            WHERE t.name ILIKE ANY(%s)
-            """
-            params = [[f"%{team1}%", f"%{team2}%"]]
-            
-            if season:
-                query += " AND s.year = %s"
-                params.append(season)
-            
-            query += " ORDER BY s.year DESC, t.name LIMIT 2"
-            
-            self.cur.execute(query, params)
-            results = self.cur.fetchall()
-            
-            if len(results) == 2:
-                return f"Comparison between {results[0][0]} and {results[1][0]} in {results[0][1]} season:\n" \
-                       f"Goals scored: {results[0][2]} vs {results[1][2]}\n" \
-                       f"Goals conceded: {results[0][3]} vs {results[1][3]}\n" \
-                       f"Assists: {results[0][4]} vs {results[1][4]}\n" \
-                       f"Possession: {results[0][5]:.1f}% vs {results[1][5]:.1f}%\n" \
-                       f"Average rating: {results[0][6]:.2f} vs {results[1][6]:.2f}"
-            return "Could not find data for both teams in the specified season."
-        except Exception as e:
-            return f"An error occurred: {str(e)}"
+        return self._guarded(self._comparison, team1, team2, season)[0]
+
+    def _comparison(self, team1, team2, season):
+        results = self._fetch('chatbot_comparison', COMPARISON_COLUMNS, [team1, team2], season, 2)
+        
+        if len(results) == 2:
+            return f"Comparison between {results[0][0]} and {results[1][0]} in {results[0][1]} season:\n" \
+                   f"Goals scored: {results[0][2]} vs {results[1][2]}\n" \
+                   f"Goals conceded: {results[0][3]} vs {results[1][3]}\n" \
+                   f"Assists: {results[0][4]} vs {results[1][4]}\n" \
+                   f"Possession: {results[0][5]:.1f}% vs {results[1][5]:.1f}%\n" \
+                   f"Average rating: {results[0][6]:.2f} vs {results[1][6]:.2f}"
+        return "Could not find data for both teams in the specified season."
 
     def get_team_form(self, team_name, season=None):
-        try:
-            query = """
-            SELECT 
-                t.name,
-                s.year,
-                ts.matches,
-                ts.goalsScored,
-                ts.goalsConceded,
-                ts.bigChances,
-                ts.bigChancesMissed,
-                ts.shotsOnTarget,
-                ts.avgRating
-            FROM team_statistics ts
-            JOIN teams t ON ts.team_id = t.id
-            JOIN seasons s ON ts.season_id = s.id
-            WHERE t.name ILIKE %s
-            """
-            params = [f"%{team_name}%"]
-            
-            if season:
-                query += " AND s.year = %s"
-                params.append(season)
-            
-            query += " ORDER BY s.year DESC LIMIT 1"
-            
-            self.cur.execute(query, params)
-            result = self.cur.fetchone()
-            
-            if result:
-                conversion_rate = (result[3] / result[5] * 100) if result[5] > 0 else 0
-                return f"{result[0]}'s form analysis for {result[1]} season:\n" \
-                       f"• Scoring efficiency: {conversion_rate:.1f}% of big chances converted\n" \
-                       f"• Created {result[5]} big chances, missed {result[6]}\n" \
-                       f"• {result[7]} shots on target in {result[2]} matches\n" \
-                       f"• Team's average rating: {result[8]:.2f}"
-            return "No form data found for the specified team and season."
-        except Exception as e:
-            return f"An error occurred: {str(e)}"
+        return self._guarded(self._form, team_name, season)[0]
 
-    def process_query(self, query):
+    def _form(self, team_name, season):
+        rows = self._fetch('chatbot_form', FORM_COLUMNS, [team_name], season, 1)
+        result = rows[0] if rows else None
+        
+        if result:
+            conversion_rate = result[9] or 0
+            return f"{result[0]}'s form analysis for {result[1]} season:\n" \
+                   f"• Scoring efficiency: {conversion_rate:.1f}% of big chances converted\n" \
+                   f"• Created {result[5]} big chances, missed {result[6]}\n" \
+                   f"• {result[7]} shots on target in {result[2]} matches\n" \
+                   f"• Team's average rating: {result[8]:.2f}\n" \
+                   f"• League position by goal difference: {format_value(result[10])}"
+        return "No form data found for the specified team and season."
+
+    def get_team_stat(self, team_name, statistic, season=None):
+        return self._guarded(self._stat, team_name, statistic, season)[0]
+
+    def _stat(self, team_name, statistic, season):
+        rows = self._fetch(self._stat_statement(statistic), [statistic], [team_name], season, 1)
+        if rows:
+            name, year, value = rows[0]
+            return f"{name} in {year} season:\n" \
+                   f"• {STATISTICS[statistic][0].capitalize()}: {format_value(value)}"
+        return "No data found for the specified team and season."
+
+    def get_stat_leaders(self, statistic, season=None, limit=5, ascending=False):
+        return self._guarded(self._leaders, statistic, season, limit, ascending)[0]
+
+    def _leaders(self, statistic, season, limit, ascending):
+        rows = self._fetch_leaders(statistic, season, limit, ascending)
+        if rows:
+            label = STATISTICS[statistic][0]
+            lines = [f"{'Fewest' if ascending else 'Most'} {label} in {rows[0][1]} season:"]
+            lines += [f"{i}. {name}: {format_value(value)}" for i, (name, _, value) in enumerate(rows, 1)]
+            return "\n".join(lines)
+        return "No data found for the specified season."
+
+    def get_similar_teams(self, team_name, season=None, limit=5):
+        return self._guarded(self._similar, team_name, season, limit)[0]
+
+    def _similar(self, team_name, season, limit):
+        team_id = self.resolver.resolve(team_name)
+        if team_id is None:
+            return "No data found for the specified team and season."
+        key = ('chatbot_similar', team_id, season, limit)
+        rows = None
+        if self.cache is not None:
+            if self.cache.check_version():
+                self.refresh()
+            hit, rows = self.cache.get(key)
+            count('answer_cache_hits' if hit else 'answer_cache_misses')
+        if rows is None:
+            with stage('query'):
+                rows = self.similarity.similar(team_id, season, limit)
+            if self.cache is not None:
+                self.cache.put(key, rows)
+        note('rows', len(rows))
+        if rows:
+            (name, year, _), neighbours = rows[0], rows[1:]
+            lines = [f"Team-seasons most similar to {name} in {year} (per-match statistics):"]
+            lines += [f"{i}. {name} {year} (distance {distance:.2f})"
+                      for i, (name, year, distance) in enumerate(neighbours, 1)]
+            return "\n".join(lines)
+        return "No data found for the specified team and season."
+
+    def _confidence(self, teams, rest):
+        """1.0 when every team name parsed from the question is a team's
+        name or alias as a whole, and the rest of the question mentions no
+        other team or season and no qualifier ("against", "last 5"); 0.5
+        otherwise"""
+        if not all(self.resolver.resolve(team, partial=False) is not None for team in teams):
+            return 0.5
+        if COMPLEX_WORDS.search(rest) or len(SEASON.findall(rest)) > 1 or self.resolver.find_in_text(rest)[0]:
+            return 0.5
+        return 1.0
+
+    def _find_statistic(self, query):
+        for phrase, column in STAT_PHRASES:
+            match = re.search(r'\b' + phrase + r'\b', query)
+            if match:
+                return column, query[:match.start()] + ' ' + query[match.end():]
+        return None, query
+
+    def parse_query(self, query) -> Optional[Intent]:
+        """Work out what a question asks for, or None if it is not one of
+        the chatbot's intents"""
         # Convert query to lowercase for easier matching
-        query = query.lower()
+        query = normalize_season(query.lower())
+        query = re.sub(r"(\w)['’]s\b", r"\1", query)
         
         # Extract team names and season if present
-        season_match = re.search(r'(\d{2}/\d{2})', query)
-        season = season_match.group(1) if season_match else None
+        season_match = SEASON.search(query)
+        season = season_match.group(0) if season_match else None
         
+        # Team-seasons with a similar statistical profile
+        similar_match = SIMILAR_PATTERN.search(query)
+        if similar_match:
+            team = similar_match.group(1).strip()
+            limit_match = re.search(r'\btop (\d{1,2})\b', query)
+            limit = int(limit_match.group(1)) if limit_match else 5
+            rest = query[:similar_match.start()] + ' ' + query[similar_match.end():]
+            return Intent('similar', (team,), season, self._confidence([team], rest), limit=limit)
+
         # Basic stats request
         if "stats" in query or "statistics" in query:
-            team_match = re.search(r'(?:stats|statistics).*?(?:for|of)\s+([a-zA-Z\s]+)', query)
+            team_match = re.search(r'(?:stats|statistics).*?(?:for|of)\s+' + TEAM_NAME, query)
             if team_match:
                 team = team_match.group(1).strip()
-                return self.get_team_basic_stats(team, season)
+                rest = query[:team_match.start()] + ' ' + query[team_match.end():]
+                return Intent('stats', (team,), season, self._confidence([team], rest))
         
         # Comparison request
         elif "compare" in query or "vs" in query or "versus" in query:
-            teams = re.findall(r'(?:compare|vs|versus)\s+([a-zA-Z\s]+)\s+(?:and|vs|versus)\s+([a-zA-Z\s]+)', query)
-            if teams:
-                team1, team2 = teams[0]
-                return self.get_team_comparison(team1.strip(), team2.strip(), season)
+            match = re.search(r'(?:compare|vs|versus)\s+' + TEAM_NAME + r'\s+(?:and|vs|versus)\s+' + TEAM_NAME, query)
+            if match:
+                teams = (match.group(1).strip(), match.group(2).strip())
+                rest = query[:match.start()] + ' ' + query[match.end():]
+                return Intent('compare', teams, season, self._confidence(teams, rest))
         
         # Form analysis request
         elif "form" in query:
-            team_match = re.search(r'form.*?(?:for|of)\s+([a-zA-Z\s]+)', query)
+            team_match = re.search(r'form.*?(?:for|of)\s+' + TEAM_NAME, query)
             if team_match:
                 team = team_match.group(1).strip()
-                return self.get_team_form(team, season)
-        
+                rest = query[:team_match.start()] + ' ' + query[team_match.end():]
+                return Intent('form', (team,), season, self._confidence([team], rest))
+
+        # A single statistic, for one team or as a ranking. Questions with
+        # qualifiers, more teams or more seasons than the lookup would use
+        # are left to the LLM
+        statistic, rest = self._find_statistic(query)
+        if statistic is None or COMPLEX_WORDS.search(rest) or len(SEASON.findall(rest)) > 1:
+            return None
+        if season_match:
+            rest = rest.replace(season, ' ')
+        team_ids, words = self.resolver.find_in_text(rest)
+        if not team_ids and LEADER_WORDS.search(query):
+            limit_match = re.search(r'\btop (\d{1,2})\b', query)
+            limit = int(limit_match.group(1)) if limit_match else 5
+            return Intent('leaders', (), season, 0.9, statistic,
+                          ascending=bool(ASCENDING_WORDS.search(query)), limit=limit)
+        if len(team_ids) == 1 and not LEADER_WORDS.search(query):
+            confidence = 0.9 if all(word in QUESTION_WORDS for word in words) else 0.5
+            return Intent('stat', (self.resolver.name(team_ids[0]),), season, confidence, statistic)
+        return None
+
+    @staticmethod
+    def _guarded(method, *args) -> Tuple[str, Optional[Exception]]:
+        # (answer, None), or an "An error occurred" answer and its error
+        try:
+            return method(*args), None
+        except Exception as e:
+            return f"An error occurred: {str(e)}", e
+
+    def answer_intent(self, intent: Intent) -> str:
+        return self.answer_intent_with_error(intent)[0]
+
+    def answer_intent_with_error(self, intent: Intent) -> Tuple[str, Optional[Exception]]:
+        """The answer to intent, and the error behind it when the answer is
+        an "An error occurred" message. The error is returned rather than
+        kept on the chatbot, which threads share."""
+        if intent.name == 'stats':
+            return self._guarded(self._basic_stats, intent.teams[0], intent.season)
+        if intent.name == 'compare':
+            return self._guarded(self._comparison, intent.teams[0], intent.teams[1], intent.season)
+        if intent.name == 'form':
+            return self._guarded(self._form, intent.teams[0], intent.season)
+        if intent.name == 'stat':
+            return self._guarded(self._stat, intent.teams[0], intent.statistic, intent.season)
+        if intent.name == 'similar':
+            return self._guarded(self._similar, intent.teams[0], intent.season, intent.limit)
+        return self._guarded(self._leaders, intent.statistic, intent.season, intent.limit, intent.ascending)
+
+    def _batch_statement(self, name, columns, per_team, season):
+        # Batch statements are registered the first time they are needed
+        batch_name = f"{name.replace('chatbot_', 'chatbot_batch_')}{'_season' if season else ''}"
+        if batch_name not in self.db.statements:
+            query = batch_query(columns, per_team, lateral=not isinstance(self.db, SQLiteDatabase))
+            if season:
+                self.db.register_statement(batch_name, query.format(season=" AND ts.start_year = $2"),
+                                           ['varchar[]', 'integer'])
+            else:
+                self.db.register_statement(batch_name, query.format(season=""), ['varchar[]'])
+        return batch_name
+
+    def prefetch(self, intents: Sequence[Intent]) -> Dict[tuple, list]:
+        """Fetch the rows the intents' answers need, one query per intent
+        and season: team lookups as one team_id = ANY(...) query, leaders
+        as one query with the largest limit asked for. Returns the rows by
+        answer cache key."""
+        if self.cache is not None and self.cache.check_version():
+            self.refresh()
+        prefetched = {}
+        if self.engine is not None:
+            # In-memory lookups gain nothing from grouping
+            self.batch_stats = {'lookups': 0, 'queries': 0}
+            return prefetched
+
+        groups: Dict[tuple, set] = {}
+        lookups: Dict[tuple, Tuple[tuple, int]] = {}
+        leaders: Dict[tuple, int] = {}
+        for intent in intents:
+            if intent.name == 'leaders':
+                group = (intent.statistic, intent.season, intent.ascending)
+                leaders[group] = max(leaders.get(group, 0), intent.limit)
+                continue
+            if intent.name == 'stat':
+                name, columns, per_team = self._stat_statement(intent.statistic), [intent.statistic], 1
+            elif intent.name in BATCH_LOOKUPS:
+                name, columns, per_team = BATCH_LOOKUPS[intent.name]
+            else:
+                continue
+            team_ids = [self.resolver.resolve(team) for team in intent.teams]
+            team_ids = tuple(team_id for team_id in team_ids if team_id is not None)
+            if not team_ids:
+                continue
+            group = (name, tuple(columns), per_team, intent.season)
+            groups.setdefault(group, set()).update(team_ids)
+            lookups[(name, team_ids, intent.season)] = (group, len(intent.teams))
+
+        group_rows = {}
+        for group, team_ids in groups.items():
+            name, columns, per_team, season = group
+            statement = self._batch_statement(name, columns, per_team, season)
+            params = [sorted(team_ids)] + ([season_start_year(season)] if season else [])
+            with stage('query'):
+                group_rows[group] = self.db.execute_prepared(statement, params)
+        for key, (group, limit) in lookups.items():
+            # Each lookup keeps the rows its own query would have returned
+            team_ids = set(key[1])
+            prefetched[key] = [row[1:] for row in group_rows[group] if row[0] in team_ids][:limit]
+
+        for (statistic, season, ascending), limit in leaders.items():
+            rows = self._fetch_leaders(statistic, season, limit, ascending)
+            for intent in intents:
+                if intent.name == 'leaders' and (intent.statistic, intent.season, intent.ascending) == \
+                        (statistic, season, ascending):
+                    prefetched[('chatbot_leaders', statistic, season, intent.limit, ascending)] = \
+                        rows[:intent.limit]
+        self.batch_stats = {'lookups': len(lookups) + len(leaders), 'queries': len(groups) + len(leaders)}
+        return prefetched
+
+    def process_batch(self, queries: Sequence[str]) -> List[str]:
+        """Answers to many questions, in order; the database is queried
+        once per intent and season (see prefetch) instead of per question"""
+        parsed = {}
+        for query in queries:
+            if query not in parsed:
+                try:
+                    parsed[query] = self.parse_query(query)
+                except Exception as e:
+                    parsed[query] = e
+
+        def parse(query):
+            if isinstance(parsed[query], Exception):
+                raise parsed[query]
+            return parsed[query]
+
+        prefetched = {}
+        with metrics.trace('chatbot_batch', f"{len(queries)} questions") as trace:
+            with trace.stage('prefetch'):
+                try:
+                    prefetched = self.prefetch([intent for intent in parsed.values() if isinstance(intent, Intent)])
+                except Exception as e:
+                    # Answer one question at a time instead
+                    trace.fail(e)
+        token = _prefetched.set(prefetched)
+        try:
+            return [self._process(query, parse) for query in queries]
+        finally:
+            _prefetched.reset(token)
+
+    def process_query(self, query):
+        return self._process(query, self.parse_query)
+
+    def _process(self, query, parse):
+        # Stages: parse, answer (including query, the database or engine lookup)
+        with metrics.trace('chatbot', query) as trace:
+            try:
+                with trace.stage('parse'):
+                    intent = parse(query)
+            except Exception as e:
+                trace.fail(e)
+                return f"An error occurred: {str(e)}"
+            if intent is not None:
+                trace.count(f"intent_{intent.name}")
+                with trace.stage('answer'):
+                    answer, error = self.answer_intent_with_error(intent)
+                if error is not None:
+                    trace.fail(error)
+                return answer
+            trace.count('not_understood')
+
         return "I'm sorry, I didn't understand your question. You can ask about:\n" \
                "1. Team stats (e.g., 'Show stats for Galatasaray')\n" \
                "2. Compare teams (e.g., 'Compare Galatasaray and Fenerbahce')\n" \
                "3. Team form (e.g., 'Show form for Galatasaray')\n" \
+               "4. A single statistic (e.g., 'How many yellow cards did Besiktas get?')\n" \
+               "5. League leaders (e.g., 'Which team scored the most goals in 23/24?')\n" \
+               "6. Similar teams (e.g., 'Which teams are similar to Galatasaray in 24/25?')\n" \
                "You can also specify a season (e.g., 'Show stats for Galatasaray in 24/25')"
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Turkish Football League chatbot")
+    parser.add_argument('--engine', action='store_true',
+                        help="Answer from an in-memory copy of the database")
+    parser.add_argument('--offline', metavar='JSON_FILE', nargs='?', const='turkish_football_data.json',
+                        help="Answer from the JSON data file, without a database server")
+    parser.add_argument('--snapshot', metavar='SNAPSHOT_FILE', nargs='?', const='turkish_football.snapshot',
+                        help="Answer from a snapshot written by snapshot.py, without a database server")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the answer cache")
+    parser.add_argument('--batch', metavar='QUESTIONS_FILE',
+                        help="Answer the questions in this file (one per line) and exit")
+    parser.add_argument('--output', metavar='FILE',
+                        help="With --batch, write the answers here as JSON lines (default: stdout)")
+    parser.add_argument('--metrics', choices=EXPORT_FORMATS,
+                        help="Print stage timings and counters in this format on exit")
+    return parser.parse_args()
+
+def run_batch(chatbot, path, output=None):
+    with open(path, encoding='utf-8') as f:
+        questions = [line.strip() for line in f if line.strip()]
+    start = time.perf_counter()
+    answers = chatbot.process_batch(questions)
+    elapsed = time.perf_counter() - start
+
+    out = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    try:
+        for question, answer in zip(questions, answers):
+            out.write(json.dumps({'question': question, 'answer': answer}, ensure_ascii=False) + "\n")
+    finally:
+        if output:
+            out.close()
+    # Reported on stderr so that stdout holds only the answers
+    rate = len(questions) / elapsed if elapsed > 0 else 0
+    print(f"Answered {len(questions)} questions in {elapsed:.2f}s ({rate:.0f} questions/s); "
+          f"{chatbot.batch_stats.get('lookups', 0)} lookups in {chatbot.batch_stats.get('queries', 0)} queries",
+          file=sys.stderr)
+
 def main():
-    print("Welcome to the Turkish Football League Chatbot!")
-    print("Ask me about team statistics, comparisons, or form analysis.")
-    print("Type 'quit' to exit.")
+    args = parse_args()
+    if not args.batch:
+        print("Welcome to the Turkish Football League Chatbot!")
+        print("Ask me about team statistics, comparisons, or form analysis.")
+        print("Type 'quit' to exit.")
     
-    chatbot = FootballChatbot()
+    cache = not args.no_cache
+    if args.offline or args.engine or args.snapshot:
+        # numpy is only imported when the in-memory engine is used
+        from stats_engine import StatsEngine
+    if args.snapshot:
+        chatbot = FootballChatbot(engine=StatsEngine.from_snapshot(args.snapshot), cache=cache)
+    elif args.offline:
+        chatbot = FootballChatbot(engine=StatsEngine.from_json(args.offline), cache=cache)
+    elif args.engine:
+        chatbot = FootballChatbot(engine=StatsEngine.from_database(), cache=cache)
+    else:
+        chatbot = FootballChatbot(cache=cache)
+
+    if args.batch:
+        run_batch(chatbot, args.batch, args.output)
+        chatbot.close()
+        close_database()
+        if args.metrics:
+            print(metrics.export(args.metrics), file=sys.stderr)
+        return
     
     while True:
         user_input = input("\nYour question: ").strip()
@@ -187,6 +801,9 @@ def main():
         print("\n" + response)
     
     chatbot.close()
+    close_database()
+    if args.metrics:
+        print("\n" + metrics.export(args.metrics))
     print("\nGoodbye!")
 
 if __name__ == "__main__":
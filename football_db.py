@@ -0,0 +1,418 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+import sqlite_backend
+from sql_grammar import check_read_only
+
+# Storage backend: 'postgres' (default) or 'sqlite', an embedded database
+# file built from schema.sql that needs no server
+BACKEND = os.getenv('FOOTBALL_DB_BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('FOOTBALL_SQLITE_PATH', 'turkish_football.sqlite3')
+
+# Connection settings, overridable through the environment
+DB_CONFIG = {
+    'dbname': os.getenv('FOOTBALL_DB_NAME', 'turkish_football'),
+    'user': os.getenv('FOOTBALL_DB_USER', 'postgres'),
+    'password': os.getenv('FOOTBALL_DB_PASSWORD', 'postgres'),
+    'host': os.getenv('FOOTBALL_DB_HOST', 'localhost'),
+    'port': int(os.getenv('FOOTBALL_DB_PORT', '5432')),
+}
+POOL_SIZE = int(os.getenv('FOOTBALL_DB_POOL_SIZE', '10'))
+
+# Limits for running model-generated SQL (see FootballDatabase.fetch_guarded)
+QUERY_TIMEOUT_MS = int(os.getenv('FOOTBALL_QUERY_TIMEOUT_MS', '5000'))
+QUERY_MAX_COST = float(os.getenv('FOOTBALL_QUERY_MAX_COST', '50000'))
+QUERY_MAX_ROWS = int(os.getenv('FOOTBALL_QUERY_MAX_ROWS', '200'))
+# SQLite has no planner cost estimates: a query is stopped once it has run
+# this many virtual machine instructions per unit of QUERY_MAX_COST (about
+# what the same work costs in the Postgres planner's units)
+SQLITE_STEPS_PER_COST = 100
+SQLITE_PROGRESS_STEPS = 1000
+
+class QueryRejected(Exception):
+    """A query refused before it ran (not read-only, or too expensive)"""
+
+class QueryResult(NamedTuple):
+    columns: List[str]
+    rows: List[tuple]
+    truncated: bool = False
+    error: Optional[Exception] = None
+
+def using_sqlite() -> bool:
+    return BACKEND == 'sqlite'
+
+def connect(**overrides):
+    """Open a standalone connection (used by the import scripts)"""
+    if using_sqlite():
+        return sqlite_backend.connect(SQLITE_PATH)
+    return psycopg2.connect(**{**DB_CONFIG, **overrides})
+
+def table_columns(cur, table: str) -> List[str]:
+    """Column names of table, lowercase as Postgres reports unquoted names"""
+    if using_sqlite():
+        cur.execute(f"PRAGMA table_info({table})")
+        return [row[1].lower() for row in cur.fetchall()]
+    cur.execute(
+        """
+        SELECT lower(column_name) FROM information_schema.columns
+        WHERE table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (table,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+class FootballDatabase:
+    """Thread-safe connection pool with prepared statement support.
+
+    Connections run in autocommit mode and are returned to the pool after
+    every call, so a failed statement never leaves a connection in an
+    aborted transaction. A connection that turns out to be broken is
+    discarded and the call is retried once on a fresh one.
+    """
+    def __init__(self, minconn: int = 1, maxconn: int = POOL_SIZE, **config):
+        self.config = {**DB_CONFIG, **config}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statements: Dict[str, tuple] = {}
+        self._pool = None
+        self._lock = threading.Lock()
+        # ThreadedConnectionPool raises when exhausted; make callers wait instead
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(
+                    self.minconn, self.maxconn,
+                    connection_factory=PooledConnection, **self.config
+                )
+            return self._pool
+
+    def _getconn(self):
+        self._slots.acquire()
+        try:
+            conn = self._get_pool().getconn()
+            if not conn.autocommit:
+                conn.autocommit = True
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _putconn(self, conn, close: bool = False):
+        try:
+            if self._pool is not None:
+                self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def run(self, work):
+        """Call work(conn) with a pooled connection and return its result"""
+        for attempt in range(2):
+            conn = self._getconn()
+            try:
+                result = work(conn)
+            except Exception:
+                if conn.closed and attempt == 0:
+                    # Server restarted or the connection was dropped
+                    self._putconn(conn, close=True)
+                    continue
+                if not conn.closed and conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+                self._putconn(conn)
+                raise
+            self._putconn(conn)
+            return result
+
+    @contextmanager
+    def cursor(self):
+        """Cursor on a pooled connection, for multi-statement work"""
+        conn = self._getconn()
+        try:
+            with conn.cursor() as cur:
+                yield cur
+        except Exception:
+            if not conn.closed and conn.status != psycopg2.extensions.STATUS_READY:
+                conn.rollback()
+            raise
+        finally:
+            self._putconn(conn)
+
+    def fetch_with_columns(self, query: str, params: Optional[Sequence[Any]] = None) -> Tuple[List[str], List[tuple]]:
+        """(column names, rows) of a query"""
+        def work(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                if cur.description is None:
+                    return [], []
+                return [column.name for column in cur.description], cur.fetchall()
+        return self.run(work)
+
+    def fetchall(self, query: str, params: Optional[Sequence[Any]] = None) -> List[tuple]:
+        return self.fetch_with_columns(query, params)[1]
+
+    def fetchone(self, query: str, params: Optional[Sequence[Any]] = None) -> Optional[tuple]:
+        rows = self.fetchall(query, params)
+        return rows[0] if rows else None
+
+    def fetch_guarded(self, query: str, params: Optional[Sequence[Any]] = None,
+                      timeout_ms: int = QUERY_TIMEOUT_MS, max_cost: float = QUERY_MAX_COST,
+                      max_rows: int = QUERY_MAX_ROWS) -> Tuple[List[str], List[tuple], bool]:
+        """Run an untrusted query: a single read-only statement, in a
+        read-only transaction with a statement timeout, refused if the
+        planner's cost estimate exceeds max_cost, and read through a
+        server-side cursor that stops after max_rows.
+
+        Returns (column names, rows, truncated).
+        """
+        query = check_read_only(query)
+
+        def work(conn):
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET TRANSACTION READ ONLY")
+                    cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+                    cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                    plan = cur.fetchone()[0]
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    cost = plan[0]['Plan']['Total Cost']
+                    if cost > max_cost:
+                        raise QueryRejected(f"Query too expensive (estimated cost {cost:.0f}, limit {max_cost:.0f})")
+                with conn.cursor(name='guarded_query') as cur:
+                    cur.itersize = max_rows + 1
+                    cur.execute(query, params)
+                    rows = cur.fetchmany(max_rows + 1)
+                    columns = [column.name for column in cur.description] if cur.description else []
+                return columns, rows[:max_rows], len(rows) > max_rows
+            finally:
+                # Nothing to commit: end the transaction and restore autocommit
+                if not conn.closed:
+                    conn.rollback()
+                    conn.autocommit = True
+        return self.run(work)
+
+    def register_statement(self, name: str, query: str, types: Sequence[str] = ()):
+        """Register a fixed query (using $1, $2, ... placeholders) to be
+        prepared server-side the first time each connection runs it"""
+        self.statements[name] = (query, tuple(types))
+
+    def execute_prepared(self, name: str, params: Sequence[Any] = ()) -> List[tuple]:
+        query, types = self.statements[name]
+
+        def work(conn):
+            with conn.cursor() as cur:
+                if name not in conn.prepared:
+                    type_list = f" ({', '.join(types)})" if types else ""
+                    cur.execute(f"PREPARE {name}{type_list} AS {query}")
+                    conn.prepared.add(name)
+                if params:
+                    placeholders = ', '.join(['%s'] * len(params))
+                    cur.execute(f"EXECUTE {name} ({placeholders})", list(params))
+                else:
+                    cur.execute(f"EXECUTE {name}")
+                return cur.fetchall()
+        return self.run(work)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+class SQLiteDatabase(FootballDatabase):
+    """FootballDatabase over an embedded SQLite file (FOOTBALL_DB_BACKEND=sqlite).
+
+    Every thread keeps its own connection, and queries written for
+    Postgres are translated by sqlite_backend. sqlite3 keeps the compiled
+    form of recent statements per connection, which stands in for PREPARE.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or SQLITE_PATH
+        self.statements: Dict[str, tuple] = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _getconn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = self._local.conn = sqlite_backend.connect(self.path)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def run(self, work):
+        conn = self._getconn()
+        try:
+            result = work(conn)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        # Same as Postgres autocommit: nothing stays open between calls
+        if conn.in_transaction:
+            conn.commit()
+        return result
+
+    @contextmanager
+    def cursor(self):
+        conn = self._getconn()
+        try:
+            with conn.cursor() as cur:
+                yield cur
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        if conn.in_transaction:
+            conn.commit()
+
+    def fetch_guarded(self, query: str, params: Optional[Sequence[Any]] = None,
+                      timeout_ms: int = QUERY_TIMEOUT_MS, max_cost: float = QUERY_MAX_COST,
+                      max_rows: int = QUERY_MAX_ROWS) -> Tuple[List[str], List[tuple], bool]:
+        """Like FootballDatabase.fetch_guarded(), but SQLite has no cost
+        estimates: instead of being refused up front, a query is stopped
+        once its work exceeds max_cost (see SQLITE_STEPS_PER_COST)"""
+        query = check_read_only(query)
+
+        def work(conn):
+            deadline = time.monotonic() + timeout_ms / 1000
+            budget = max_cost * SQLITE_STEPS_PER_COST / SQLITE_PROGRESS_STEPS
+            progress = {'calls': 0, 'stopped': None}
+
+            def check():
+                progress['calls'] += 1
+                if progress['calls'] > budget:
+                    progress['stopped'] = 'cost'
+                elif time.monotonic() > deadline:
+                    progress['stopped'] = 'timeout'
+                return progress['stopped'] is not None
+
+            conn.raw.set_progress_handler(check, SQLITE_PROGRESS_STEPS)
+            conn.raw.execute("PRAGMA query_only = ON")
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
+                    rows = cur.fetchmany(max_rows + 1)
+                    columns = [column.name for column in cur.description] if cur.description else []
+                return columns, rows[:max_rows], len(rows) > max_rows
+            except sqlite3.OperationalError as e:
+                if str(e) == 'interrupted' and progress['stopped'] == 'cost':
+                    raise QueryRejected(f"Query too expensive (more work than cost limit {max_cost:.0f})") from e
+                if str(e) == 'interrupted':
+                    raise sqlite3.OperationalError(
+                        f"canceling statement due to statement timeout ({timeout_ms} ms)") from e
+                raise
+            finally:
+                conn.raw.set_progress_handler(None, 0)
+                conn.raw.execute("PRAGMA query_only = OFF")
+        return self.run(work)
+
+    def execute_prepared(self, name: str, params: Sequence[Any] = ()) -> List[tuple]:
+        query, _ = self.statements[name]
+
+        def work(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, list(params))
+                return cur.fetchall()
+        return self.run(work)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+# Process-wide pool shared by the chatbot and both assistants
+_database = None
+_database_lock = threading.Lock()
+
+def get_database() -> FootballDatabase:
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = SQLiteDatabase() if using_sqlite() else FootballDatabase()
+        return _database
+
+def close_database():
+    global _database
+    with _database_lock:
+        if _database is not None:
+            _database.close()
+            _database = None
+
+def get_data_version(db: Optional[FootballDatabase] = None) -> Optional[int]:
+    """Current data version (bumped by every import), or None if the
+    database predates the data_version table"""
+    try:
+        row = (db or get_database()).fetchone("SELECT version FROM data_version WHERE id = 1")
+    except psycopg2.errors.UndefinedTable:
+        return None
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            return None
+        raise
+    return row[0] if row else None
+
+class FootballDatabaseManager:
+    """Query helper used by the LLM assistants"""
+    def __init__(self, db: Optional[FootballDatabase] = None):
+        self.db = db or get_database()
+        # Error raised by the most recent execute_query(), if any
+        self.last_error: Optional[Exception] = None
+
+    def run_query(self, query: str, params: tuple = None) -> Tuple[List[tuple], Optional[Exception]]:
+        """Like execute_query(), but returns (rows, error) instead of
+        printing, for callers running queries concurrently"""
+        try:
+            return self.db.fetchall(query, params), None
+        except Exception as e:
+            return [], e
+
+    def run_guarded_query(self, query: str, params: tuple = None) -> QueryResult:
+        """Run model-generated SQL under FootballDatabase.fetch_guarded()'s
+        limits; errors (including rejections) are returned, not raised"""
+        try:
+            return QueryResult(*self.db.fetch_guarded(query, params))
+        except Exception as e:
+            return QueryResult([], [], False, e)
+
+    def execute_query(self, query: str, params: tuple = None) -> List[tuple]:
+        rows, self.last_error = self.run_query(query, params)
+        if self.last_error is not None:
+            print(f"Database error: {self.last_error}")
+        return rows
+
+    def get_column_names(self) -> List[str]:
+        """Get all column names from team_statistics table"""
+        def work(conn):
+            with conn.cursor() as cur:
+                return table_columns(cur, 'team_statistics')
+        try:
+            return self.db.run(work)
+        except Exception as e:
+            self.last_error = e
+            print(f"Database error: {e}")
+            return []
+
+    def close(self):
+        # Connections go back to the pool after every query; the shared pool
+        # itself is closed with close_database()
+        pass
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+from football_chatbot import FootballChatbot
+from football_db import POOL_SIZE, close_database
+from metrics import metrics
+
+MAX_BODY = 64 * 1024
+MAX_QUESTION = 1000
+# Seconds an idle keep-alive connection is kept open
+IDLE_TIMEOUT = 15.0
+
+class BadRequest(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def encode_response(status: int, payload, keep_alive: bool,
+                    extra_headers: Optional[Dict[str, str]] = None) -> bytes:
+    # A dict is sent as JSON, a string as plain text
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+    headers = {
+        'Content-Type': content_type,
+        'Content-Length': str(len(body)),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+        **(extra_headers or {}),
+    }
+    head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+    head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return (head + "\r\n").encode('latin-1') + body
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """(method, path, headers, body) of the next request, or None at end of stream"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise BadRequest(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise BadRequest(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise BadRequest(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+class FootballService:
+    """HTTP/JSON front-end for the chatbot (and optionally an LLM assistant).
+
+    POST /query {"question": "..."} answers through
+    FootballChatbot.process_query on a bounded thread pool, so at most
+    `workers` questions use database connections at once. Up to
+    `max_pending` questions may be admitted; beyond that requests get 503
+    with Retry-After so a load balancer can go elsewhere. Each question has
+    `timeout` seconds before the client gets 504. SIGTERM/SIGINT stop
+    accepting connections, let admitted questions finish (up to
+    `grace_period` seconds) and close the database pool.
+
+    With {"assistant": true} (and an assistant configured) the question goes
+    to AsyncFootballAssistant instead; "mode" selects its answer phrasing.
+    """
+    def __init__(self, chatbot: FootballChatbot, assistant=None, workers: int = POOL_SIZE,
+                 max_pending: Optional[int] = None, timeout: float = 10.0, grace_period: float = 30.0):
+        self.chatbot = chatbot
+        self.assistant = assistant
+        self.workers = workers
+        self.max_pending = max_pending or workers * 50
+        self.timeout = timeout
+        self.grace_period = grace_period
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='football-worker')
+        self.pending = 0
+        self.draining = False
+        self.counters = {'served': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+        self._connections = set()
+        if assistant is not None:
+            # The assistant's database work shares the bounded pool
+            assistant.executor = self.executor
+        self._stopping = None
+        self._loop = None
+
+    def _release(self, _=None):
+        self.pending -= 1
+
+    async def _run(self, question: str, payload: Dict[str, Any]) -> str:
+        # The slot is freed when the work finishes, not when the client
+        # gives up, so a timed-out question still counts as load
+        loop = asyncio.get_running_loop()
+        if payload.get('assistant'):
+            task = asyncio.ensure_future(
+                self.assistant.answer_question_async(question, payload.get('mode', 'auto'))
+            )
+            task.add_done_callback(self._release)
+            # Shielded: a timeout must not cancel the task and free its slot early
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+
+        future = self.executor.submit(self.chatbot.process_query, question)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    async def query(self, body: bytes) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise BadRequest(400, "Body must be JSON")
+        question = payload.get('question') if isinstance(payload, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            raise BadRequest(400, "Missing 'question'")
+        if len(question) > MAX_QUESTION:
+            raise BadRequest(400, f"Question longer than {MAX_QUESTION} characters")
+        if payload.get('assistant') and self.assistant is None:
+            raise BadRequest(400, "The LLM assistant is not enabled on this server")
+
+        if self.draining:
+            return 503, {'error': "Server is shutting down"}, {'Retry-After': '1'}
+        if self.pending >= self.max_pending:
+            self.counters['rejected'] += 1
+            return 503, {'error': "Server busy, try again shortly"}, {'Retry-After': '1'}
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            answer = await self._run(question.strip(), payload)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            return 504, {'error': f"No answer within {self.timeout:g}s"}, {}
+        except Exception as e:
+            self.counters['errors'] += 1
+            print(f"Service error: {e}")
+            return 500, {'error': "Internal error"}, {}
+        self.counters['served'] += 1
+        elapsed_ms = 1000 * (time.perf_counter() - start)
+        metrics.observe('service.request_ms', elapsed_ms)
+        return 200, {'answer': answer, 'elapsed_ms': round(elapsed_ms, 2)}, {}
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {**self.counters, 'pending': self.pending, 'max_pending': self.max_pending,
+                 'workers': self.workers, 'connections': len(self._connections), 'draining': self.draining}
+        if self.chatbot.cache is not None:
+            stats['cache'] = self.chatbot.cache.stats()
+        stats['metrics'] = metrics.snapshot()
+        return stats
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        if path == '/query':
+            if method != 'POST':
+                return 405, {'error': "Use POST"}, {'Allow': 'POST'}
+            return await self.query(body)
+        if path == '/health' and method == 'GET':
+            if self.draining:
+                return 503, {'status': 'draining'}, {}
+            return 200, {'status': 'ok'}, {}
+        if path == '/stats' and method == 'GET':
+            return 200, self.stats(), {}
+        if path == '/metrics' and method == 'GET':
+            return 200, metrics.to_text(), {}
+        return 404, {'error': "Not found"}, {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except BadRequest as e:
+                    writer.write(encode_response(e.status, {'error': str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                try:
+                    status, payload, extra = await self.dispatch(method, path, body)
+                except BadRequest as e:
+                    status, payload, extra = e.status, {'error': str(e)}, {}
+                keep_alive = headers.get('connection', '').lower() != 'close' and not self.draining
+                writer.write(encode_response(status, payload, keep_alive, extra))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def stop(self):
+        """Begin a graceful shutdown (also triggered by SIGTERM / SIGINT);
+        safe to call from any thread"""
+        if self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def serve(self, host: str = '0.0.0.0', port: int = 8000, ready=None):
+        self._stopping = asyncio.Event()
+        loop = self._loop = asyncio.get_running_loop()
+        # A plain handler rather than loop.add_signal_handler(): under load
+        # the loop's wakeup pipe can be full and the signal would be lost
+        def on_signal(signum, frame):
+            loop.call_soon_threadsafe(self._stopping.set)
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                signal.signal(sig, on_signal)
+            except ValueError:
+                pass  # not on the main thread; use stop() instead
+
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"Serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+        if ready is not None:
+            ready(server)
+        await self._stopping.wait()
+
+        print("Shutting down: finishing admitted questions...")
+        self.draining = True
+        server.close()
+        deadline = time.monotonic() + self.grace_period
+        while self.pending > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        # Idle keep-alive connections would otherwise hold the server open
+        for writer in list(self._connections):
+            writer.close()
+        await server.wait_closed()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.assistant is not None:
+            await self.assistant.aclose()
+        close_database()
+        print("Stopped.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for the Turkish Football League chatbot")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=POOL_SIZE,
+                        help="Questions answered at once (default: the database pool size)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="Questions admitted before answering 503 (default: 50 per worker)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Seconds per question before 504")
+    parser.add_argument('--engine', action='store_true',
+                        help="Answer from an in-memory copy of the database")
+    parser.add_argument('--offline', metavar='JSON_FILE', nargs='?', const='turkish_football_data.json',
+                        help="Answer from the JSON data file, without a database server")
+    parser.add_argument('--snapshot', metavar='SNAPSHOT_FILE', nargs='?', const='turkish_football.snapshot',
+                        help="Answer from a snapshot written by snapshot.py, without a database server")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the answer cache")
+    parser.add_argument('--assistant', action='store_true',
+                        help="Also answer {\"assistant\": true} requests with GPT-4 (needs OPENAI_API_KEY)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cache = not args.no_cache
+    if args.offline or args.engine or args.snapshot:
+        # numpy is only imported when the in-memory engine is used
+        from stats_engine import StatsEngine
+    if args.snapshot:
+        chatbot = FootballChatbot(engine=StatsEngine.from_snapshot(args.snapshot), cache=cache)
+    elif args.offline:
+        chatbot = FootballChatbot(engine=StatsEngine.from_json(args.offline), cache=cache)
+    elif args.engine:
+        chatbot = FootballChatbot(engine=StatsEngine.from_database(), cache=cache)
+    else:
+        chatbot = FootballChatbot(cache=cache)
+
+    assistant = None
+    if args.assistant:
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            print("Please set the OPENAI_API_KEY environment variable.")
+            return
+        from llm_football_assistant import AsyncFootballAssistant
+        assistant = AsyncFootballAssistant(api_key, base_url=os.getenv('OPENAI_BASE_URL'))
+
+    service = FootballService(chatbot, assistant, workers=args.workers,
+                              max_pending=args.max_pending, timeout=args.timeout)
+    asyncio.run(service.serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
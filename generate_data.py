@@ -0,0 +1,141 @@
+import argparse
+import json
+import random
+from typing import Any, Dict, Iterator, List
+
+# Parts of generated team names
+CITY_PARTS = ['Ak', 'Bel', 'Çam', 'Der', 'Er', 'Gül', 'Kar', 'Kız', 'Mar', 'Nev', 'Or', 'Sar',
+              'Tek', 'Yıl', 'Zey', 'Bur', 'Ada', 'Kay', 'Ala', 'Ser']
+CITY_ENDINGS = ['kent', 'dağ', 'ova', 'köy', 'yurt', 'han', 'pınar', 'tepe', 'lı', 'çay', 'ören', 'şehir']
+CLUB_SUFFIXES = ['spor', ' FK', ' SK', ' Belediyespor', ' Gençlik', ' İdman Yurdu', 'gücü']
+
+# First ids of generated teams, seasons and statistics rows, well clear of
+# the real data's ids
+TEAM_ID_START = 900000
+SEASON_ID_START = 800000
+STATISTICS_ID_START = 700000
+
+def load_templates(path: str) -> List[Dict[str, Any]]:
+    """Real team-season statistics to derive synthetic ones from"""
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return [team['statistics'] for season in data for team in season['teams']]
+
+# Seasons are written as 'YY/YY', read back as 1950/51 to 2049/50 (see
+# seasons.season_start_year); more seasons back from 2024/25 would wrap
+LAST_SEASON_START = 2024
+MAX_SEASONS = LAST_SEASON_START - 1950 + 1
+
+def season_years(count: int, last_start: int = LAST_SEASON_START) -> List[str]:
+    """count seasons ending with last_start/last_start+1, newest first"""
+    if last_start - count + 1 < 1950 or last_start > 2049:
+        raise ValueError(f"{count} seasons back from {last_start} do not fit two-digit years (1950/51 to 2049/50)")
+    return [f"{(start % 100):02d}/{((start + 1) % 100):02d}"
+            for start in range(last_start, last_start - count, -1)]
+
+def team_names(rng: random.Random, count: int, taken: set) -> List[str]:
+    names = []
+    while len(names) < count:
+        name = rng.choice(CITY_PARTS) + rng.choice(CITY_ENDINGS) + rng.choice(CLUB_SUFFIXES)
+        if name not in taken:
+            taken.add(name)
+            names.append(name)
+    return names
+
+def synthesize(rng: random.Random, template: Dict[str, Any], strength: float, matches: int) -> Dict[str, Any]:
+    """Statistics shaped like template, scaled to the number of matches
+    and shifted by the team's strength (about 0.7 to 1.3)"""
+    scale = matches / max(template.get('matches') or matches, 1)
+    stats = {}
+    for key, value in template.items():
+        if value is None:
+            stats[key] = None
+            continue
+        lowered = key.lower()
+        if key == 'id':
+            continue  # assigned by generate()
+        if key == 'matches':
+            stats[key] = matches
+        elif 'percentage' in lowered or key == 'averageBallPossession':
+            shifted = value * (1 + (strength - 1) * 0.3) * rng.gauss(1, 0.03)
+            stats[key] = round(min(max(shifted, 0.0), 100.0), 3)
+        elif key == 'avgRating':
+            stats[key] = round(value + (strength - 1) * 0.4 + rng.gauss(0, 0.05), 2)
+        elif isinstance(value, float):
+            stats[key] = round(value * rng.gauss(1, 0.1), 3)
+        else:
+            # Counting statistics; conceding ones fall as strength rises
+            factor = 2 - strength if 'conceded' in lowered or 'against' in lowered else strength
+            stats[key] = max(0, round(value * scale * factor * rng.gauss(1, 0.1)))
+    return stats
+
+def generate(templates: List[Dict[str, Any]], leagues: int = 1, seasons: int = 10, teams: int = 20,
+             seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield season records in the format of turkish_football_data.json.
+    Records of the first league carry no "league" name, like the real
+    file, so they import as the default league; the others are named
+    "League 2", "League 3", ... Every league keeps its own clubs across
+    seasons."""
+    rng = random.Random(seed)
+    taken = set()
+    clubs = []
+    next_team_id = TEAM_ID_START
+    for league in range(leagues):
+        names = team_names(rng, teams, taken)
+        clubs.append([(str(next_team_id + i), name, rng.uniform(0.7, 1.3)) for i, name in enumerate(names)])
+        next_team_id += teams
+
+    matches = 2 * (teams - 1)
+    season_id = SEASON_ID_START
+    statistics_id = STATISTICS_ID_START
+    for year in season_years(seasons):
+        for league in range(leagues):
+            record = {'year': year, 'id': str(season_id)}
+            if league > 0:
+                record['league'] = f"League {league + 1}"
+            record['teams'] = []
+            for team_id, name, strength in clubs[league]:
+                # The importers keep the source's statistics id as the row id
+                stats = {'id': statistics_id, **synthesize(rng, rng.choice(templates), strength, matches)}
+                record['teams'].append({'name': name, 'id': team_id, 'statistics': stats})
+                statistics_id += 1
+            season_id += 1
+            yield record
+
+def write_data(path: str, records: Iterator[Dict[str, Any]]) -> int:
+    """Write season records as one JSON array, a season at a time, so
+    large datasets never have to fit in memory; returns the team-season count"""
+    rows = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[')
+        for i, record in enumerate(records):
+            if i:
+                file.write(',\n')
+            json.dump(record, file, ensure_ascii=False)
+            rows += len(record['teams'])
+        file.write(']\n')
+    return rows
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic football statistics in the import format")
+    parser.add_argument('--leagues', type=int, default=1)
+    parser.add_argument('--seasons', type=int, default=10, help=f"Seasons per league (at most {MAX_SEASONS})")
+    parser.add_argument('--teams', type=int, default=20, help="Teams per league")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--template', default='turkish_football_data.json',
+                        help="Real data the statistics are modelled on")
+    parser.add_argument('--output', default='synthetic_football_data.json')
+    args = parser.parse_args()
+    if args.seasons > MAX_SEASONS:
+        parser.error(f"--seasons can be at most {MAX_SEASONS}: two-digit season years would wrap")
+    return args
+
+def main():
+    args = parse_args()
+    templates = load_templates(args.template)
+    rows = write_data(args.output, generate(templates, args.leagues, args.seasons, args.teams, args.seed))
+    print(f"Wrote {rows} team-season records ({args.leagues} leagues x {args.seasons} seasons x "
+          f"{args.teams} teams) to {args.output}")
+
+if __name__ == "__main__":
+    main()
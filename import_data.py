@@ -1,22 +1,42 @@
+import argparse
+import csv
+import hashlib
+import io
 import json
-import psycopg2
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from psycopg2 import sql
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import execute_values
+from derived_metrics import (RANKED_METRICS, SEASON_METRICS_QUERY, ensure_ranks_table, rank_rows,
+                             rank_source_query, statistic_columns)
+from football_db import DB_CONFIG, SQLITE_PATH, connect, table_columns, using_sqlite
+from migrate_schema import migrate_schema
+from seasons import DEFAULT_LEAGUE_ID
+from sqlite_backend import translate_schema
 
 def create_database():
+    if using_sqlite():
+        # The database is a file: start from an empty one
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(SQLITE_PATH + suffix):
+                os.remove(SQLITE_PATH + suffix)
+        print("Database created successfully!")
+        return
+
     # Connect to PostgreSQL server
-    conn = psycopg2.connect(
-        dbname='postgres',
-        user='postgres',
-        password='postgres',
-        host='localhost'
-    )
+    conn = connect(dbname='postgres')
     conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
     cur = conn.cursor()
     
     # Create database if it doesn't exist
     try:
-        cur.execute("DROP DATABASE IF EXISTS turkish_football")
-        cur.execute("CREATE DATABASE turkish_football")
+        database = sql.Identifier(DB_CONFIG['dbname'])
+        cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(database))
+        cur.execute(sql.SQL("CREATE DATABASE {}").format(database))
         print("Database created successfully!")
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -26,18 +46,16 @@ def create_database():
 
 def apply_schema():
     # Connect to the new database
-    conn = psycopg2.connect(
-        dbname='turkish_football',
-        user='postgres',
-        password='postgres',
-        host='localhost'
-    )
+    conn = connect()
     cur = conn.cursor()
     
     try:
         # Read and execute the schema file
         with open('schema.sql', 'r') as file:
             schema_sql = file.read()
+        if using_sqlite():
+            cur.executescript(translate_schema(schema_sql))
+        else:
             cur.execute(schema_sql)
         conn.commit()
         print("Schema applied successfully!")
@@ -50,26 +68,25 @@ def apply_schema():
 
 def import_data():
     # Connect to the database
-    conn = psycopg2.connect(
-        dbname='turkish_football',
-        user='postgres',
-        password='postgres',
-        host='localhost'
-    )
+    conn = connect()
     cur = conn.cursor()
     
     try:
+        start = time.perf_counter()
+        row_count = 0
+
         # Read the JSON data
         with open('turkish_football_data.json', 'r') as file:
             data = json.load(file)
             
         # Import seasons
+        leagues = {}
         for season in data:
             cur.execute(
-                "INSERT INTO seasons (year) VALUES (%s) RETURNING id",
-                (season['year'],)
+                "INSERT INTO seasons (year, source_id, league_id) VALUES (%s, %s, %s) RETURNING id, start_year",
+                (season['year'], season.get('id'), league_id(cur, season, leagues))
             )
-            season_id = cur.fetchone()[0]
+            season_id, start_year = cur.fetchone()
             
             # Import teams and their statistics
             for team in season['teams']:
@@ -85,8 +102,10 @@ def import_data():
                 
                 # Insert team statistics
                 stats = team['statistics']
+                stats['stats_hash'] = statistics_hash(stats)
                 stats['season_id'] = season_id
                 stats['team_id'] = team['id']
+                stats['start_year'] = start_year
                 
                 # Create the dynamic SQL query
                 columns = ', '.join(stats.keys())
@@ -98,17 +117,693 @@ def import_data():
                     VALUES ({placeholders})
                 """
                 cur.execute(query, values)
+                row_count += 1
         
+        refresh_metrics(cur)
+        bump_data_version(cur)
+        conn.commit()
+        print("Data imported successfully!")
+        report_throughput(row_count, time.perf_counter() - start)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def ensure_database():
+    # Like create_database(), but keeps an existing database and its data
+    if using_sqlite():
+        if os.path.exists(SQLITE_PATH):
+            print("Database already exists, keeping existing data.")
+        return
+
+    conn = connect(dbname='postgres')
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+
+    try:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (DB_CONFIG['dbname'],))
+        if cur.fetchone():
+            print("Database already exists, keeping existing data.")
+        else:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(DB_CONFIG['dbname'])))
+            print("Database created successfully!")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+def statistics_hash(stats):
+    # Stable content hash of a team-season's source statistics
+    payload = json.dumps(
+        {key: value for key, value in stats.items() if key not in ('season_id', 'team_id', 'start_year', 'stats_hash')},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+def bump_data_version(cur):
+    # Tells caches and in-memory copies of the data that it has changed
+    cur.execute("UPDATE data_version SET version = version + 1, updated_at = now() WHERE id = 1")
+
+def refresh_derived_metrics(cur, season_ids=None):
+    # Rebuild team_season_metrics and team_statistic_ranks for the given
+    # seasons (all when None) in the caller's transaction, so readers see
+    # the metrics of the statistics they are derived from
+    statistics = statistic_columns(cur)
+    if ensure_ranks_table(cur, statistics):
+        season_ids = None
+    params = None if season_ids is None else [list(season_ids)]
+
+    def seasons(column):
+        return "TRUE" if season_ids is None else f"{column} = ANY(%s)"
+
+    for table in ('team_statistic_ranks', 'team_season_metrics'):
+        cur.execute(f"DELETE FROM {table} WHERE {seasons('season_id')}", params)
+    cur.execute(SEASON_METRICS_QUERY.format(seasons=seasons('ts.season_id')), params)
+    # One sort per statistic and season is far cheaper here than a window
+    # function per statistic over the whole table
+    cur.execute(rank_source_query(statistics, seasons('ts.season_id')), params)
+    copy_rows(cur, 'team_statistic_ranks', ['season_id', 'team_id', *statistics, *RANKED_METRICS],
+              rank_rows(cur.fetchall()))
+
+def refresh_metrics(cur):
+    start = time.perf_counter()
+    refresh_derived_metrics(cur)
+    print(f"Derived metrics refreshed in {time.perf_counter() - start:.2f}s")
+
+def report_throughput(row_count, elapsed):
+    rate = row_count / elapsed if elapsed > 0 else 0
+    print(f"Imported {row_count} statistics rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+def statistics_columns(rows):
+    # Union of statistic keys in first-seen order; seasons differ slightly
+    # in which statistics they carry, missing ones are loaded as NULL
+    columns = {}
+    for stats in rows:
+        for key in stats:
+            columns.setdefault(key, None)
+    return list(columns)
+
+def allocate_season_ids(cur, count):
+    # Reserve ids from the seasons sequence in one round-trip so that the
+    # seasons themselves can be written with COPY
+    if using_sqlite():
+        # One writer at a time: the ids after the current maximum are free
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM seasons")
+        first = cur.fetchone()[0] + 1
+        return list(range(first, first + count))
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence('seasons', 'id')) FROM generate_series(1, %s)",
+        (count,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+def league_ids(cur, names):
+    # League name -> id for the named leagues, adding the ones not seen
+    # before. Only one process adds leagues at a time (parallel imports
+    # resolve them before starting workers).
+    names = sorted({name for name in names if name})
+    if not names:
+        return {}
+    cur.execute("SELECT name, id FROM leagues WHERE name = ANY(%s)", (names,))
+    ids = dict(cur.fetchall())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM leagues")
+        first = cur.fetchone()[0] + 1
+        added = {name: first + i for i, name in enumerate(missing)}
+        insert_values(cur, "INSERT INTO leagues (name, id) VALUES %s", list(added.items()))
+        ids.update(added)
+    return ids
+
+def league_id(cur, season, leagues):
+    # Seasons whose source data names no league are Süper Lig seasons;
+    # leagues caches name -> id across calls
+    name = season.get('league')
+    if not name:
+        return DEFAULT_LEAGUE_ID
+    if name not in leagues:
+        leagues.update(league_ids(cur, [name]))
+    return leagues[name]
+
+def season_start_years(cur, season_ids):
+    # Season id -> start_year, the partition key of team_statistics
+    cur.execute("SELECT id, start_year FROM seasons WHERE id = ANY(%s)", (sorted(season_ids),))
+    return dict(cur.fetchall())
+
+def copy_rows(cur, table, columns, rows):
+    if using_sqlite():
+        # No COPY; executemany on an in-process database is just as direct
+        placeholders = ', '.join(['%s'] * len(columns))
+        cur.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        return
+    # Stage rows as CSV in memory and send them with a single COPY;
+    # None becomes an unquoted empty field, which COPY reads as NULL
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+def insert_values(cur, query, rows):
+    # execute_values() on Postgres; SQLite gets one parameter row per statement
+    if using_sqlite():
+        rows = list(rows)
+        if rows:
+            placeholders = ', '.join(['%s'] * len(rows[0]))
+            cur.executemany(query.replace('VALUES %s', f"VALUES ({placeholders})"), rows)
+        return
+    execute_values(cur, query, rows)
+
+def upsert_teams(cur, teams):
+    insert_values(
+        cur,
+        """
+        INSERT INTO teams (id, name)
+        VALUES %s
+        ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+        """,
+        list(teams.items())
+    )
+
+def load_seasons_bulk(cur, seasons):
+    season_ids = allocate_season_ids(cur, len(seasons))
+    leagues = league_ids(cur, (season.get('league') for season in seasons))
+    copy_rows(
+        cur, 'seasons', ['id', 'year', 'source_id', 'league_id'],
+        [(season_id, season['year'], season.get('id'), league_id(cur, season, leagues))
+         for season_id, season in zip(season_ids, seasons)]
+    )
+
+    # Later occurrences win, matching ON CONFLICT DO UPDATE in the row path
+    teams = {}
+    stats_rows = []
+    for season_id, season in zip(season_ids, seasons):
+        for team in season['teams']:
+            teams[team['id']] = team['name']
+            stats_rows.append((season_id, team['id'], team['statistics']))
+    if teams:
+        upsert_teams(cur, teams)
+
+    copy_statistics(cur, stats_rows)
+    return len(stats_rows)
+
+def copy_statistics(cur, stats_rows):
+    # stats_rows: (season_id, team_id, statistics dict) tuples; each row
+    # is routed to its partition by its season's start_year
+    start_years = season_start_years(cur, {season_id for season_id, _, _ in stats_rows})
+    columns = statistics_columns(stats for _, _, stats in stats_rows)
+    copy_rows(
+        cur, 'team_statistics', ['season_id', 'team_id', 'start_year', 'stats_hash'] + columns,
+        ([season_id, team_id, start_years[season_id], statistics_hash(stats)] +
+         [stats.get(column) for column in columns]
+         for season_id, team_id, stats in stats_rows)
+    )
+
+def import_data_bulk(path='turkish_football_data.json'):
+    # Same result as import_data(), but teams, seasons and statistics are
+    # each written in one batch inside a single transaction
+    conn = connect()
+    cur = conn.cursor()
+
+    try:
+        start = time.perf_counter()
+
+        with open(path, 'r') as file:
+            data = json.load(file)
+
+        row_count = load_seasons_bulk(cur, data)
+
+        refresh_metrics(cur)
+        bump_data_version(cur)
+        conn.commit()
+        print("Data imported successfully!")
+        report_throughput(row_count, time.perf_counter() - start)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def iter_seasons(path, chunk_size=1 << 16):
+    # Incrementally decode the top-level season array, holding at most one
+    # season (plus one read chunk) in memory at a time
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as file:
+        buffer = ''
+        pos = 0
+        eof = False
+        started = False
+        read_size = chunk_size
+
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','
+                                         or (not started and buffer[pos] == '[')):
+                if buffer[pos] == '[':
+                    started = True
+                pos += 1
+
+            if pos < len(buffer):
+                if not started:
+                    raise ValueError("Expected a JSON array of seasons")
+                if buffer[pos] == ']':
+                    return
+                try:
+                    season, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # Element spans past the buffer; read more, growing the
+                    # read size so very large elements are not re-decoded often
+                    read_size *= 2
+                else:
+                    yield season
+                    pos = end
+                    read_size = chunk_size
+                    continue
+            elif eof:
+                raise ValueError("Unexpected end of file in season array")
+
+            chunk = file.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def iter_records(path):
+    # Flatten the season array into (season, team, statistics) records
+    for season in iter_seasons(path):
+        header = {key: value for key, value in season.items() if key != 'teams'}
+        for team in season['teams']:
+            yield header, {'id': team['id'], 'name': team['name']}, team['statistics']
+
+def produce_batches(path, batches, stop, batch_size):
+    # Parser thread: hands fixed-size batches of records to the loader
+    try:
+        batch = []
+        for record in iter_records(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                if not put_batch(batches, batch, stop):
+                    return
+                batch = []
+        if batch and not put_batch(batches, batch, stop):
+            return
+        put_batch(batches, None, stop)
+    except Exception as e:
+        put_batch(batches, e, stop)
+
+def put_batch(batches, item, stop):
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def import_data_streaming(path='turkish_football_data.json', batch_size=1000, queue_size=4):
+    # Parses the file in a background thread while the main thread writes
+    # the previous batch, so parsing and database writes overlap; the
+    # bounded queue keeps memory flat regardless of file size
+    conn = connect()
+    cur = conn.cursor()
+
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    parser = threading.Thread(
+        target=produce_batches, args=(path, batches, stop, batch_size), daemon=True
+    )
+
+    try:
+        start = time.perf_counter()
+        row_count = 0
+        current_season = None
+        season_id = None
+        # Teams recur every season; re-upserting them inside one transaction
+        # only piles up row versions, so write each (id, name) once
+        written_teams = {}
+        leagues = {}
+
+        parser.start()
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+
+            teams = {}
+            stats_rows = []
+            for season, team, stats in batch:
+                season_key = (season['year'], season.get('id'))
+                if season_key != current_season:
+                    # Statistics already staged belong to the previous season
+                    flush_records(cur, teams, stats_rows, written_teams)
+                    teams, stats_rows = {}, []
+                    cur.execute(
+                        "INSERT INTO seasons (year, source_id, league_id) VALUES (%s, %s, %s) RETURNING id",
+                        (season['year'], season.get('id'), league_id(cur, season, leagues))
+                    )
+                    season_id = cur.fetchone()[0]
+                    current_season = season_key
+                teams[team['id']] = team['name']
+                stats_rows.append((season_id, team['id'], stats))
+            flush_records(cur, teams, stats_rows, written_teams)
+            row_count += len(batch)
+
+        refresh_metrics(cur)
+        bump_data_version(cur)
         conn.commit()
         print("Data imported successfully!")
+        report_throughput(row_count, time.perf_counter() - start)
     except Exception as e:
         print(f"An error occurred: {e}")
         conn.rollback()
     finally:
+        stop.set()
+        parser.join()
         cur.close()
         conn.close()
 
+def flush_records(cur, teams, stats_rows, written_teams):
+    teams = {team_id: name for team_id, name in teams.items()
+             if written_teams.get(team_id) != name}
+    if teams:
+        upsert_teams(cur, teams)
+        written_teams.update(teams)
+    if stats_rows:
+        copy_statistics(cur, stats_rows)
+
+def resolve_season(cur, season, leagues):
+    # Find the season by (year, source id), adopting a season row written
+    # before source ids were stored, or insert it
+    year, source_id = season['year'], season.get('id')
+    cur.execute(
+        "SELECT id FROM seasons WHERE year = %s AND source_id IS NOT DISTINCT FROM %s",
+        (year, source_id)
+    )
+    row = cur.fetchone()
+    if row:
+        return row[0], False
+
+    cur.execute(
+        """
+        UPDATE seasons SET source_id = %s
+        WHERE id = (SELECT id FROM seasons WHERE year = %s AND source_id IS NULL ORDER BY id LIMIT 1)
+        RETURNING id
+        """,
+        (source_id, year)
+    )
+    row = cur.fetchone()
+    if row:
+        return row[0], False
+
+    cur.execute(
+        "INSERT INTO seasons (year, source_id, league_id) VALUES (%s, %s, %s) RETURNING id",
+        (year, source_id, league_id(cur, season, leagues))
+    )
+    return cur.fetchone()[0], True
+
+def upsert_statistics(cur, table_columns, stats_rows):
+    # Every statistics column is written, so a statistic dropped from the
+    # source is cleared rather than left stale. table_columns are the
+    # folded (lowercase) names Postgres reports.
+    columns = [column for column in table_columns
+               if column not in ('season_id', 'team_id', 'start_year', 'stats_hash')]
+    update_columns = [column for column in columns if column != 'id']
+    start_years = season_start_years(cur, {season_id for season_id, _, _ in stats_rows})
+    insert_values(
+        cur,
+        f"""
+        INSERT INTO team_statistics (season_id, team_id, start_year, stats_hash, {', '.join(columns)})
+        VALUES %s
+        ON CONFLICT (season_id, team_id, start_year) DO UPDATE SET
+            stats_hash = EXCLUDED.stats_hash,
+            {', '.join(f'{column} = EXCLUDED.{column}' for column in update_columns)}
+        """,
+        [[season_id, team_id, start_years[season_id], statistics_hash(stats)] +
+         [values.get(column) for column in columns]
+         for season_id, team_id, stats, values in
+         ((season_id, team_id, stats, {key.lower(): value for key, value in stats.items()})
+          for season_id, team_id, stats in stats_rows)]
+    )
+
+def import_data_incremental(path='turkish_football_data.json'):
+    # Re-import without dropping the database: each season is applied in
+    # its own short transaction, and only team-season rows whose content
+    # hash changed are written. Readers keep seeing the previous rows
+    # until a season commits.
+    conn = connect()
+    cur = conn.cursor()
+
+    try:
+        start = time.perf_counter()
+        row_count = 0
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        seasons_changed = 0
+        seasons_total = 0
+
+        statistics_table_columns = table_columns(cur, 'team_statistics')
+        cur.execute("SELECT id, name FROM teams")
+        known_teams = dict(cur.fetchall())
+        leagues = {}
+        # Databases imported before the derived metrics existed get them
+        # for every season once; afterwards only changed seasons are rebuilt
+        cur.execute("SELECT (SELECT COUNT(*) FROM team_season_metrics) < (SELECT COUNT(*) FROM team_statistics)")
+        if cur.fetchone()[0]:
+            refresh_metrics(cur)
+        conn.commit()
+
+        for season in iter_seasons(path):
+            seasons_total += 1
+            season_id, created = resolve_season(cur, season, leagues)
+
+            cur.execute(
+                "SELECT team_id, stats_hash FROM team_statistics WHERE season_id = %s",
+                (season_id,)
+            )
+            existing = dict(cur.fetchall())
+
+            teams = {}
+            changed = []
+            for team in season['teams']:
+                row_count += 1
+                if known_teams.get(team['id']) != team['name']:
+                    teams[team['id']] = team['name']
+                stats = team['statistics']
+                if team['id'] not in existing:
+                    counts['inserted'] += 1
+                elif existing[team['id']] != statistics_hash(stats):
+                    counts['updated'] += 1
+                else:
+                    counts['unchanged'] += 1
+                    continue
+                changed.append((season_id, team['id'], stats))
+
+            if teams:
+                upsert_teams(cur, teams)
+            if changed:
+                upsert_statistics(cur, statistics_table_columns, changed)
+                refresh_derived_metrics(cur, [season_id])
+            if created or teams or changed:
+                seasons_changed += 1
+                bump_data_version(cur)
+            conn.commit()
+            known_teams.update(teams)
+
+        print("Data imported successfully!")
+        print(f"{seasons_changed} of {seasons_total} seasons changed: "
+              f"{counts['inserted']} rows inserted, {counts['updated']} updated, "
+              f"{counts['unchanged']} unchanged")
+        report_throughput(row_count, time.perf_counter() - start)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+# Per-process connection used by parallel import workers
+worker_conn = None
+
+def init_worker():
+    global worker_conn
+    worker_conn = connect()
+
+def load_seasons_worker(seasons):
+    # Load a batch of whole seasons in one transaction: either every season
+    # in the batch and all of its statistics are committed, or nothing is
+    cur = worker_conn.cursor()
+    keys = [(season['year'], season.get('id')) for season in seasons]
+    try:
+        season_ids = allocate_season_ids(cur, len(seasons))
+        # The leagues were all added before the workers started
+        leagues = league_ids(cur, (season.get('league') for season in seasons))
+        copy_rows(
+            cur, 'seasons', ['id', 'year', 'source_id', 'league_id'],
+            [(season_id, year, source_id, league_id(cur, season, leagues))
+             for season_id, (year, source_id), season in zip(season_ids, keys, seasons)]
+        )
+        stats_rows = [(season_id, team['id'], team['statistics'])
+                      for season_id, season in zip(season_ids, seasons)
+                      for team in season['teams']]
+        if stats_rows:
+            copy_statistics(cur, stats_rows)
+        worker_conn.commit()
+        return keys, len(stats_rows), None
+    except Exception as e:
+        worker_conn.rollback()
+        return keys, 0, str(e)
+    finally:
+        cur.close()
+
+def check_consistency(cur, expected):
+    # expected: {(year, source_id): team count}
+    cur.execute(
+        """
+        SELECT s.year, s.source_id, COUNT(ts.id)
+        FROM seasons s
+        LEFT JOIN team_statistics ts ON ts.season_id = s.id
+        GROUP BY s.id, s.year, s.source_id
+        """
+    )
+    actual = {}
+    for year, source_id, count in cur.fetchall():
+        key = (year, source_id)
+        actual[key] = actual.get(key, 0) + count
+    problems = []
+    for key, count in expected.items():
+        if actual.get(key) != count:
+            problems.append(f"season {key[0]} ({key[1]}): expected {count} rows, found {actual.get(key, 0)}")
+    for key in actual.keys() - expected.keys():
+        problems.append(f"season {key[0]} ({key[1]}): not in the source file")
+    return problems
+
+def import_data_parallel(path='turkish_football_data.json', workers=None, rows_per_task=1000):
+    # Teams are resolved up front, then seasons are fanned out to worker
+    # processes, each loading whole seasons over its own connection. Small
+    # seasons are grouped into tasks of about rows_per_task rows so that
+    # per-transaction overhead does not dominate.
+    workers = workers or os.cpu_count() or 1
+    conn = connect()
+    cur = conn.cursor()
+
+    try:
+        start = time.perf_counter()
+
+        # First pass: every team and league, so workers only insert
+        # seasons and statistics rows
+        teams = {}
+        league_names = set()
+        for season, team, _ in iter_records(path):
+            teams[team['id']] = team['name']
+            league_names.add(season.get('league'))
+        if teams:
+            upsert_teams(cur, teams)
+        league_ids(cur, league_names)
+        conn.commit()
+
+        # Second pass: stream seasons to the pool, keeping only a few in
+        # flight so memory stays bounded
+        expected = {}
+        failures = []
+        row_count = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            pending = set()
+            task = []
+            task_rows = 0
+            for season in iter_seasons(path):
+                key = (season['year'], season.get('id'))
+                expected[key] = expected.get(key, 0) + len(season['teams'])
+                task.append(season)
+                task_rows += len(season['teams'])
+                if task_rows < rows_per_task:
+                    continue
+                pending.add(pool.submit(load_seasons_worker, task))
+                task, task_rows = [], 0
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    row_count += collect_results(done, failures)
+            if task:
+                pending.add(pool.submit(load_seasons_worker, task))
+            row_count += collect_results(pending, failures)
+
+        elapsed = time.perf_counter() - start
+        if row_count:
+            refresh_metrics(cur)
+            bump_data_version(cur)
+            conn.commit()
+        for keys, error in failures:
+            seasons = ', '.join(f"{year} ({source_id})" for year, source_id in keys)
+            print(f"Seasons {seasons} failed: {error}")
+
+        problems = check_consistency(cur, expected)
+        if problems:
+            print("Consistency check failed:")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"Consistency check passed ({len(expected)} seasons).")
+            print("Data imported successfully!")
+        report_throughput(row_count, elapsed)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def collect_results(futures, failures):
+    row_count = 0
+    for future in futures:
+        keys, rows, error = future.result()
+        if error:
+            failures.append((keys, error))
+        row_count += rows
+    return row_count
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import Turkish football statistics into PostgreSQL "
+                                                 "(or SQLite with FOOTBALL_DB_BACKEND=sqlite)")
+    parser.add_argument(
+        '--mode', choices=['rows', 'bulk', 'stream', 'incremental', 'parallel'], default='rows',
+        help="rows: one INSERT per row (default); bulk: batched inserts and COPY; "
+             "stream: like bulk, but parses the file incrementally; "
+             "incremental: update an existing database in place, writing only changed rows; "
+             "parallel: load seasons concurrently from several worker processes"
+    )
+    parser.add_argument('--file', default='turkish_football_data.json', help="JSON data file (all modes except rows)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for parallel mode (default: CPU count)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    create_database()
-    apply_schema()
-    import_data() 
\ No newline at end of file
+    args = parse_args()
+    if args.mode == 'incremental':
+        ensure_database()
+        # Databases in the layout before leagues and partitioning are
+        # converted first; schema.sql assumes the current layout
+        migrate_schema()
+        apply_schema()
+        import_data_incremental(args.file)
+    else:
+        create_database()
+        apply_schema()
+        if args.mode == 'bulk':
+            import_data_bulk(args.file)
+        elif args.mode == 'stream':
+            import_data_streaming(args.file)
+        elif args.mode == 'parallel' and using_sqlite():
+            # SQLite takes one writer at a time, so workers would only queue
+            print("SQLite has a single writer; importing with the streaming loader instead.")
+            import_data_streaming(args.file)
+        elif args.mode == 'parallel':
+            import_data_parallel(args.file, args.workers)
+        else:
+            import_data()
\ No newline at end of file
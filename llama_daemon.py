@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SOCKET = os.getenv('FOOTBALL_LLAMA_SOCKET', '/tmp/football_llama.sock')
+DEFAULT_MODEL = "models/llama-2-7b-chat.Q4_K_M.gguf"
+# Longest request line accepted (prompts are a few KB)
+MAX_REQUEST = 1 << 20
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+
+@functools.lru_cache(maxsize=16)
+def compile_grammar(text: str):
+    # Clients send GBNF text; each distinct grammar is parsed once
+    from llama_cpp import LlamaGrammar
+    return LlamaGrammar.from_string(text, verbose=False)
+
+class LlamaDaemon:
+    """Serves one llama.cpp model to LocalFootballAssistant processes over
+    a Unix socket, so the model is loaded once instead of per process.
+
+    The weights are memory-mapped (use_mmap), so they stay in the page
+    cache across daemon restarts and are shared with any other process
+    mapping the same file; mlock keeps them from being paged out.
+    Evaluated prompt states are kept in a RAM cache shared by all clients.
+
+    Requests and responses are JSON lines:
+      {"op": "complete", "prompt", "max_tokens", "stop", "grammar", "stream"}
+          -> {"token": ...} per token when streaming, then {"text", "completion_tokens"}
+      {"op": "tokenize", "text"} -> {"tokens": n}
+      {"op": "warm", "prompt"}  -> {"warmed": true}, evaluating a prompt prefix once
+      {"op": "ping"}            -> {"model": path}
+    Failures are answered with {"error": ...}. The model runs one
+    completion at a time; requests from other clients wait their turn.
+    """
+    def __init__(self, model_path: str, n_ctx: int = 2048, temperature: float = 0.1,
+                 max_tokens: int = 2000, mlock: bool = False):
+        from llama_cpp import Llama, LlamaRAMCache
+        self.model_path = model_path
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, use_mmap=True, use_mlock=mlock, verbose=False)
+        self.llm.set_cache(LlamaRAMCache())
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='llama')
+        self.warmed = set()
+        self.counters = {'completions': 0, 'clients': 0, 'errors': 0}
+        self._stopping = None
+
+    def _complete(self, request: Dict[str, Any], emit: Callable[[Dict[str, Any]], None],
+                  cancelled: threading.Event) -> Dict[str, Any]:
+        grammar = request.get('grammar')
+        chunks = self.llm.create_completion(
+            request['prompt'],
+            max_tokens=request.get('max_tokens') or self.max_tokens,
+            stop=request.get('stop') or [],
+            temperature=self.temperature,
+            grammar=compile_grammar(grammar) if grammar else None,
+            stream=True,
+        )
+        tokens: List[str] = []
+        for chunk in chunks:
+            if cancelled.is_set():
+                break
+            token = chunk['choices'][0]['text']
+            tokens.append(token)
+            if request.get('stream'):
+                emit({'token': token})
+        self.counters['completions'] += 1
+        return {'text': ''.join(tokens), 'completion_tokens': len(tokens)}
+
+    def _warm(self, prompt: str) -> Dict[str, Any]:
+        if prompt not in self.warmed:
+            self.llm.create_completion(prompt, max_tokens=1)
+            self.warmed.add(prompt)
+        return {'warmed': True}
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def respond(self, request: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        op = request.get('op')
+        if op == 'complete':
+            loop = asyncio.get_running_loop()
+            cancelled = threading.Event()
+            def write_token(message):
+                # Stop generating for a client that went away
+                if writer.is_closing():
+                    cancelled.set()
+                else:
+                    writer.write(encode(message))
+            def emit(message):
+                loop.call_soon_threadsafe(write_token, message)
+            try:
+                return await self._run(self._complete, request, emit, cancelled)
+            finally:
+                cancelled.set()
+        if op == 'tokenize':
+            # The vocabulary is read-only, so this does not wait for the model
+            return {'tokens': len(self.llm.tokenize(request['text'].encode('utf-8')))}
+        if op == 'warm':
+            return await self._run(self._warm, request['prompt'])
+        if op == 'ping':
+            return {'model': self.model_path, **self.counters}
+        return {'error': f"Unknown op: {op!r}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.counters['clients'] += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    response = await self.respond(request, writer)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {'error': f"Bad request: {e}"}
+                except Exception as e:
+                    self.counters['errors'] += 1
+                    print(f"Daemon error: {e}")
+                    response = {'error': str(e)}
+                # Streamed tokens were written in order before this
+                writer.write(encode(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = DEFAULT_SOCKET):
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(self._stopping.set))
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # left behind by a daemon that did not shut down
+        server = await asyncio.start_unix_server(self.handle, socket_path, limit=MAX_REQUEST)
+        os.chmod(socket_path, 0o600)
+        print(f"Serving {self.model_path} on {socket_path}")
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            print("Stopped.")
+
+class LlamaDaemonClient:
+    """The part of the LangChain LLM interface LocalFootballAssistant uses
+    (invoke, get_num_tokens), answered by a running llama_daemon.py.
+
+    Only the standard library is imported, so a client process starts
+    without langchain, llama_cpp or the model. Streamed tokens are written
+    to `stream_to` as they arrive, like LangChain's stdout callback.
+    """
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, stream_to=sys.stdout,
+                 timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.stream_to = stream_to
+        self.timeout = timeout
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"No model daemon at {self.socket_path} "
+                                  f"(start it with: python llama_daemon.py): {e}")
+        self._file = sock.makefile('rwb')
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if self._file is None:
+                self._connect()
+            try:
+                self._file.write(encode(payload))
+                self._file.flush()
+                while True:
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("The model daemon closed the connection")
+                    message = json.loads(line)
+                    if 'token' not in message:
+                        break
+                    if self.stream_to is not None:
+                        self.stream_to.write(message['token'])
+                        self.stream_to.flush()
+            except (OSError, ValueError):
+                self.close()
+                raise
+        if 'error' in message:
+            raise RuntimeError(f"Model daemon: {message['error']}")
+        return message
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, max_tokens: Optional[int] = None,
+               grammar: Optional[str] = None) -> str:
+        return self.request({'op': 'complete', 'prompt': prompt, 'stop': stop, 'max_tokens': max_tokens,
+                             'grammar': grammar, 'stream': self.stream_to is not None})['text']
+
+    def get_num_tokens(self, text: str) -> int:
+        return self.request({'op': 'tokenize', 'text': text})['tokens']
+
+    def warm(self, prompt: str):
+        self.request({'op': 'warm', 'prompt': prompt})
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve a local Llama model to football assistant clients "
+                                                 "over a Unix socket")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="GGUF model file")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help="Socket path (default: $FOOTBALL_LLAMA_SOCKET or /tmp/football_llama.sock)")
+    parser.add_argument('--n-ctx', type=int, default=2048, help="Context size in tokens")
+    parser.add_argument('--mlock', action='store_true', help="Lock the model weights in RAM")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print(f"Loading {args.model}...")
+    daemon = LlamaDaemon(args.model, n_ctx=args.n_ctx, mlock=args.mlock)
+    asyncio.run(daemon.serve(args.socket))
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,49 @@
+import argparse
+import asyncio
 import os
-import psycopg2
-from openai import OpenAI
-import json
-from typing import Dict, Any, List
-
-class FootballDatabaseManager:
-    def __init__(self):
-        self.conn = psycopg2.connect(
-            dbname='turkish_football',
-            user='postgres',
-            password='postgres',
-            host='localhost'
-        )
-        self.cur = self.conn.cursor()
-
-    def execute_query(self, query: str, params: tuple = None) -> List[tuple]:
-        try:
-            if params:
-                self.cur.execute(query, params)
-            else:
-                self.cur.execute(query)
-            return self.cur.fetchall()
-        except Exception as e:
-            print(f"Database error: {e}")
-            return []
-
-    def get_column_names(self) -> List[str]:
-        """Get all column names from team_statistics table"""
-        query = """
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'team_statistics'
-        ORDER BY ordinal_position;
-        """
-        return [col[0] for col in self.execute_query(query)]
-
-    def close(self):
-        self.cur.close()
-        self.conn.close()
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from derived_metrics import KEY_COLUMNS
+from football_chatbot import FootballChatbot
+from football_db import FootballDatabaseManager, close_database
+from metrics import EXPORT_FORMATS, count, fail, metrics, note, stage
+from question_router import QuestionRouter
+from result_renderer import ANSWER_MODES, encode_result, render_answer
+from sql_cache import SQLCache, normalize_question, schema_version
+from team_resolver import TeamResolver
 
 class FootballAssistant:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    # Tokens of query results allowed in the response prompt
+    result_token_budget = 1500
+
+    def __init__(self, api_key: str, sql_cache_path: Optional[str] = 'sql_cache.sqlite3',
+                 base_url: Optional[str] = None, router: bool = True):
+        # base_url points the client at another chat-completions endpoint,
+        # e.g. the local stub in openai_stub.py
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
         self.db = FootballDatabaseManager()
+        # Questions the rule-based chatbot understands skip the model entirely
+        self.router = QuestionRouter(FootballChatbot(db=self.db.db)) if router else None
         
-        # Get available columns for context
+        # Get available columns for context; the prompt lists only the
+        # statistics, not the key columns
         self.available_columns = self.db.get_column_names()
+        self.statistic_columns = [column for column in self.available_columns if column not in KEY_COLUMNS]
+
+        # Previously validated SQL, by normalized question; keyed to the
+        # column list so a schema change invalidates it
+        self.resolver = TeamResolver.from_database(self.db.db)
+        self.sql_cache = None
+        if sql_cache_path:
+            self.sql_cache = SQLCache(sql_cache_path, schema_version(self.available_columns))
         
         # System prompt that explains the assistant's capabilities
         self.system_prompt = f"""
         You are a Turkish Football League expert with access to a comprehensive database.
         The database contains detailed statistics for teams including:
-        {', '.join(self.available_columns)}
+        {', '.join(self.statistic_columns)}
 
         Your task is to:
         1. Analyze user questions about Turkish football
@@ -67,36 +59,49 @@ class FootballAssistant:
         - Use appropriate statistical comparisons when relevant
         """
 
-    def generate_sql_query(self, user_question: str) -> str:
+    @property
+    def client(self):
+        # openai is imported with the first model call, so questions the
+        # router answers never pay for it
+        if self._client is None:
+            self._client = self.create_client(self.api_key, self.base_url)
+        return self._client
+
+    def create_client(self, api_key: str, base_url: Optional[str]):
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, base_url=base_url)
+
+    def sql_messages(self, user_question: str) -> List[Dict[str, str]]:
         prompt = f"""
         Based on the user's question, generate a SQL query to fetch the relevant data.
-        The database has tables: seasons, teams, and team_statistics with relationships:
+        The database has tables: leagues, seasons, teams, and team_statistics with relationships:
         - team_statistics.team_id references teams.id
         - team_statistics.season_id references seasons.id
+        - seasons.league_id references leagues.id (leagues: id, name, country)
+        Seasons have a year like '24/25' and an integer start_year (2024); order seasons by start_year,
+        which team_statistics also carries.
+        Precomputed per team and season (same season_id / team_id keys):
+        - team_season_metrics: goal_difference, goals_per_match, conceded_per_match, shots_per_match,
+          shot_conversion, big_chance_conversion, shots_on_target_percentage, clean_sheet_percentage, league_position
+        - team_statistic_ranks: the same columns as team_statistics and team_season_metrics, each holding
+          the team's rank in that season (1 = highest)
 
         User question: {user_question}
 
         Return only the SQL query without any explanation.
         """
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
 
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0
-        )
-        
-        return response.choices[0].message.content.strip()
-
-    def generate_natural_response(self, user_question: str, query_results: List[tuple], query: str) -> str:
+    def response_messages(self, user_question: str, query_results: str, query: str) -> List[Dict[str, str]]:
         prompt = f"""
         Generate a natural language response to the user's question using the query results.
         
         User question: {user_question}
         Query executed: {query}
-        Query results: {json.dumps(query_results)}
+        Query results: {query_results}
 
         Provide a detailed, informative response that:
         1. Directly answers the user's question
@@ -104,36 +109,251 @@ class FootballAssistant:
         3. Adds insights where appropriate
         4. Uses natural, conversational language
         """
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def record_usage(response, trace=None):
+        # Token counts reported by the API, added to trace (by default the
+        # current one)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            add = trace.add if trace is not None else note
+            add('prompt_tokens', usage.prompt_tokens)
+            add('completion_tokens', usage.completion_tokens)
+
+    def generate_sql_query(self, user_question: str) -> str:
+        response = self.client.chat.completions.create(
+            model="gpt-4",
+            messages=self.sql_messages(user_question),
+            temperature=0
+        )
+        self.record_usage(response)
+        
+        return response.choices[0].message.content.strip()
 
+    def generate_natural_response(self, user_question: str, query_results: str, query: str) -> str:
         response = self.client.chat.completions.create(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-            ]
+            messages=self.response_messages(user_question, query_results, query)
         )
+        self.record_usage(response)
         
         return response.choices[0].message.content.strip()
 
-    def answer_question(self, question: str) -> str:
+    def cached_sql(self, question: str) -> Tuple[str, Optional[str]]:
+        """Return (cache key, previously validated SQL or None)"""
+        cache_key = normalize_question(question, self.resolver)
+        return cache_key, self.sql_cache.get(cache_key) if self.sql_cache else None
+
+    def remember_sql(self, cache_key: str, sql_query: str, error: Optional[Exception]):
+        # Only SQL that ran successfully is cached
+        if (self.sql_cache and error is None
+                and sql_query.lstrip().lower().startswith(('select', 'with'))):
+            self.sql_cache.put(cache_key, sql_query)
+
+    def answer_question(self, question: str, mode: str = 'auto') -> str:
+        # Stages: route, sql_cache, sql_generation, query, render, response_generation
+        with metrics.trace('assistant', question):
+            if self.router is not None:
+                return self.router.answer(question, lambda question: self.answer_with_llm(question, mode))
+            return self.answer_with_llm(question, mode)
+
+    def answer_with_llm(self, question: str, mode: str = 'auto') -> str:
         try:
+            # Reuse SQL generated for the same (normalized) question before
+            with stage('sql_cache'):
+                cache_key, sql_query = self.cached_sql(question)
+            cached = sql_query is not None
+            count('sql_cache_hits' if cached else 'sql_cache_misses')
+
             # Generate SQL query
-            sql_query = self.generate_sql_query(question)
+            if not cached:
+                with stage('sql_generation'):
+                    sql_query = self.generate_sql_query(question)
             
-            # Execute query and get results
-            results = self.db.execute_query(sql_query)
+            # Execute query (read-only, time- and cost-limited) and get results
+            with stage('query'):
+                result = self.db.run_guarded_query(sql_query)
+            note('rows', len(result.rows))
+            if result.error is not None:
+                print(f"Database error: {result.error}")
+                fail(result.error)
+            if not cached:
+                self.remember_sql(cache_key, sql_query, result.error)
+
+            # Small, plain results are phrased by a template
+            with stage('render'):
+                answer = render_answer(question, result.columns, result.rows, result.error, mode)
+            if answer is not None:
+                count('template_answers')
+                return answer
             
             # Generate natural language response
-            response = self.generate_natural_response(question, results, sql_query)
+            with stage('response_generation'):
+                encoded = encode_result(result.columns, result.rows, result.truncated,
+                                        self.result_token_budget, error=result.error)
+                response = self.generate_natural_response(question, encoded, sql_query)
             
             return response
         except Exception as e:
+            fail(e)
             return f"I apologize, but I encountered an error: {str(e)}"
 
     def close(self):
         self.db.close()
+        if self.sql_cache:
+            self.sql_cache.close()
+
+class AsyncFootballAssistant(FootballAssistant):
+    """asyncio version of FootballAssistant.
+
+    Model calls use the async client, database and cache calls run in a
+    thread pool, and the answer is streamed token by token, so one process
+    can serve many questions concurrently (up to max_concurrency at once).
+    """
+    def __init__(self, api_key: str, sql_cache_path: Optional[str] = 'sql_cache.sqlite3',
+                 base_url: Optional[str] = None, max_concurrency: int = 16, router: bool = True):
+        super().__init__(api_key, sql_cache_path, base_url, router)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        # Thread pool for database and cache calls (None: the loop's default)
+        self.executor = None
+
+    def create_client(self, api_key: str, base_url: Optional[str]):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def _run_blocking(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def generate_sql_query_async(self, user_question: str, trace=None) -> str:
+        response = await self.client.chat.completions.create(
+            model="gpt-4",
+            messages=self.sql_messages(user_question),
+            temperature=0
+        )
+        self.record_usage(response, trace)
+        return response.choices[0].message.content.strip()
+
+    async def stream_natural_response(self, user_question: str, query_results: str,
+                                      query: str, trace=None) -> AsyncIterator[str]:
+        # The token counts arrive in a last chunk without choices
+        stream = await self.client.chat.completions.create(
+            model="gpt-4",
+            messages=self.response_messages(user_question, query_results, query),
+            stream=True,
+            stream_options={'include_usage': True}
+        )
+        async for chunk in stream:
+            self.record_usage(chunk, trace)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def stream_answer(self, question: str, mode: str = 'auto') -> AsyncIterator[str]:
+        """Yield the answer to question as it is generated"""
+        start = time.perf_counter()
+        # Traced explicitly: the trace would not follow the work into the
+        # thread pool, and a generator closed elsewhere could not reset it
+        trace = metrics.start('assistant', question)
+        try:
+            if self.router is not None:
+                with trace.stage('route'):
+                    answer = await self._run_blocking(self.router.route, question)
+                if answer is not None:
+                    trace.count('answered_by_rules')
+                    yield answer
+                    return
+
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            async with self._semaphore:
+                try:
+                    with trace.stage('sql_cache'):
+                        cache_key, sql_query = await self._run_blocking(self.cached_sql, question)
+                    cached = sql_query is not None
+                    trace.count('sql_cache_hits' if cached else 'sql_cache_misses')
+                    if not cached:
+                        with trace.stage('sql_generation'):
+                            sql_query = await self.generate_sql_query_async(question, trace)
+
+                    with trace.stage('query'):
+                        result = await self._run_blocking(self.db.run_guarded_query, sql_query)
+                    trace.add('rows', len(result.rows))
+                    if result.error is not None:
+                        print(f"Database error: {result.error}")
+                        trace.fail(result.error)
+                    if not cached:
+                        await self._run_blocking(self.remember_sql, cache_key, sql_query, result.error)
+
+                    with trace.stage('render'):
+                        answer = render_answer(question, result.columns, result.rows, result.error, mode)
+                    if answer is not None:
+                        trace.count('template_answers')
+                        yield answer
+                        return
+
+                    encoded = encode_result(result.columns, result.rows, result.truncated,
+                                            self.result_token_budget, error=result.error)
+                    # Includes the time the consumer takes between tokens
+                    with trace.stage('response_generation'):
+                        async for token in self.stream_natural_response(question, encoded, sql_query, trace):
+                            yield token
+                except Exception as e:
+                    trace.fail(e)
+                    yield f"I apologize, but I encountered an error: {str(e)}"
+                finally:
+                    if self.router is not None:
+                        self.router.record('llm', time.perf_counter() - start)
+        finally:
+            metrics.finish(trace)
+
+    async def answer_question_async(self, question: str, mode: str = 'auto') -> str:
+        return ''.join([token async for token in self.stream_answer(question, mode)]).strip()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+        self.close()
+
+async def async_main(api_key: str, router: bool = True, mode: str = 'auto'):
+    assistant = AsyncFootballAssistant(api_key, router=router)
+    loop = asyncio.get_running_loop()
+
+    try:
+        while True:
+            question = (await loop.run_in_executor(None, input, "\nYour question: ")).strip()
+
+            if question.lower() == 'quit':
+                break
+
+            print()
+            async for token in assistant.stream_answer(question, mode):
+                print(token, end='', flush=True)
+            print()
+    finally:
+        if assistant.router is not None:
+            print(f"\n{assistant.router.summary()}")
+        await assistant.aclose()
+        close_database()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Turkish Football League AI assistant")
+    parser.add_argument('--stream', action='store_true',
+                        help="Use the asyncio pipeline and print the answer as it is generated")
+    parser.add_argument('--no-router', action='store_true',
+                        help="Send every question to the model, even ones the chatbot can answer")
+    parser.add_argument('--answers', choices=ANSWER_MODES, default='auto',
+                        help="Phrase query results with templates, the model, or whichever fits (default)")
+    parser.add_argument('--metrics', choices=EXPORT_FORMATS,
+                        help="Print stage timings and counters in this format on exit")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     # Get API key from environment variable
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
@@ -144,7 +364,13 @@ def main():
     print("Ask me anything about Turkish football statistics.")
     print("Type 'quit' to exit.")
 
-    assistant = FootballAssistant(api_key)
+    if args.stream:
+        asyncio.run(async_main(api_key, router=not args.no_router, mode=args.answers))
+        if args.metrics:
+            print("\n" + metrics.export(args.metrics))
+        return
+
+    assistant = FootballAssistant(api_key, router=not args.no_router)
 
     try:
         while True:
@@ -153,10 +379,15 @@ def main():
             if question.lower() == 'quit':
                 break
             
-            response = assistant.answer_question(question)
+            response = assistant.answer_question(question, args.answers)
             print(f"\n{response}")
     finally:
+        if assistant.router is not None:
+            print(f"\n{assistant.router.summary()}")
         assistant.close()
+        close_database()
+        if args.metrics:
+            print("\n" + metrics.export(args.metrics))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,139 +1,228 @@
-import psycopg2
-from langchain_community.llms import LlamaCpp
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain.prompts import PromptTemplate
-import json
-from typing import List, Dict, Any
-
-class FootballDatabaseManager:
-    def __init__(self):
-        self.conn = psycopg2.connect(
-            dbname='turkish_football', 
-            user='postgres',
-            password='postgres',
-            host='localhost'
-        )
-        self.cur = self.conn.cursor()
+import argparse
+from typing import List, Dict, Any, Optional
+from football_chatbot import FootballChatbot
+from football_db import FootballDatabaseManager, close_database
+from metrics import EXPORT_FORMATS, count, fail, metrics, note, stage
+from question_router import QuestionRouter
+from result_renderer import ANSWER_MODES, encode_result, render_answer
+from column_index import ColumnIndex
+from llama_daemon import DEFAULT_MODEL, DEFAULT_SOCKET, LlamaDaemonClient
+from sql_grammar import SQL_STOP, build_select_grammar, check_read_only, extract_sql
 
-    def execute_query(self, query: str, params: tuple = None) ->List[tuple]:
-        try:
-            if params:
-                self.cur.execute(query, params)
-            else:
-                self.cur.execute(query)
-            return self.cur.fetchall()
-        except Exception as e:
-            print(f"Database error: {e}")
-            return []
-
-    def get_column_names(self) -> List[str]:
-        query = """
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'team_statistics'
-        ORDER BY ordinal_position;
-        """
-        return [col[0] for col in self.execute_query(query)]
+# Identical for every question; evaluated once and reused (see warm_up_prefix)
+SQL_PROMPT_PREFIX = """You are a SQL expert. Generate a PostgreSQL query for the question below.
+The database has these tables:
+- leagues (id, name, country)
+- seasons (id, year, start_year, league_id)  -- year looks like '24/25', start_year is 2024; sort by start_year
+- teams (id, name)
+- team_statistics (season_id, team_id, start_year and per-season statistics columns, linked to seasons and teams)
+- team_season_metrics (season_id, team_id, goal_difference, goals_per_match, conceded_per_match, shots_per_match,
+  shot_conversion, big_chance_conversion, shots_on_target_percentage, clean_sheet_percentage, league_position)
+- team_statistic_ranks (season_id, team_id and the columns of team_statistics and team_season_metrics, each holding
+  the team's rank in that season, 1 = highest)
+Write column names unquoted, e.g. ts.goalsScored.
+Return only the SQL query, nothing else.
+"""
+SQL_TEMPLATE = SQL_PROMPT_PREFIX + """
+Relevant columns in team_statistics:
+{columns}
 
-    def close(self):
-        self.cur.close()
-        self.conn.close()
+Question: {question}
+
+SQL:"""
+RESPONSE_TEMPLATE = """You are a Turkish Football League expert.
+            Answer the following question using the provided data.
+            
+            Question: {question}
+            SQL Query used: {query}
+            Query results: {results}
+            
+            Provide a detailed, natural language response that answers the question
+            and provides relevant insights from the data."""
+# A query never needs more than this; the answer keeps the model's max_tokens
+SQL_MAX_TOKENS = 256
+# Tokens of query results allowed in the response prompt (n_ctx is 2048)
+RESULT_TOKEN_BUDGET = 600
 
 class LocalFootballAssistant:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, constrained: bool = True, router: bool = True,
+                 daemon: Optional[str] = None):
+        # With a daemon socket the model is served by llama_daemon.py and
+        # neither langchain nor llama_cpp is imported here
+        self.daemon = daemon
+        self.llm = LlamaDaemonClient(daemon) if daemon else self.load_model(model_path)
+        
+        self.db = FootballDatabaseManager()
+        # Questions the rule-based chatbot understands skip the model entirely
+        self.router = QuestionRouter(FootballChatbot(db=self.db.db)) if router else None
+        self.available_columns = self.db.get_column_names()
+        # Only the columns relevant to a question go into the SQL prompt
+        self.column_index = ColumnIndex.from_schema(available=self.available_columns)
+        self.last_prompt_tokens = 0
+        # With constrained decoding the model can only emit a read-only
+        # SELECT over the real tables and columns, ending at its ";"
+        self.sql_grammar = self.load_sql_grammar() if constrained else None
+        
+        # Template for SQL generation. The fixed prefix comes first so its
+        # evaluated state can be reused for every question.
+        self.sql_template = SQL_TEMPLATE
+        
+        # Template for natural language response
+        self.response_template = RESPONSE_TEMPLATE
+        self.warm_up_prefix()
+
+    @staticmethod
+    def load_model(model_path: str):
         # Initialize Llama model with streaming output
+        from langchain_community.llms import LlamaCpp
+        from langchain.callbacks.manager import CallbackManager
+        from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
         callback_manager = CallbackManager([StreamingStdOutCallbackHandler()])
         
-        self.llm = LlamaCpp(
+        return LlamaCpp(
             model_path=model_path,
             temperature=0.1,
             max_tokens=2000,
             n_ctx=2048,
+            use_mmap=True,
             callback_manager=callback_manager,
             verbose=False
         )
-        
-        self.db = FootballDatabaseManager()
-        self.available_columns = self.db.get_column_names()
-        
-        # Template for SQL generation
-        self.sql_template = PromptTemplate(
-            input_variables=["question"],
-            template="""You are a SQL expert. Generate a SQL query for the following question.
-            The database has these tables:
-            - seasons (id, year)
-            - teams (id, name)
-            - team_statistics (various statistics, linked to teams and seasons)
-            
-            Available columns in team_statistics:
-            {columns}
-            
-            Question: {question}
-            
-            Return only the SQL query, nothing else.""".format(
-                columns=", ".join(self.available_columns),
-                question="{question}"
-            )
-        )
-        
-        # Template for natural language response
-        self.response_template = PromptTemplate(
-            input_variables=["question", "query", "results"],
-            template="""You are a Turkish Football League expert.
-            Answer the following question using the provided data.
-            
-            Question: {question}
-            SQL Query used: {query}
-            Query results: {results}
-            
-            Provide a detailed, natural language response that answers the question
-            and provides relevant insights from the data."""
-        )
+
+    def warm_up_prefix(self):
+        """Keep evaluated prompt states in RAM and evaluate the fixed SQL
+        prefix once, so later prompts only evaluate their own tokens"""
+        try:
+            if self.daemon:
+                # The daemon's cache outlives this process
+                self.llm.warm(SQL_PROMPT_PREFIX)
+                return
+            from llama_cpp import LlamaRAMCache
+            self.llm.client.set_cache(LlamaRAMCache())
+            self.llm.client.create_completion(SQL_PROMPT_PREFIX, max_tokens=1)
+        except Exception as e:
+            print(f"Prompt prefix cache unavailable: {e}")
+
+    def load_sql_grammar(self):
+        try:
+            grammar = build_select_grammar(self.column_index.columns)
+            if self.daemon:
+                # Sent as text; the daemon compiles it once
+                return grammar
+            from llama_cpp import LlamaGrammar
+            return LlamaGrammar.from_string(grammar, verbose=False)
+        except Exception as e:
+            print(f"SQL grammar unavailable, using unconstrained decoding: {e}")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        return self.llm.get_num_tokens(text)
+
+    def build_sql_prompt(self, question: str) -> str:
+        columns = self.column_index.select(question)
+        prompt = self.sql_template.format(columns=", ".join(columns), question=question)
+        self.last_prompt_tokens = self.count_tokens(prompt)
+        note('prompt_tokens', self.last_prompt_tokens)
+        print(f"\nSQL prompt: {self.last_prompt_tokens} tokens "
+              f"({len(columns)} of {len(self.column_index.columns)} columns)")
+        return prompt
 
     def generate_sql_query(self, question: str) -> str:
-        prompt = self.sql_template.format(question=question)
-        return self.llm.invoke(prompt).strip()
+        prompt = self.build_sql_prompt(question)
+        params = {'stop': SQL_STOP, 'max_tokens': SQL_MAX_TOKENS}
+        if self.sql_grammar is not None:
+            params['grammar'] = self.sql_grammar
+        output = self.llm.invoke(prompt, **params)
+        note('completion_tokens', self.count_tokens(output))
+        return check_read_only(extract_sql(output))
 
-    def generate_response(self, question: str, query: str, results: List[tuple]) -> str:
+    def generate_response(self, question: str, query: str, results: str) -> str:
         prompt = self.response_template.format(
             question=question,
             query=query,
-            results=json.dumps(results, indent=2)
+            results=results
         )
-        return self.llm.invoke(prompt).strip()
+        prompt_tokens = self.count_tokens(prompt)
+        note('prompt_tokens', prompt_tokens)
+        print(f"\nResponse prompt: {prompt_tokens} tokens")
+        response = self.llm.invoke(prompt).strip()
+        note('completion_tokens', self.count_tokens(response))
+        return response
+
+    def answer_question(self, question: str, mode: str = 'auto') -> str:
+        # Stages: route, sql_generation, query, render, response_generation
+        with metrics.trace('local_assistant', question):
+            if self.router is not None:
+                return self.router.answer(question, lambda question: self.answer_with_llm(question, mode))
+            return self.answer_with_llm(question, mode)
 
-    def answer_question(self, question: str) -> str:
+    def answer_with_llm(self, question: str, mode: str = 'auto') -> str:
         try:
             # Generate SQL query
             print("\nGenerating SQL query...")
-            sql_query = self.generate_sql_query(question)
+            with stage('sql_generation'):
+                sql_query = self.generate_sql_query(question)
             print(f"\nExecuting query: {sql_query}")
             
             # Execute query
-            results = self.db.execute_query(sql_query)
+            with stage('query'):
+                result = self.db.run_guarded_query(sql_query)
+            note('rows', len(result.rows))
+            if result.error is not None:
+                print(f"Database error: {result.error}")
+                fail(result.error)
+
+            # Small, plain results are phrased by a template
+            with stage('render'):
+                answer = render_answer(question, result.columns, result.rows, result.error, mode)
+            if answer is not None:
+                count('template_answers')
+                return answer
             print("\nGenerating response...")
             
             # Generate natural language response
-            response = self.generate_response(question, sql_query, results)
+            with stage('response_generation'):
+                results = encode_result(result.columns, result.rows, result.truncated,
+                                        RESULT_TOKEN_BUDGET, self.count_tokens, result.error)
+                response = self.generate_response(question, sql_query, results)
             return response
             
         except Exception as e:
+            fail(e)
             return f"An error occurred: {str(e)}"
 
     def close(self):
+        if self.daemon:
+            self.llm.close()
         self.db.close()
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Turkish football assistant on a local Llama model")
     # Path to your downloaded Llama model
-    model_path = "models/llama-2-7b-chat.Q4_K_M.gguf"
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="GGUF model file")
+    parser.add_argument('--daemon', nargs='?', const=DEFAULT_SOCKET, metavar='SOCKET',
+                        help="Use the model served by llama_daemon.py instead of loading it "
+                             f"(default socket: {DEFAULT_SOCKET})")
+    parser.add_argument('--no-grammar', action='store_true',
+                        help="Generate SQL without the grammar constraint")
+    parser.add_argument('--no-router', action='store_true',
+                        help="Send every question to the model, even ones the chatbot can answer")
+    parser.add_argument('--answers', choices=ANSWER_MODES, default='auto',
+                        help="Phrase query results with templates, the model, or whichever fits (default)")
+    parser.add_argument('--metrics', choices=EXPORT_FORMATS,
+                        help="Print stage timings and counters in this format on exit")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
     
     print("Welcome to the Local Turkish Football League Assistant!")
     print("Ask me anything about Turkish football statistics.")
     print("Type 'quit' to exit.")
     
     try:
-        assistant = LocalFootballAssistant(model_path)
+        assistant = LocalFootballAssistant(args.model, constrained=not args.no_grammar,
+                                           router=not args.no_router, daemon=args.daemon)
         
         while True:
             question = input("\nYour question: ").strip()
@@ -141,7 +230,7 @@ def main():
             if question.lower() == 'quit':
                 break
             
-            response = assistant.answer_question(question)
+            response = assistant.answer_question(question, args.answers)
             print(f"\nResponse: {response}")
             
     except Exception as e:
@@ -149,7 +238,12 @@ def main():
         print("Please make sure you have downloaded the Llama model and specified the correct path.")
     finally:
         if 'assistant' in locals():
+            if assistant.router is not None:
+                print(f"\n{assistant.router.summary()}")
             assistant.close()
+        close_database()
+        if args.metrics:
+            print("\n" + metrics.export(args.metrics))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
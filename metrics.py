@@ -0,0 +1,228 @@
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Questions slower than this (or failing) go to the slow-query log
+SLOW_QUERY_MS = float(os.getenv('FOOTBALL_SLOW_QUERY_MS', '1000'))
+# Optional JSON-lines file the slow-query log is also appended to
+SLOW_QUERY_LOG = os.getenv('FOOTBALL_SLOW_QUERY_LOG')
+
+QUANTILES = (0.5, 0.95, 0.99)
+EXPORT_FORMATS = ('text', 'json')
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Histogram:
+    """Count, sum and extremes of every observation, with percentiles
+    over the most recent `window` of them"""
+    def __init__(self, window: int = 1000):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+        self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self) -> Dict[str, float]:
+        summary = {'count': self.count, 'mean': self.total / self.count if self.count else 0.0}
+        for fraction in QUANTILES:
+            summary[f"p{int(fraction * 100)}"] = percentile(self.values, fraction)
+        summary['max'] = self.max or 0.0
+        return summary
+
+class Trace:
+    """Stage timings, values (rows, tokens) and events of one question"""
+    def __init__(self, kind: str, question: str):
+        self.kind = kind
+        self.question = question
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self.events: Dict[str, int] = {}
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage; repeated stages add up, and stages may nest"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name: str, value: float):
+        self.values[name] = self.values.get(name, 0) + value
+
+    def count(self, event: str, amount: int = 1):
+        self.events[event] = self.events.get(event, 0) + amount
+
+    def fail(self, error):
+        self.error = str(error).strip()[:300]
+
+_current: contextvars.ContextVar = contextvars.ContextVar('football_trace', default=None)
+
+class Metrics:
+    """In-process metrics registry: histograms (stage durations in
+    milliseconds, rows, tokens), counters, and a log of slow or failed
+    questions. snapshot() / to_json() / to_text() export the current state.
+    """
+    def __init__(self, window: int = 1000, slow_ms: float = SLOW_QUERY_MS, slow_log_size: int = 100,
+                 slow_log_path: Optional[str] = SLOW_QUERY_LOG):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.window)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def start(self, kind: str, question: str) -> Trace:
+        return Trace(kind, question)
+
+    def finish(self, trace: Trace):
+        total_ms = 1000 * (time.perf_counter() - trace.start)
+        kind = trace.kind
+        self.increment(f"{kind}.requests")
+        self.observe(f"{kind}.total_ms", total_ms)
+        for name, seconds in trace.stages.items():
+            self.observe(f"{kind}.{name}_ms", 1000 * seconds)
+        for name, value in trace.values.items():
+            self.observe(f"{kind}.{name}", value)
+        for event, amount in trace.events.items():
+            self.increment(f"{kind}.{event}", amount)
+        if trace.error is not None:
+            self.increment(f"{kind}.errors")
+        if trace.error is not None or total_ms >= self.slow_ms:
+            self.log_slow(trace, total_ms)
+
+    @contextmanager
+    def trace(self, kind: str, question: str):
+        """Trace one question; while it runs, stage() / note() / count()
+        anywhere on the same thread (or task) add to it"""
+        trace = self.start(kind, question)
+        token = _current.set(trace)
+        try:
+            yield trace
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            self.finish(trace)
+
+    def log_slow(self, trace: Trace, total_ms: float):
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'kind': trace.kind,
+            'question': trace.question,
+            'total_ms': round(total_ms, 2),
+            'stages_ms': {name: round(1000 * seconds, 2) for name, seconds in trace.stages.items()},
+            'values': trace.values,
+            'events': trace.events,
+            'error': trace.error,
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+        if self.slow_log_path:
+            try:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"Could not write slow-query log: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.summary() for name, histogram in self.histograms.items()},
+                'slow_queries': list(self.slow_queries),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_text(self) -> str:
+        """Snapshot in the Prometheus text format (histograms as summaries)"""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = _metric_name(name) + '_total'
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        for name, summary in sorted(snapshot['histograms'].items()):
+            metric = _metric_name(name)
+            lines.append(f"# TYPE {metric} summary")
+            for fraction in QUANTILES:
+                lines.append(f'{metric}{{quantile="{fraction:g}"}} {summary[f"p{int(fraction * 100)}"]:g}')
+            lines += [f"{metric}_sum {summary['mean'] * summary['count']:g}",
+                      f"{metric}_count {summary['count']}"]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, format: str = 'text') -> str:
+        return self.to_json() if format == 'json' else self.to_text()
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.slow_queries.clear()
+
+def _metric_name(name: str) -> str:
+    return 'football_' + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+# Process-wide registry used by the chatbot, the assistants and the service
+metrics = Metrics()
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current trace (no-op outside a trace)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+def note(name: str, value: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, value)
+
+def count(event: str, amount: int = 1):
+    trace = _current.get()
+    if trace is not None:
+        trace.count(event, amount)
+
+def fail(error):
+    """Mark the current trace as failed (it then goes to the slow-query log)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.fail(error)
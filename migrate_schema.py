@@ -0,0 +1,140 @@
+import argparse
+import re
+import time
+from football_db import connect, table_columns, using_sqlite
+from sqlite_backend import translate_schema
+
+# Name the pre-partitioning team_statistics table is moved to while its
+# rows are copied into the new one
+OLD_TABLE = 'team_statistics_v1'
+
+def read_schema(path='schema.sql'):
+    with open(path, 'r') as file:
+        return file.read()
+
+def needs_migration(cur):
+    """True when team_statistics exists in the layout before leagues and
+    season start years: a plain (not partitioned) table on Postgres, one
+    without a start_year column on SQLite"""
+    if using_sqlite():
+        columns = table_columns(cur, 'team_statistics')
+        return bool(columns) and 'start_year' not in columns
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('team_statistics')")
+    row = cur.fetchone()
+    return row is not None and row[0] == 'r'
+
+def migrate_postgres(cur, schema_sql):
+    # Move the old table aside, freeing the names its indexes and sequence
+    # use, let schema.sql create the partitioned table (and add the new
+    # seasons columns), then copy the rows across
+    cur.execute(f"ALTER TABLE team_statistics RENAME TO {OLD_TABLE}")
+    cur.execute(f"ALTER SEQUENCE IF EXISTS team_statistics_id_seq RENAME TO {OLD_TABLE}_id_seq")
+    cur.execute("DROP INDEX IF EXISTS idx_team_statistics_season, idx_team_statistics_team")
+    cur.execute(f"ALTER TABLE {OLD_TABLE} DROP CONSTRAINT IF EXISTS team_statistics_pkey")
+    cur.execute(f"ALTER TABLE {OLD_TABLE} DROP CONSTRAINT IF EXISTS team_statistics_season_id_team_id_key")
+    cur.execute(schema_sql)
+
+    new_columns = set(table_columns(cur, 'team_statistics'))
+    columns = [column for column in table_columns(cur, OLD_TABLE) if column in new_columns]
+    cur.execute(
+        f"""
+        INSERT INTO team_statistics (start_year, {', '.join(columns)})
+        SELECT s.start_year, {', '.join(f'old.{column}' for column in columns)}
+        FROM {OLD_TABLE} old
+        JOIN seasons s ON s.id = old.season_id
+        """
+    )
+    copied = cur.rowcount
+    cur.execute(f"SELECT COUNT(*) FROM {OLD_TABLE}")
+    total = cur.fetchone()[0]
+    if copied != total:
+        raise RuntimeError(f"{total - copied} of {total} statistics rows have no season; nothing was migrated")
+    cur.execute(
+        """
+        SELECT setval(pg_get_serial_sequence('team_statistics', 'id'), COALESCE(MAX(id), 0) + 1, false)
+        FROM team_statistics
+        """
+    )
+    cur.execute(f"DROP TABLE {OLD_TABLE}")
+    cur.execute("ANALYZE seasons")
+    cur.execute("ANALYZE team_statistics")
+    return copied
+
+def migrate_sqlite(conn, schema_sql):
+    # SQLite has no partitioning: the new columns are added in place. A
+    # REFERENCES column can only be added with foreign keys off, which
+    # only takes effect outside a transaction.
+    conn.raw.execute("PRAGMA foreign_keys = OFF")
+    try:
+        cur = conn.cursor()
+        conn.raw.execute("BEGIN")
+        if 'league_id' not in table_columns(cur, 'seasons'):
+            cur.execute("ALTER TABLE seasons ADD COLUMN league_id INTEGER NOT NULL DEFAULT 1 REFERENCES leagues(id)")
+        if 'start_year' not in table_columns(cur, 'seasons'):
+            # Stored generated columns cannot be added to an existing table
+            definition = re.search(r"start_year INTEGER GENERATED ALWAYS AS \(.*?\) STORED", schema_sql, re.DOTALL)
+            cur.execute(f"ALTER TABLE seasons ADD COLUMN {definition.group(0)[:-len('STORED')]}VIRTUAL")
+        cur.execute("ALTER TABLE team_statistics ADD COLUMN start_year INTEGER")
+        cur.execute(
+            """
+            UPDATE team_statistics
+            SET start_year = (SELECT start_year FROM seasons WHERE seasons.id = team_statistics.season_id)
+            """
+        )
+        copied = cur.rowcount
+        # The upsert's conflict target; new databases have it as a constraint
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_team_statistics_season_team_year
+            ON team_statistics(season_id, team_id, start_year)
+            """
+        )
+        cur.execute("DROP INDEX IF EXISTS idx_team_statistics_team")
+        # Commits the above first, then adds the leagues table and indexes
+        cur.executescript(translate_schema(schema_sql))
+        cur.execute("ANALYZE")
+        conn.commit()
+        return copied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.raw.execute("PRAGMA foreign_keys = ON")
+
+def migrate_schema(path='schema.sql'):
+    """Convert a database created before leagues, season start years and
+    partitioning to the layout of schema.sql, keeping its data; does
+    nothing when it is already converted (or has no tables yet)"""
+    conn = connect()
+    cur = conn.cursor()
+
+    try:
+        if not needs_migration(cur):
+            print("Schema is up to date.")
+            conn.rollback()
+            return
+        start = time.perf_counter()
+        schema_sql = read_schema(path)
+        if using_sqlite():
+            rows = migrate_sqlite(conn, schema_sql)
+        else:
+            rows = migrate_postgres(cur, schema_sql)
+            conn.commit()
+        print(f"Schema migrated: {rows} statistics rows moved to the new layout "
+              f"in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upgrade an existing database to the current schema.sql "
+                                                 "layout (leagues, season start years, partitioned statistics)")
+    parser.add_argument('--schema', default='schema.sql', help="Schema file (default: schema.sql)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    migrate_schema(args.schema)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned replies; the SQL one is used whenever the prompt asks for a query
+DEFAULT_SQL = """SELECT t.name, s.year, ts.goalsScored, ts.goalsConceded
+FROM team_statistics ts
+JOIN teams t ON ts.team_id = t.id
+JOIN seasons s ON ts.season_id = s.id
+WHERE t.name = 'Galatasaray'
+ORDER BY s.start_year DESC
+LIMIT 1"""
+DEFAULT_ANSWER = ("Galatasaray scored 71 goals and conceded 29 in the 24/25 season, "
+                  "a goal difference of +42.")
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the OpenAI chat-completions endpoint, for tests
+    and benchmarks. Supports plain and streamed (SSE) responses."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = ' '.join(message.get('content', '') for message in request.get('messages', []))
+        content = self.server.sql if 'SQL query' in prompt else self.server.answer
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(content.split())
+        self.server.requests += 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = request.get('model', 'gpt-4')
+        if request.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            words = content.split(' ')
+            for i, word in enumerate(words):
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word},
+                                 'finish_reason': None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            final = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            }
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode('utf-8'))
+            if request.get('stream_options', {}).get('include_usage'):
+                usage = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                    'model': model, 'choices': [],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens},
+                }
+                self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        body = json.dumps({
+            'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_server(host='127.0.0.1', port=0, sql=DEFAULT_SQL, answer=DEFAULT_ANSWER,
+                      latency=0.0, token_delay=0.0):
+    """Start the stub in a background thread; returns (server, base_url).
+    Pass base_url to FootballAssistant / AsyncFootballAssistant."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.sql = sql
+    server.answer = answer
+    server.latency = latency
+    server.token_delay = token_delay
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI chat-completions endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before each reply")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.host, args.port, latency=args.latency,
+                                         token_delay=args.token_delay)
+    print(f"Stub chat-completions endpoint at {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
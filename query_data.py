@@ -1,18 +1,15 @@
-import psycopg2
 from tabulate import tabulate
+from football_db import connect
 
 def fetch_team_stats():
     # Connect to the database
-    conn = psycopg2.connect(
-        dbname='turkish_football',
-        user='postgres',
-        password='postgres',
-        host='localhost'
-    )
+    conn = connect()
     cur = conn.cursor()
     
     try:
         # Execute the query
+        # Derived metrics come precomputed from team_season_metrics; the
+        # change against the previous season is taken with LAG()
         query = """
         SELECT 
             t.name,
@@ -20,14 +17,17 @@ def fetch_team_stats():
             ts.matches,
             ts.goalsScored,
             ts.goalsConceded,
-            (ts.goalsScored - ts.goalsConceded) as goal_difference,
-            ROUND(CAST(ts.goalsScored::float / NULLIF(ts.matches, 0) as numeric), 2) as goals_per_match,
-            ROUND(CAST(ts.goalsConceded::float / NULLIF(ts.matches, 0) as numeric), 2) as conceded_per_match
-        FROM team_statistics ts
-        JOIN teams t ON ts.team_id = t.id
-        JOIN seasons s ON ts.season_id = s.id
+            m.goal_difference,
+            ROUND(CAST(m.goals_per_match as numeric), 2) as goals_per_match,
+            ROUND(CAST(m.conceded_per_match as numeric), 2) as conceded_per_match,
+            m.league_position,
+            m.goal_difference - LAG(m.goal_difference) OVER (ORDER BY s.start_year) as goal_difference_change
+        FROM team_season_metrics m
+        JOIN team_statistics ts ON ts.season_id = m.season_id AND ts.team_id = m.team_id
+        JOIN teams t ON m.team_id = t.id
+        JOIN seasons s ON m.season_id = s.id
         WHERE t.name = 'Galatasaray'
-        ORDER BY s.year DESC
+        ORDER BY s.start_year DESC
         LIMIT 5;
         """
         cur.execute(query)
@@ -38,20 +38,18 @@ def fetch_team_stats():
         # Define headers for better output formatting
         headers = [
             'Team', 'Season', 'Matches', 'Goals For', 'Goals Against',
-            'Goal Difference', 'Goals/Match', 'Conceded/Match'
+            'Goal Difference', 'Goals/Match', 'Conceded/Match', 'Position'
         ]
         
         # Print results in a nice table format
         print("\nGalatasaray Goal Statistics Across Seasons:")
-        print(tabulate(results, headers=headers, tablefmt='grid'))
+        print(tabulate([row[:9] for row in results], headers=headers, tablefmt='grid'))
         
-        # Calculate improvement or decline
+        # Improvement or decline between the seasons shown
         if len(results) > 1:
             print("\nSeason-by-Season Goal Difference Change:")
-            for i in range(len(results)-1):
-                current_season = results[i]
-                previous_season = results[i+1]
-                change = current_season[5] - previous_season[5]  # Index 5 is goal_difference
+            for current_season, previous_season in zip(results, results[1:]):
+                change = current_season[9]  # Index 9 is goal_difference_change
                 print(f"{previous_season[1]} → {current_season[1]}: {'+' if change > 0 else ''}{change}")
         
     except Exception as e:
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from football_chatbot import FootballChatbot
+from metrics import count, metrics, percentile, stage
+
+# Routing paths: answered by the rule-based chatbot, or sent to the LLM
+PATHS = ('rules', 'llm')
+
+class QuestionRouter:
+    """Answers the questions FootballChatbot understands (stats, compare,
+    form, single statistics, league leaders) directly, and hands the rest
+    to an LLM pipeline.
+
+    Only intents parsed with at least `threshold` confidence are answered
+    by rules. The number of questions and their latencies are recorded per
+    path, so stats() shows how much LLM traffic is avoided.
+    """
+    def __init__(self, chatbot: Optional[FootballChatbot] = None, threshold: float = 0.8,
+                 window: int = 1000):
+        self.chatbot = chatbot or FootballChatbot()
+        self.threshold = threshold
+        self.counts = {path: 0 for path in PATHS}
+        self.intents: Dict[str, int] = {}
+        # Questions whose parsing or rule-based answer failed (they go to the LLM)
+        self.errors = 0
+        # Latencies (seconds) of the most recent `window` questions per path
+        self.latencies = {path: deque(maxlen=window) for path in PATHS}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float, intent: Optional[str] = None):
+        with self._lock:
+            self.counts[path] += 1
+            self.latencies[path].append(seconds)
+            if intent is not None:
+                self.intents[intent] = self.intents.get(intent, 0) + 1
+        metrics.increment(f"router.{path}")
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+        metrics.increment("router.errors")
+        count('router_errors')
+
+    def route(self, question: str) -> Optional[str]:
+        """The rule-based answer to question, or None if it needs the LLM"""
+        start = time.perf_counter()
+        with stage('route'):
+            try:
+                intent = self.chatbot.parse_query(question)
+            except Exception:
+                self.record_error()
+                return None
+            if intent is None or intent.confidence < self.threshold:
+                return None
+            answer, error = self.chatbot.answer_intent_with_error(intent)
+        if error is not None:
+            self.record_error()
+            return None
+        self.record('rules', time.perf_counter() - start, intent.name)
+        count('answered_by_rules')
+        return answer
+
+    def answer(self, question: str, fallback: Callable[[str], str]) -> str:
+        """Answer question by rules if possible, otherwise with fallback(question)"""
+        start = time.perf_counter()
+        answer = self.route(question)
+        if answer is not None:
+            return answer
+        try:
+            return fallback(question)
+        finally:
+            self.record('llm', time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.counts.values())
+            result: Dict[str, Any] = {'questions': total, 'intents': dict(self.intents), 'errors': self.errors}
+            for path in PATHS:
+                latencies = list(self.latencies[path])
+                result[path] = {
+                    'count': self.counts[path],
+                    'share': self.counts[path] / total if total else 0.0,
+                    'mean_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                    'p50_ms': 1000 * percentile(latencies, 0.5),
+                    'p95_ms': 1000 * percentile(latencies, 0.95),
+                }
+            return result
+
+    def summary(self) -> str:
+        stats = self.stats()
+        if not stats['questions']:
+            return "No questions answered."
+        return (f"Answered {stats['rules']['count']} of {stats['questions']} questions without the LLM "
+                f"({stats['rules']['share']:.0%}); "
+                f"rules p50 {stats['rules']['p50_ms']:.1f} ms, LLM p50 {stats['llm']['p50_ms']:.0f} ms")
@@ -0,0 +1,175 @@
+import datetime
+import decimal
+import json
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+from column_index import load_column_groups
+from football_chatbot import STATISTICS, format_value
+
+# Answer phrasing: 'auto' uses a template when the result is small and the
+# question is a plain lookup, 'template' and 'llm' force either path
+ANSWER_MODES = ('auto', 'template', 'llm')
+
+NAME_COLUMNS = {'name', 'team', 'team_name'}
+SEASON_COLUMNS = {'year', 'season', 'season_year'}
+
+# Questions asking for analysis rather than numbers
+OPEN_ENDED = re.compile(
+    r'\b(why|explain|analy[sz]e|analysis|insights?|trends?|tell me about|describe|opinion|predict|'
+    r'should|compare|comparison|better|worse|style|strengths?|weakness(es)?|improve)\b'
+)
+# Questions whose natural answer is a short list of teams
+LISTING = re.compile(r'\b(top|list|which|rank|ranking|most|fewest|least|highest|lowest|best|worst|show)\b')
+
+MAX_LIST_ROWS = 10
+MAX_LIST_VALUES = 3
+MAX_ROW_VALUES = 12
+MAX_TABLE_ROWS = 50
+
+# Rough tokens per character of JSON, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+_labels: Dict[str, str] = {}
+
+def column_label(column: str) -> str:
+    """Readable label for a result column; Postgres reports unquoted
+    camelCase names in lowercase, so they are looked up in the schema"""
+    if not _labels:
+        try:
+            groups = load_column_groups()
+        except OSError:
+            groups = {}
+        for columns in groups.values():
+            for name in columns:
+                words = re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])', name)
+                _labels[name.lower()] = ' '.join(words).lower().replace('avg ', 'average ')
+        _labels.update({name.lower(): label for name, (label, _) in STATISTICS.items()})
+    label = _labels.get(column.lower(), column.replace('_', ' '))
+    return label[:1].upper() + label[1:]
+
+def _split(columns: Sequence[str]):
+    names = [i for i, column in enumerate(columns) if column.lower() in NAME_COLUMNS]
+    seasons = [i for i, column in enumerate(columns) if column.lower() in SEASON_COLUMNS]
+    name = names[0] if names else None
+    season = seasons[0] if seasons else None
+    values = [i for i in range(len(columns)) if i not in (name, season)]
+    return name, season, values
+
+def _render_row(columns, row, name, season, values) -> str:
+    if name is not None and season is not None:
+        header = f"{row[name]} in {row[season]} season:"
+    elif name is not None:
+        header = f"{row[name]}:"
+    elif season is not None:
+        header = f"In {row[season]} season:"
+    else:
+        header = None
+    if header is None and len(values) == 1:
+        return f"{column_label(columns[values[0]])}: {format_value(row[values[0]])}"
+    lines = [header] if header else []
+    lines += [f"• {column_label(columns[i])}: {format_value(row[i])}" for i in values]
+    return "\n".join(lines)
+
+def _render_list(columns, rows, name, season, values) -> str:
+    lines = []
+    if len(values) == 1:
+        lines.append(f"{column_label(columns[values[0]])}:")
+    for position, row in enumerate(rows, 1):
+        label = str(row[name])
+        if season is not None:
+            label += f" ({row[season]})"
+        if not values:
+            lines.append(f"{position}. {label}")
+        elif len(values) == 1:
+            lines.append(f"{position}. {label}: {format_value(row[values[0]])}")
+        else:
+            details = ', '.join(f"{column_label(columns[i]).lower()} {format_value(row[i])}" for i in values)
+            lines.append(f"{position}. {label}: {details}")
+    return "\n".join(lines)
+
+def _render_table(columns, rows) -> str:
+    # Imported here: it costs more at startup than the rest of the module
+    from tabulate import tabulate
+    table = tabulate([[format_value(value) if not isinstance(value, str) else value for value in row]
+                      for row in rows[:MAX_TABLE_ROWS]],
+                     headers=[column_label(column) for column in columns])
+    if len(rows) > MAX_TABLE_ROWS:
+        table += f"\n... {len(rows) - MAX_TABLE_ROWS} more rows"
+    return table
+
+def render_result(question: str, columns: Sequence[str], rows: List[tuple],
+                  force: bool = False) -> Optional[str]:
+    """Phrase a query result without the LLM, or return None when the
+    result (or the question) calls for a written answer. With force, a
+    templated answer is always produced."""
+    if not force and OPEN_ENDED.search(question.lower()):
+        return None
+    if not rows:
+        return "No data found for that question."
+    if not columns:
+        return None
+
+    name, season, values = _split(columns)
+    if not values and name is None:
+        values, season = [season], None
+    if len(rows) == 1 and not values:
+        return f"{rows[0][name]}" + (f" ({rows[0][season]})" if season is not None else "")
+    if len(rows) == 1 and (force or len(values) <= MAX_ROW_VALUES):
+        return _render_row(columns, rows[0], name, season, values)
+    if (name is not None and len(rows) <= MAX_LIST_ROWS and len(values) <= MAX_LIST_VALUES
+            and (force or LISTING.search(question.lower()))):
+        return _render_list(columns, rows, name, season, values)
+    if force:
+        return _render_table(columns, rows)
+    return None
+
+def render_answer(question: str, columns: Sequence[str], rows: List[tuple],
+                  error: Optional[Exception], mode: str = 'auto') -> Optional[str]:
+    """Templated answer for an assistant's query result, or None to have
+    the model phrase it. mode is one of ANSWER_MODES."""
+    if mode not in ANSWER_MODES:
+        raise ValueError(f"Unknown answer mode: {mode}")
+    if mode == 'llm' or (error is not None and mode == 'auto'):
+        return None
+    if error is not None:
+        return f"The query failed: {error}"
+    return render_result(question, columns, rows, force=(mode == 'template'))
+
+def _json_value(value):
+    if isinstance(value, decimal.Decimal):
+        return float(round(value, 4))
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+def encode_result(columns: Sequence[str], rows: List[tuple], truncated: bool = False,
+                  max_tokens: int = 1500, count_tokens: Optional[Callable[[str], int]] = None,
+                  error: Optional[Exception] = None) -> str:
+    """Compact JSON of a query result for a response prompt: column names
+    once, then the rows as arrays. Rows are dropped from the end until the
+    text fits max_tokens (estimated from its length unless count_tokens is
+    given); the number left out is reported as "omitted_rows"."""
+    if error is not None:
+        return json.dumps({'error': str(error).strip()[:300]}, ensure_ascii=False)
+    count_tokens = count_tokens or (lambda text: len(text) // CHARS_PER_TOKEN + 1)
+
+    def encode(count):
+        payload = {'columns': list(columns), 'rows': [list(row) for row in rows[:count]]}
+        if count < len(rows) or truncated:
+            payload['omitted_rows'] = len(rows) - count
+            if truncated:
+                payload['more_rows_in_database'] = True
+        return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_json_value)
+
+    text = encode(len(rows))
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Largest number of rows that fits
+    low, high = 0, len(rows)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(encode(middle)) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return encode(low)
@@ -1,20 +1,47 @@
+-- Create the leagues table
+-- League 1 is the Süper Lig, the league of seasons whose source data
+-- names none; import_data.py adds the others as they appear
+CREATE TABLE IF NOT EXISTS leagues (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    country VARCHAR(100)
+);
+INSERT INTO leagues (id, name, country) VALUES (1, 'Süper Lig', 'Turkey') ON CONFLICT (id) DO NOTHING;
+
 -- Create the seasons table
-CREATE TABLE seasons (
+-- source_id is the season id from the source data; (year, source_id)
+-- identifies a season across re-imports. start_year is the sortable
+-- season key: '24/25' -> 2024, '99/00' -> 1999 (two-digit years from 50
+-- on are 19xx), '2024/25' -> 2024
+CREATE TABLE IF NOT EXISTS seasons (
     id SERIAL PRIMARY KEY,
-    year VARCHAR(10) NOT NULL
+    year VARCHAR(10) NOT NULL,
+    source_id VARCHAR(20),
+    league_id INTEGER NOT NULL DEFAULT 1 REFERENCES leagues(id),
+    start_year INTEGER GENERATED ALWAYS AS (
+    CASE WHEN length(year) = 5
+        THEN CAST(substr(year, 1, 2) AS INTEGER)
+             + CASE WHEN CAST(substr(year, 1, 2) AS INTEGER) >= 50 THEN 1900 ELSE 2000 END
+        ELSE CAST(substr(year, 1, 4) AS INTEGER)
+    END
+    ) STORED
 );
 
 -- Create the teams table
-CREATE TABLE teams (
+CREATE TABLE IF NOT EXISTS teams (
     id VARCHAR(20) PRIMARY KEY,
     name VARCHAR(100) NOT NULL
 );
 
 -- Create the team_statistics table
-CREATE TABLE team_statistics (
-    id SERIAL PRIMARY KEY,
+-- Partitioned by decade of start_year (the season's start_year, copied
+-- in by the importer), so queries on recent seasons only touch recent
+-- partitions; the partitions are created further down
+CREATE TABLE IF NOT EXISTS team_statistics (
+    id SERIAL,
     season_id INTEGER REFERENCES seasons(id),
     team_id VARCHAR(20) REFERENCES teams(id),
+    start_year INTEGER NOT NULL,
     
     -- Offensive Statistics
     goalsScored INTEGER,
@@ -143,10 +170,94 @@ CREATE TABLE team_statistics (
     ballRecovery INTEGER,
     freeKicks INTEGER,
     keyPasses INTEGER,
+
+    -- MD5 of the source statistics, used to skip unchanged rows on re-import
+    stats_hash CHAR(32),
     
-    UNIQUE(season_id, team_id)
+    -- Keys of a partitioned table include the partition key
+    PRIMARY KEY (id, start_year),
+    UNIQUE(season_id, team_id, start_year)
+) PARTITION BY RANGE (start_year);
+
+-- Derived per-season metrics, rebuilt by import_data.py after every import
+-- (see derived_metrics.py). There are no points in the data, so
+-- league_position ranks teams by goal difference, then goals scored.
+CREATE TABLE IF NOT EXISTS team_season_metrics (
+    season_id INTEGER REFERENCES seasons(id),
+    team_id VARCHAR(20) REFERENCES teams(id),
+    goal_difference INTEGER,
+    goals_per_match DOUBLE PRECISION,
+    conceded_per_match DOUBLE PRECISION,
+    shots_per_match DOUBLE PRECISION,
+    shot_conversion DOUBLE PRECISION,
+    big_chance_conversion DOUBLE PRECISION,
+    shots_on_target_percentage DOUBLE PRECISION,
+    clean_sheet_percentage DOUBLE PRECISION,
+    league_position INTEGER,
+    PRIMARY KEY (season_id, team_id)
+);
+
+-- team_statistic_ranks, with every team's rank in its season for each
+-- statistic column, is created by derived_metrics.py: its columns follow
+-- those of team_statistics
+
+-- Single-row counter bumped by import_data.py after every import, so
+-- caches and in-memory copies of the data know when to reload
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
 );
+INSERT INTO data_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- Upgrade databases created before incremental imports were supported
+ALTER TABLE seasons ADD COLUMN IF NOT EXISTS source_id VARCHAR(20);
+ALTER TABLE team_statistics ADD COLUMN IF NOT EXISTS stats_hash CHAR(32);
+-- ... and before leagues and season start years; migrate_schema.py
+-- rebuilds their team_statistics as the partitioned table
+ALTER TABLE seasons ADD COLUMN IF NOT EXISTS league_id INTEGER NOT NULL DEFAULT 1 REFERENCES leagues(id);
+ALTER TABLE seasons ADD COLUMN IF NOT EXISTS start_year INTEGER GENERATED ALWAYS AS (
+    CASE WHEN length(year) = 5
+        THEN CAST(substr(year, 1, 2) AS INTEGER)
+             + CASE WHEN CAST(substr(year, 1, 2) AS INTEGER) >= 50 THEN 1900 ELSE 2000 END
+        ELSE CAST(substr(year, 1, 4) AS INTEGER)
+    END
+) STORED;
+
+-- One partition per decade over the years two-digit seasons can name,
+-- and one for anything before or after. There is no DEFAULT partition,
+-- so newest-first scans can read the partitions in order.
+DO $$
+BEGIN
+    CREATE TABLE IF NOT EXISTS team_statistics_before_1950 PARTITION OF team_statistics
+        FOR VALUES FROM (MINVALUE) TO (1950);
+    FOR decade IN 1950..2040 BY 10 LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS team_statistics_%s PARTITION OF team_statistics '
+                       'FOR VALUES FROM (%s) TO (%s)', decade, decade, decade + 10);
+    END LOOP;
+    CREATE TABLE IF NOT EXISTS team_statistics_from_2050 PARTITION OF team_statistics
+        FOR VALUES FROM (2050) TO (MAXVALUE);
+END
+$$;
 
 -- Create indexes for better query performance
-CREATE INDEX idx_team_statistics_season ON team_statistics(season_id);
-CREATE INDEX idx_team_statistics_team ON team_statistics(team_id); 
\ No newline at end of file
+CREATE UNIQUE INDEX IF NOT EXISTS idx_seasons_year_source ON seasons(year, source_id);
+CREATE INDEX IF NOT EXISTS idx_seasons_start_year ON seasons(start_year);
+-- A league's seasons, for the latest season of the league
+CREATE INDEX IF NOT EXISTS idx_seasons_league_year ON seasons(league_id, start_year);
+CREATE INDEX IF NOT EXISTS idx_team_statistics_season ON team_statistics(season_id);
+-- A team's seasons newest first: the chatbot's "latest season for team"
+-- lookups read one index entry, and the season to join comes with it
+CREATE INDEX IF NOT EXISTS idx_team_statistics_team_year ON team_statistics(team_id, start_year DESC) INCLUDE (season_id);
+CREATE INDEX IF NOT EXISTS idx_team_statistics_year ON team_statistics(start_year);
+CREATE INDEX IF NOT EXISTS idx_team_season_metrics_team ON team_season_metrics(team_id);
+-- Trigram index for fuzzy team-name searches (e.g. ILIKE '%...%' in
+-- ad-hoc or generated SQL); skipped if the pg_trgm extension is unavailable
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS idx_teams_name_trgm ON teams USING gin (name gin_trgm_ops);
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm is not available, skipping trigram index on teams.name';
+END
+$$;
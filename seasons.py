@@ -0,0 +1,20 @@
+import re
+
+# League of seasons whose source data names none (see schema.sql)
+DEFAULT_LEAGUE_ID = 1
+DEFAULT_LEAGUE = 'Süper Lig'
+
+# 2024/25, 2024-2025, 24-25, 24/25 ... -> 24/25
+SEASON_PATTERN = re.compile(r'\b(?:19|20)?(\d{2})\s*[/\-–]\s*(?:19|20)?(\d{2})\b')
+
+def normalize_season(text: str) -> str:
+    return SEASON_PATTERN.sub(lambda match: f"{match.group(1)}/{match.group(2)}", text)
+
+def season_start_year(season: str) -> int:
+    """'24/25' -> 2024, '99/00' -> 1999, '2024/25' -> 2024: the integer
+    season key, computed as seasons.start_year is in schema.sql (two-digit
+    years from 50 on are 19xx)"""
+    if len(season) == 5:
+        year = int(season[:2])
+        return year + (1900 if year >= 50 else 2000)
+    return int(season[:4])
@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from derived_metrics import SEASON_METRICS
+
+# Statistics that are already rates or averages, so they are not divided
+# by the number of matches
+RATE_WORDS = ('percentage', 'average', 'avg', 'rating')
+# Not part of a team's playing profile (the JSON statistics carry an id)
+EXCLUDED_COLUMNS = ('id', 'matches', 'awardedmatches', *SEASON_METRICS)
+
+class SimilarityIndex:
+    """k-nearest-neighbour search over team-seasons.
+
+    Every team-season of a StatsEngine becomes one row of a matrix: its
+    statistics per match (rates and averages as they are), z-scored per
+    column so that every statistic counts the same, and multiplied by the
+    square root of its weight, so that weights scale each statistic's
+    squared difference. Missing values sit at the column mean. Queries are
+    one matrix-vector product over all rows.
+
+    columns restricts the vectors to some statistics (all by default).
+    refresh() rebuilds the matrix only when the data version changed.
+    """
+    def __init__(self, engine, columns: Optional[Sequence[str]] = None,
+                 weights: Optional[Dict[str, float]] = None):
+        self.engine = engine
+        self.requested_columns = [column.lower() for column in columns] if columns else None
+        self.weights = {column.lower(): weight for column, weight in (weights or {}).items()}
+        self.version = None
+        self.build()
+
+    def build(self):
+        # Rows are looked up in the data the matrix was built from, even
+        # after the engine has loaded newer data
+        data = self.engine.data
+        keys = self.requested_columns or [key for key in data.columns if key not in EXCLUDED_COLUMNS]
+        for key in keys:
+            if key not in data.columns:
+                raise KeyError(f"Unknown statistic: {key}")
+        matches = data.columns.get('matches')
+        columns = []
+        for key in keys:
+            column = data.columns[key]
+            if matches is not None and not any(word in key for word in RATE_WORDS):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    column = np.where(matches > 0, column / matches, np.nan)
+            columns.append(column)
+        values = np.column_stack(columns) if columns else np.empty((len(data.team_rows), 0))
+
+        # Statistics without any value, or the same for everyone, say nothing
+        present = ~np.all(np.isnan(values), axis=0)
+        values, keys = values[:, present], [key for key, keep in zip(keys, present) if keep]
+        mean = np.nanmean(values, axis=0)
+        spread = np.nanstd(values, axis=0)
+        varying = spread > 0
+        values, keys = values[:, varying], [key for key, keep in zip(keys, varying) if keep]
+        matrix = (values - mean[varying]) / spread[varying]
+        matrix[np.isnan(matrix)] = 0.0
+        matrix *= np.sqrt([self.weights.get(key, 1.0) for key in keys])
+
+        self.columns: List[str] = keys
+        # Single precision halves the memory each query streams through
+        self.matrix = matrix.astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.data = data
+        self.version = data.version
+
+    def refresh(self):
+        """Reload the engine and rebuild the matrix if the data changed"""
+        if self.engine.version() != self.engine.loaded_version:
+            self.engine.refresh()
+        if self.version != self.engine.loaded_version:
+            self.build()
+
+    def nearest(self, row: int, k: int = 5, same_team: bool = False) -> List[Tuple[int, float]]:
+        """The k rows closest to row as (row, distance), closest first;
+        other seasons of the same team only with same_team"""
+        distances = self.norms + self.norms[row] - 2 * (self.matrix @ self.matrix[row])
+        distances[row] = np.inf
+        if not same_team:
+            distances[self.data.team_rows == self.data.team_rows[row]] = np.inf
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(distances, k - 1)[:k]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+        return [(int(candidate), float(np.sqrt(max(distances[candidate], 0.0)))) for candidate in candidates]
+
+    def label(self, row: int) -> Tuple[str, str]:
+        return (self.data.team_names[self.data.team_rows[row]],
+                self.data.years[self.data.season_rows[row]])
+
+    def similar(self, team_id: str, season: Optional[str] = None, k: int = 5,
+                same_team: bool = False) -> List[tuple]:
+        """Rows of (team name, season, distance): the team-season itself
+        (distance 0) followed by its k nearest neighbours; empty if the
+        team has no such season"""
+        row = self.engine.row(team_id, season, self.data)
+        if row is None:
+            return []
+        return [(*self.label(row), 0.0)] + [
+            (*self.label(neighbour), distance) for neighbour, distance in self.nearest(row, k, same_team)
+        ]
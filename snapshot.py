@@ -0,0 +1,161 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List
+import numpy as np
+
+DEFAULT_SNAPSHOT = 'turkish_football.snapshot'
+# File magic, including the format version
+MAGIC = b'FBSNAP01'
+# Magic and header length in bytes, in front of the JSON header
+PREAMBLE = struct.Struct('<8sQ')
+# Every block starts on a 64-byte (cache line) boundary
+ALIGNMENT = 64
+ROW_DTYPE = np.dtype('<i4')
+VALUE_DTYPE = np.dtype('<f8')
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_snapshot(engine, path: str = DEFAULT_SNAPSHOT) -> int:
+    """Write a StatsEngine's data to a snapshot file; returns its size.
+
+    Layout: magic and header length, a JSON header (row count, team and
+    season dictionaries, and the name, dtype and offset of every block),
+    then the blocks, each aligned to 64 bytes. Blocks hold the team and
+    season index and the league id of every row, the rows of each team
+    (newest season first) with each team's start in that list, and one
+    float64 column per statistic (NaN when missing), derived metrics
+    included. The file is
+    written under a temporary name and renamed, so processes that have the
+    old snapshot mapped keep reading a complete file.
+    """
+    data = engine.data
+    team_order = np.concatenate([data.rows_by_team[team] for team in range(len(data.team_ids))]
+                                or [np.empty(0, dtype=ROW_DTYPE)])
+    team_starts = np.cumsum([0] + [len(data.rows_by_team[team]) for team in range(len(data.team_ids))])
+    arrays = {
+        'team_rows': data.team_rows.astype(ROW_DTYPE),
+        'season_rows': data.season_rows.astype(ROW_DTYPE),
+        'league_rows': data.league_rows.astype(ROW_DTYPE),
+        'team_order': team_order.astype(ROW_DTYPE),
+        'team_starts': team_starts.astype(ROW_DTYPE),
+    }
+    columns = {name: column.astype(VALUE_DTYPE) for name, column in data.columns.items()}
+
+    header = {
+        'rows': len(data.team_rows),
+        'source': engine.source,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'teams': {'ids': data.team_ids, 'names': data.team_names},
+        'seasons': data.years,
+        'blocks': {},
+        'columns': {},
+    }
+    blocks = [('blocks', name, array) for name, array in arrays.items()]
+    blocks += [('columns', name, array) for name, array in columns.items()]
+
+    # Offsets depend on the header's length, which depends on the offsets:
+    # lay the blocks out until the header stops growing
+    header_size = 0
+    while True:
+        offset = _aligned(PREAMBLE.size + header_size)
+        for section, name, array in blocks:
+            entry = {'dtype': array.dtype.str, 'offset': offset, 'count': len(array)}
+            if section == 'columns':
+                entry['integer'] = name in data.integer_columns
+            header[section][name] = entry
+            offset = _aligned(offset + array.nbytes)
+        encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(encoded) <= header_size:
+            break
+        # Leave room for offsets gaining digits on the next pass
+        header_size = len(encoded) + 64
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, header_size))
+        file.write(encoded.ljust(header_size, b' '))
+        for section, name, array in blocks:
+            file.seek(header[section][name]['offset'])
+            file.write(array.tobytes())
+        file.truncate(offset)
+    os.replace(temporary, path)
+    return offset
+
+class Snapshot:
+    """A snapshot file, memory-mapped read-only.
+
+    Nothing is parsed besides the JSON header: block() and the columns
+    dict are NumPy arrays over the mapped pages, so opening a snapshot
+    takes milliseconds whatever its size, pages are only read when used,
+    and every process that opens the same file shares them through the
+    page cache instead of holding its own copy. The arrays are read-only.
+    """
+    def __init__(self, path: str = DEFAULT_SNAPSHOT):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < PREAMBLE.size:
+            raise ValueError(f"{path} is not a statistics snapshot")
+        magic, header_size = PREAMBLE.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a statistics snapshot (or has another format version)")
+        self.header = json.loads(self._map[PREAMBLE.size:PREAMBLE.size + header_size])
+
+        self.rows: int = self.header['rows']
+        self.team_ids: List[str] = self.header['teams']['ids']
+        self.team_names: List[str] = self.header['teams']['names']
+        self.years: List[str] = self.header['seasons']
+        self.columns: Dict[str, np.ndarray] = {
+            name: self._array(entry) for name, entry in self.header['columns'].items()
+        }
+        self.integer_columns = {name for name, entry in self.header['columns'].items() if entry['integer']}
+
+    def _array(self, entry) -> np.ndarray:
+        return np.frombuffer(self._map, dtype=np.dtype(entry['dtype']), count=entry['count'],
+                             offset=entry['offset'])
+
+    def block(self, name: str) -> np.ndarray:
+        return self._array(self.header['blocks'][name])
+
+    def rows_by_team(self) -> Dict[int, np.ndarray]:
+        """Rows of each team, newest season first"""
+        order, starts = self.block('team_order'), self.block('team_starts')
+        return {team: order[starts[team]:starts[team + 1]] for team in range(len(self.team_ids))}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Write the statistics as a memory-mappable snapshot file")
+    parser.add_argument('output', nargs='?', default=DEFAULT_SNAPSHOT,
+                        help=f"Snapshot file (default: {DEFAULT_SNAPSHOT})")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--json', metavar='JSON_FILE', default='turkish_football_data.json',
+                        help="Read the JSON data file (default)")
+    source.add_argument('--database', action='store_true', help="Read the database instead")
+    source.add_argument('--info', action='store_true', help="Describe an existing snapshot")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.info:
+        start = time.perf_counter()
+        snapshot = Snapshot(args.output)
+        elapsed = time.perf_counter() - start
+        print(f"{args.output}: {snapshot.rows} team-seasons, {len(snapshot.team_ids)} teams, "
+              f"{len(snapshot.years)} seasons, {len(snapshot.columns)} columns "
+              f"(from {snapshot.header['source']}, {snapshot.header['created']}); opened in {elapsed * 1000:.2f} ms")
+        return
+
+    from stats_engine import StatsEngine
+    start = time.perf_counter()
+    engine = StatsEngine.from_database() if args.database else StatsEngine.from_json(args.json)
+    loaded = time.perf_counter() - start
+    size = write_snapshot(engine, args.output)
+    print(f"Loaded {len(engine)} team-seasons from {engine.source} in {loaded:.2f}s; "
+          f"wrote {args.output} ({size / 1e6:.1f} MB) in {time.perf_counter() - start - loaded:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from seasons import normalize_season
+from team_resolver import normalize_name
+
+# Sentence punctuation, dropped from questions
+SENTENCE_PUNCTUATION = re.compile(r"[?!.,;:]+(?=\s|$)")
+# Runs of other symbols (comparison operators, decimal points, ...), kept
+SYMBOLS = re.compile(r"([^\w\s'’]+)")
+
+def normalize_question(question: str, resolver=None) -> str:
+    """Canonical form of a question, so that rephrasings differing only in
+    casing, whitespace, apostrophes, team aliases or season format share
+    one cache entry. Operators and other symbols are kept: "goals > 50"
+    and "goals < 50" need different SQL."""
+    text = normalize_season(question)
+    text = re.sub(r"(\w)['’]s\b", r"\1", text)
+    text = SENTENCE_PUNCTUATION.sub(' ', text)
+    parts = []
+    for i, part in enumerate(SYMBOLS.split(text)):
+        if i % 2:
+            parts.append(part)
+        else:
+            parts.append(resolver.canonicalize(part) if resolver is not None else normalize_name(part))
+    return ' '.join(part for part in parts if part)
+
+def schema_version(columns: Iterable[str]) -> str:
+    """Cache version key derived from the team_statistics column list"""
+    return hashlib.sha1(','.join(columns).encode('utf-8')).hexdigest()[:16]
+
+class SQLCache:
+    """On-disk (SQLite) cache of normalized question -> validated SQL.
+
+    Entries are tied to a schema version, so a change to the statistics
+    columns discards them. The least recently used entries are evicted
+    beyond max_entries, and entries older than max_age seconds expire.
+    """
+    def __init__(self, path: str = 'sql_cache.sqlite3', version: str = '',
+                 max_entries: int = 5000, max_age: Optional[float] = 30 * 24 * 3600):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    question TEXT NOT NULL,
+                    schema_version TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (question, schema_version)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache(last_used)"
+            )
+            # Entries generated against another schema can never be used again
+            self._conn.execute("DELETE FROM sql_cache WHERE schema_version != ?", (version,))
+
+    def get(self, question: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT sql, created_at FROM sql_cache WHERE question = ? AND schema_version = ?",
+                (question, self.version)
+            ).fetchone()
+            if row and (self.max_age is None or now - row[1] < self.max_age):
+                self._conn.execute(
+                    "UPDATE sql_cache SET last_used = ?, hits = hits + 1 "
+                    "WHERE question = ? AND schema_version = ?",
+                    (now, question, self.version)
+                )
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, question: str, sql: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (question, schema_version, sql, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (question, self.version, sql, now, now)
+            )
+            if self.max_age is not None:
+                self._conn.execute("DELETE FROM sql_cache WHERE created_at < ?", (now - self.max_age,))
+            self._conn.execute(
+                """
+                DELETE FROM sql_cache WHERE rowid IN (
+                    SELECT rowid FROM sql_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+            return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,83 @@
+import re
+from typing import Iterable
+from derived_metrics import SEASON_METRICS
+
+TABLES = ['team_statistics', 'seasons', 'teams', 'leagues', 'team_season_metrics', 'team_statistic_ranks']
+# Columns of seasons / teams / leagues, the keys of team_statistics and the
+# derived metrics (team_statistic_ranks has the statistic and metric columns)
+BASE_COLUMNS = ['id', 'year', 'start_year', 'league_id', 'name', 'country', 'season_id', 'team_id', *SEASON_METRICS]
+ALIASES = ['ts', 's', 't', 'l', 'm', 'r']
+FUNCTIONS = ['SUM', 'AVG', 'MAX', 'MIN', 'COUNT', 'ROUND', 'NULLIF', 'COALESCE']
+
+# Stop sequences for SQL generation: the end of the statement, or the model
+# moving on to prose or a new question
+SQL_STOP = [';', '\n\n', 'Question:', '```']
+
+FORBIDDEN = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|DROP|ALTER|CREATE|TRUNCATE|GRANT|REVOKE|COPY|'
+    r'VACUUM|CALL|DO|SET|RESET|LOCK|INTO|pg_sleep|pg_read_file|dblink)\b',
+    re.IGNORECASE
+)
+
+def _literals(values: Iterable[str]) -> str:
+    # Longest first, so that a prefix never shadows a longer name
+    return ' | '.join(f'"{value}"' for value in sorted(set(values), key=lambda value: (-len(value), value)))
+
+def build_select_grammar(columns: Iterable[str]) -> str:
+    """GBNF grammar (llama.cpp) for a single read-only SELECT over the
+    football tables, restricted to the given statistic columns"""
+    return f"""
+root ::= "SELECT " distinct? select-list sp "FROM " table-ref join* where? group? having? order? limit? ";"
+distinct ::= "DISTINCT "
+select-list ::= "*" | select-item ("," sp select-item)*
+select-item ::= expr (" AS " ident)?
+expr ::= term (sp op sp term)*
+op ::= "+" | "-" | "*" | "/"
+term ::= (call | column-ref | number | string | "(" expr ")") cast?
+call ::= function "(" ("*" | distinct? expr ("," sp expr)*) ")"
+cast ::= "::" ("numeric" | "float" | "integer")
+function ::= {_literals(FUNCTIONS)}
+column-ref ::= (alias ".")? column
+alias ::= {_literals(ALIASES)}
+column ::= {_literals([*BASE_COLUMNS, *columns])}
+table-ref ::= table (" " alias)?
+table ::= {_literals(TABLES)}
+join ::= sp ("LEFT " | "INNER ")? "JOIN " table-ref " ON " column-ref " = " column-ref
+where ::= sp "WHERE " condition (sp ("AND" | "OR") sp condition)*
+condition ::= expr sp comparison sp expr | expr " " ("NOT ")? ("ILIKE" | "LIKE") " " string | expr " IN (" string ("," sp string)* ")" | expr " IS " ("NOT ")? "NULL"
+comparison ::= "=" | "!=" | "<>" | "<=" | ">=" | "<" | ">"
+group ::= sp "GROUP BY " expr ("," sp expr)*
+having ::= sp "HAVING " condition
+order ::= sp "ORDER BY " order-item ("," sp order-item)*
+order-item ::= (expr | ident) direction?
+direction ::= " ASC" | " DESC" | " DESC NULLS LAST"
+limit ::= sp "LIMIT " [1-9] [0-9]?
+ident ::= [a-z_] [a-z_0-9]*
+number ::= [0-9]+ ("." [0-9]+)?
+string ::= "'" [^'\\n]* "'"
+sp ::= " " | "\\n"
+""".strip()
+
+def check_read_only(query: str) -> str:
+    """Return query as a single read-only statement, or raise ValueError"""
+    statement = query.strip().rstrip(';').strip()
+    if not statement:
+        raise ValueError("The model did not produce a SQL query")
+    if ';' in statement:
+        raise ValueError("Only a single SQL statement is allowed")
+    if not re.match(r'(SELECT|WITH)\b', statement, re.IGNORECASE):
+        raise ValueError(f"Only SELECT queries are allowed: {statement[:60]}")
+    # Keywords inside string literals are harmless
+    match = FORBIDDEN.search(re.sub(r"'[^']*'", "''", statement))
+    if match:
+        raise ValueError(f"Statement not allowed in a read-only query: {match.group(1)}")
+    return statement
+
+def extract_sql(text: str) -> str:
+    """Cut a query out of free-form model output (code fences, a leading
+    explanation, trailing prose)"""
+    text = re.sub(r'```(?:sql)?', '', text, flags=re.IGNORECASE)
+    match = re.search(r'\b(SELECT|WITH)\b', text, re.IGNORECASE)
+    if match:
+        text = text[match.start():]
+    return text.split(';')[0].split('\n\n')[0].strip()
@@ -0,0 +1,227 @@
+import decimal
+import functools
+import json
+import re
+import sqlite3
+from collections import namedtuple
+from typing import Any, List, Optional, Sequence
+
+# Column description with the psycopg2 attribute names (cur.description[i].name)
+Column = namedtuple('Column', 'name type_code display_size internal_size precision scale null_ok')
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# x = ANY(%s) / x = ANY($1) with a list parameter
+ANY_PARAMETER = re.compile(r"=\s*ANY\s*\(\s*(%s|\$\d+)\s*\)", re.IGNORECASE)
+PARAMETER = re.compile(r"%s|\$(\d+)")
+CAST_TYPES = {
+    'float': 'REAL', 'real': 'REAL', 'double precision': 'REAL', 'numeric': 'REAL', 'decimal': 'REAL',
+    'int': 'INTEGER', 'integer': 'INTEGER', 'bigint': 'INTEGER', 'smallint': 'INTEGER',
+    'text': 'TEXT', 'varchar': 'TEXT',
+}
+CAST = re.compile(r"::\s*(double precision|[a-z]+)", re.IGNORECASE)
+# Operand directly before a "::" cast, when it is not parenthesized
+OPERAND = re.compile(r"[\w.\x00]+$")
+SIMPLE_REPLACEMENTS = [
+    (re.compile(r"\bILIKE\b", re.IGNORECASE), "LIKE"),
+    (re.compile(r"\bIS\s+NOT\s+DISTINCT\s+FROM\b", re.IGNORECASE), "IS"),
+    (re.compile(r"\bIS\s+DISTINCT\s+FROM\b", re.IGNORECASE), "IS NOT"),
+    (re.compile(r"\bnow\(\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+]
+
+def _mask_strings(query: str):
+    # Replace string literals with numbered markers so rewrites never touch them
+    literals = []
+    def mask(match):
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+    return STRING_LITERAL.sub(mask, query), literals
+
+def _unmask_strings(query: str, literals: List[str]) -> str:
+    return re.sub(r"\x00(\d+)\x00", lambda match: literals[int(match.group(1))], query)
+
+def _rewrite_casts(query: str) -> str:
+    # expr::type -> CAST(expr AS TYPE)
+    while True:
+        match = CAST.search(query)
+        if match is None:
+            return query
+        end = match.start()
+        if end and query[end - 1] == ')':
+            depth, start = 0, end - 1
+            while start >= 0:
+                depth += {')': 1, '(': -1}.get(query[start], 0)
+                if depth == 0:
+                    break
+                start -= 1
+            # Keep a function name in front of the parentheses with its call
+            operand = OPERAND.search(query, 0, start)
+            if operand is not None and operand.end() == start:
+                start = operand.start()
+        else:
+            operand = OPERAND.search(query, 0, end)
+            start = operand.start() if operand is not None else end
+        sqlite_type = CAST_TYPES.get(match.group(1).lower(), match.group(1).upper())
+        query = f"{query[:start]}CAST({query[start:end]} AS {sqlite_type}){query[match.end():]}"
+
+@functools.lru_cache(maxsize=1024)
+def translate(query: str, has_params: bool = True) -> str:
+    """PostgreSQL query -> SQLite: %s and $n placeholders, ANY(list),
+    ::casts, ILIKE, IS [NOT] DISTINCT FROM and now()"""
+    if has_params:
+        # psycopg2 unescapes %% everywhere, string literals included
+        query = query.replace('%%', '\x01')
+    query, literals = _mask_strings(query)
+    query = ANY_PARAMETER.sub(r"IN (SELECT value FROM json_each(\1))", query)
+    query = PARAMETER.sub(lambda match: f"?{match.group(1)}" if match.group(1) else "?", query)
+    query = _rewrite_casts(query)
+    for pattern, replacement in SIMPLE_REPLACEMENTS:
+        query = pattern.sub(replacement, query)
+    return _unmask_strings(query, literals).replace('\x01', '%')
+
+def translate_schema(schema_sql: str) -> str:
+    """schema.sql for SQLite: SERIAL and DECIMAL columns mapped, the
+    pg_trgm and partition blocks, extensions and ALTER ... IF NOT EXISTS
+    upgrades left out. team_statistics is a plain table keyed by id:
+    SQLite has no partitioning (nor INCLUDE columns in indexes)."""
+    schema_sql = re.sub(r"DO \$\$.*?\$\$;", "", schema_sql, flags=re.DOTALL)
+    schema_sql = re.sub(r"--[^\n]*", "", schema_sql)
+    statements = []
+    for statement in schema_sql.split(';'):
+        statement = statement.strip()
+        if not statement or re.match(r"(ALTER TABLE .* IF NOT EXISTS|CREATE EXTENSION)", statement,
+                                     re.IGNORECASE | re.DOTALL):
+            continue
+        statement = re.sub(r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY", statement, flags=re.IGNORECASE)
+        if re.search(r"\bSERIAL,", statement, re.IGNORECASE):
+            # id SERIAL with a composite key (id, partition key) -> the rowid
+            statement = re.sub(r"\bSERIAL,", "INTEGER PRIMARY KEY,", statement, flags=re.IGNORECASE)
+            statement = re.sub(r"\s*PRIMARY KEY \(id, \w+\),", "", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\)\s*PARTITION BY \w+ \(\w+\)$", ")", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\s*INCLUDE \([\w, ]+\)", "", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\bDECIMAL\(\d+\s*,\s*\d+\)", "REAL", statement, flags=re.IGNORECASE)
+        statement = re.sub(r"\bnow\(\)", "CURRENT_TIMESTAMP", statement, flags=re.IGNORECASE)
+        statements.append(statement + ';')
+    return '\n'.join(statements)
+
+@functools.lru_cache(maxsize=256)
+def _like_pattern(pattern: str):
+    expression = ''.join('.*' if char == '%' else '.' if char == '_' else re.escape(char) for char in pattern)
+    return re.compile(expression, re.IGNORECASE | re.DOTALL)
+
+def _like(pattern, value):
+    # ILIKE is translated to LIKE; SQLite's own LIKE only folds ASCII
+    # letters, so "ş" would not match "Ş"
+    if pattern is None or value is None:
+        return None
+    return _like_pattern(str(pattern)).fullmatch(str(value)) is not None
+
+def _parameter(value):
+    if isinstance(value, (list, tuple)):
+        return json.dumps([_parameter(item) for item in value])
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+def _parameters(params: Optional[Sequence[Any]]):
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return {key: _parameter(value) for key, value in params.items()}
+    return [_parameter(value) for value in params]
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts PostgreSQL-dialect queries and reports
+    its description the way psycopg2 does (lowercase names, .name)"""
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None):
+        self._cursor.execute(translate(query, params is not None), _parameters(params))
+        return self
+
+    def executemany(self, query: str, rows):
+        self._cursor.executemany(translate(query), (_parameters(row) for row in rows))
+        return self
+
+    def executescript(self, script: str):
+        self._cursor.executescript(script)
+        return self
+
+    @property
+    def description(self):
+        if self._cursor.description is None:
+            return None
+        return [Column(column[0].lower(), None, None, None, None, None, None)
+                for column in self._cursor.description]
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SQLiteConnection:
+    """Embedded database file with the parts of the psycopg2 connection
+    interface this project uses"""
+    def __init__(self, path: str):
+        self.raw = sqlite3.connect(path, check_same_thread=False, cached_statements=512)
+        self.closed = False
+        # Readers are not blocked by a running import
+        self.raw.execute("PRAGMA journal_mode = WAL")
+        self.raw.execute("PRAGMA synchronous = NORMAL")
+        self.raw.execute("PRAGMA foreign_keys = ON")
+        self.raw.execute("PRAGMA busy_timeout = 5000")
+        self.raw.create_function('like', 2, _like, deterministic=True)
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self.raw.cursor())
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def set_isolation_level(self, level):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # Like psycopg2: end the transaction, keep the connection open
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+def connect(path: str) -> SQLiteConnection:
+    return SQLiteConnection(path)
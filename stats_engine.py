@@ -0,0 +1,320 @@
+import json
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set
+import numpy as np
+from derived_metrics import KEY_COLUMNS, RATES
+from seasons import DEFAULT_LEAGUE, DEFAULT_LEAGUE_ID, season_start_year
+from snapshot import DEFAULT_SNAPSHOT, Snapshot
+
+def file_version(path: str):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+class EngineData(NamedTuple):
+    """One load of the data. refresh() replaces it as a whole, so a reader
+    that takes engine.data once never mixes two loads."""
+    version: Any
+    team_ids: List[str]
+    team_names: List[str]
+    years: List[str]
+    columns: Dict[str, np.ndarray]
+    integer_columns: Set[str]
+    team_rows: np.ndarray
+    season_rows: np.ndarray
+    league_rows: np.ndarray                 # league id of each row
+    team_index: Dict[str, int]
+    rows_by_team: Dict[int, np.ndarray]     # rows of each team, newest season first
+    snapshot: Optional[Snapshot] = None
+
+class StatsEngine:
+    """In-memory, column-oriented copy of the team_statistics data.
+
+    Every statistic is held as one NumPy array with a row per team-season,
+    so lookups never leave the process. Load it from the database with
+    from_database() or straight from the JSON dump with from_json(); the
+    latter needs no database server at all. from_snapshot() maps a file
+    written by snapshot.py instead, so nothing is parsed or copied. Call
+    refresh() after an import to reload from the same source.
+    """
+    def __init__(self, loader, source: str, versioner):
+        self._loader = loader
+        self._versioner = versioner
+        self.source = source
+        self.refresh()
+
+    @classmethod
+    def from_json(cls, path: str = 'turkish_football_data.json') -> 'StatsEngine':
+        def load():
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            # League ids as an import into a new database assigns them
+            names = sorted({season.get('league') or DEFAULT_LEAGUE for season in data} - {DEFAULT_LEAGUE})
+            league_ids = {DEFAULT_LEAGUE: DEFAULT_LEAGUE_ID,
+                          **{name: DEFAULT_LEAGUE_ID + 1 + i for i, name in enumerate(names)}}
+            records = []
+            for season in data:
+                league = league_ids[season.get('league') or DEFAULT_LEAGUE]
+                for team in season['teams']:
+                    records.append((team['id'], team['name'], season['year'], league, team['statistics']))
+            return records
+        return cls(load, path, lambda: file_version(path))
+
+    @classmethod
+    def from_snapshot(cls, path: str = DEFAULT_SNAPSHOT) -> 'StatsEngine':
+        return cls(lambda: Snapshot(path), path, lambda: file_version(path))
+
+    @classmethod
+    def from_database(cls, db=None) -> 'StatsEngine':
+        def load():
+            from football_db import get_database
+            with (db or get_database()).cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT t.id AS team_id, t.name AS team_name, s.year AS season_year, s.league_id, ts.*
+                    FROM team_statistics ts
+                    JOIN teams t ON ts.team_id = t.id
+                    JOIN seasons s ON ts.season_id = s.id
+                    """
+                )
+                names = [column.name for column in cur.description]
+                records = []
+                for row in cur.fetchall():
+                    stats = dict(zip(names[4:], row[4:]))
+                    for key in KEY_COLUMNS:
+                        stats.pop(key, None)
+                    records.append((row[0], row[1], row[2], row[3], stats))
+            return records
+
+        def version():
+            from football_db import get_data_version
+            return get_data_version(db)
+        return cls(load, 'database', version)
+
+    def version(self):
+        """Version of the source data: the database's data_version, or the
+        JSON file's modification time and size"""
+        return self._versioner()
+
+    def refresh(self):
+        """Reload all data from the engine's source"""
+        version = self.version()
+        data = self._loader()
+        if isinstance(data, Snapshot):
+            self.data = self._snapshot_data(data, version)
+        else:
+            self.data = self._load_records(data, version)
+
+    @classmethod
+    def _load_records(cls, records, version) -> EngineData:
+        team_ids: List[str] = []
+        team_names: List[str] = []
+        team_index: Dict[str, int] = {}
+        # Newest first by start year, which string order gets wrong across centuries
+        years = sorted({year for _, _, year, _, _ in records}, key=lambda year: (season_start_year(year), year),
+                       reverse=True)
+        season_index = {year: i for i, year in enumerate(years)}
+
+        team_rows = np.empty(len(records), dtype=np.int32)
+        season_rows = np.empty(len(records), dtype=np.int32)
+        league_rows = np.empty(len(records), dtype=np.int32)
+        # Teams are ranked within their league's season
+        league_seasons: Dict[tuple, int] = {}
+        league_season_rows = np.empty(len(records), dtype=np.int32)
+        columns: Dict[str, np.ndarray] = {}
+        integer_columns = set()
+        float_columns = set()
+
+        for row, (team_id, name, year, league, stats) in enumerate(records):
+            if team_id not in team_index:
+                team_index[team_id] = len(team_ids)
+                team_ids.append(team_id)
+                team_names.append(name)
+            else:
+                team_names[team_index[team_id]] = name
+            team_rows[row] = team_index[team_id]
+            season_rows[row] = season_index[year]
+            league_rows[row] = league
+            league_season_rows[row] = league_seasons.setdefault((year, league), len(league_seasons))
+
+            for key, value in stats.items():
+                # Column names are case-insensitive, as in Postgres
+                key = key.lower()
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = np.full(len(records), np.nan)
+                if value is None:
+                    continue
+                column[row] = float(value)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    integer_columns.add(key)
+                else:
+                    float_columns.add(key)
+
+        cls._add_derived_columns(columns, integer_columns, league_season_rows, len(league_seasons))
+
+        # Rows of each team, newest season first
+        order = np.lexsort((season_rows, team_rows))
+        rows_by_team = {team: order[team_rows[order] == team] for team in range(len(team_ids))}
+        return EngineData(version, team_ids, team_names, years, columns, integer_columns - float_columns,
+                          team_rows, season_rows, league_rows, team_index, rows_by_team)
+
+    @staticmethod
+    def _snapshot_data(snapshot: Snapshot, version) -> EngineData:
+        # Columns, derived metrics included, are views of the mapped file.
+        # Snapshots written before leagues hold only the default league.
+        if 'league_rows' in snapshot.header['blocks']:
+            league_rows = snapshot.block('league_rows')
+        else:
+            league_rows = np.full(snapshot.rows, DEFAULT_LEAGUE_ID, dtype=np.int32)
+        return EngineData(version, snapshot.team_ids, snapshot.team_names, snapshot.years, snapshot.columns,
+                          snapshot.integer_columns, snapshot.block('team_rows'), snapshot.block('season_rows'),
+                          league_rows,
+                          {team_id: team for team, team_id in enumerate(snapshot.team_ids)},
+                          snapshot.rows_by_team(), snapshot)
+
+    # The current data's fields, for code that reads one or two of them
+    @property
+    def loaded_version(self):
+        return self.data.version
+
+    @property
+    def team_ids(self) -> List[str]:
+        return self.data.team_ids
+
+    @property
+    def team_names(self) -> List[str]:
+        return self.data.team_names
+
+    @property
+    def years(self) -> List[str]:
+        return self.data.years
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        return self.data.columns
+
+    @property
+    def integer_columns(self) -> Set[str]:
+        return self.data.integer_columns
+
+    @property
+    def team_rows(self) -> np.ndarray:
+        return self.data.team_rows
+
+    @property
+    def season_rows(self) -> np.ndarray:
+        return self.data.season_rows
+
+    @staticmethod
+    def _add_derived_columns(columns, integer_columns, league_season_rows, league_season_count):
+        # The metrics the importer materializes in team_season_metrics
+        goals, conceded = columns.get('goalsscored'), columns.get('goalsconceded')
+        for name, (numerator, denominator, scale) in RATES.items():
+            numerator, denominator = columns.get(numerator.lower()), columns.get(denominator.lower())
+            if numerator is not None and denominator is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    columns[name] = np.where(denominator != 0, scale * numerator / denominator, np.nan)
+        if goals is None or conceded is None:
+            return
+        difference = goals - conceded
+        columns['goal_difference'] = difference
+        integer_columns.add('goal_difference')
+
+        # League position: rank by goal difference, then goals scored, with
+        # ties sharing a position and teams without figures placed last
+        position = np.full(len(difference), np.nan)
+        for league_season in range(league_season_count):
+            rows = np.flatnonzero(league_season_rows == league_season)
+            known = rows[~np.isnan(difference[rows])]
+            order = known[np.lexsort((-goals[known], -difference[known]))]
+            previous, rank = None, 0
+            for i, row in enumerate(order, 1):
+                key = (difference[row], goals[row])
+                if key != previous:
+                    previous, rank = key, i
+                position[row] = rank
+            position[np.setdiff1d(rows, known)] = len(known) + 1
+        columns['league_position'] = position
+        integer_columns.add('league_position')
+
+    def __len__(self):
+        return len(self.data.team_rows)
+
+    @staticmethod
+    def _value(data: EngineData, column: str, row: int):
+        value = data.columns[column][row]
+        if np.isnan(value):
+            return None
+        return int(value) if column in data.integer_columns else float(value)
+
+    def team_index(self, team_id: str) -> Optional[int]:
+        return self.data.team_index.get(team_id)
+
+    def row(self, team_id: str, season: Optional[str] = None, data: Optional[EngineData] = None) -> Optional[int]:
+        """Row of a team's season, its latest season by default, in data
+        (the current data by default)"""
+        data = data or self.data
+        team = data.team_index.get(team_id)
+        if team is None:
+            return None
+        rows = data.rows_by_team[team]
+        if season is not None:
+            if season not in data.years:
+                return None
+            rows = rows[data.season_rows[rows] == data.years.index(season)]
+        return int(rows[0]) if len(rows) else None
+
+    def select(self, columns: Sequence[str], team_ids: Sequence[str],
+               season: Optional[str] = None, limit: Optional[int] = None) -> List[tuple]:
+        """Rows of (team name, season, *columns) for the given teams,
+        newest season first, then by team name"""
+        data = self.data
+        teams = sorted({data.team_index[team_id] for team_id in team_ids if team_id in data.team_index})
+        if not teams:
+            return []
+        rows = np.concatenate([data.rows_by_team[team] for team in teams])
+        if season is not None:
+            if season not in data.years:
+                return []
+            rows = rows[data.season_rows[rows] == data.years.index(season)]
+        names = np.array([data.team_names[team] for team in data.team_rows[rows]], dtype=object)
+        rows = rows[np.lexsort((names, data.season_rows[rows]))]
+        if limit is not None:
+            rows = rows[:limit]
+
+        keys = [column.lower() for column in columns]
+        for key in keys:
+            if key not in data.columns:
+                raise KeyError(f"Unknown statistic: {key}")
+        return [
+            (data.team_names[data.team_rows[row]], data.years[data.season_rows[row]],
+             *(self._value(data, key, row) for key in keys))
+            for row in rows
+        ]
+
+    def top(self, column: str, season: Optional[str] = None, limit: int = 5,
+            ascending: bool = False, league: int = DEFAULT_LEAGUE_ID) -> List[tuple]:
+        """Rows of (team name, season, value) for the teams of a league with
+        the highest (or lowest) value of column in a season, the league's
+        latest by default"""
+        data = self.data
+        key = column.lower()
+        if key not in data.columns:
+            raise KeyError(f"Unknown statistic: {key}")
+        in_league = data.league_rows == league
+        if not in_league.any():
+            return []
+        # Seasons are numbered newest first
+        season_row = data.years.index(season) if season in data.years else None
+        if season is None:
+            season_row = int(data.season_rows[in_league].min())
+            season = data.years[season_row]
+        if season_row is None:
+            return []
+        rows = np.flatnonzero(in_league & (data.season_rows == season_row))
+        values = data.columns[key][rows]
+        rows = rows[~np.isnan(values)]
+        values = data.columns[key][rows]
+        names = np.array([data.team_names[team] for team in data.team_rows[rows]], dtype=object)
+        rows = rows[np.lexsort((names, values if ascending else -values))][:limit]
+        return [(data.team_names[data.team_rows[row]], season, self._value(data, key, row)) for row in rows]
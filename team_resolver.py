@@ -0,0 +1,161 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Turkish letters that do not decompose to their ASCII base under NFKD
+TURKISH_FOLD = str.maketrans({
+    'ı': 'i', 'İ': 'i', 'ş': 's', 'Ş': 's', 'ğ': 'g', 'Ğ': 'g',
+    'ç': 'c', 'Ç': 'c', 'ö': 'o', 'Ö': 'o', 'ü': 'u', 'Ü': 'u',
+})
+
+# Club-type suffixes that users usually leave out ("Başakşehir FK")
+GENERIC_TOKENS = {'fk', 'sk', 'jk', 'as', 'kulubu'}
+
+# Words that trail a team name in a question ("stats for galatasaray in ...")
+FILLER_TOKENS = {'in', 'the', 'this', 'last', 'season', 'for', 'of', 'and', 'vs', 'versus'}
+
+# Well-known nicknames and abbreviations, by normalized team name
+TEAM_ALIASES = {
+    'galatasaray': ['gs', 'cimbom', 'gala'],
+    'fenerbahce': ['fb', 'fener'],
+    'besiktas': ['bjk', 'bjk besiktas'],
+    'trabzonspor': ['ts', 'trabzon'],
+    'basaksehir fk': ['ibfk', 'istanbul basaksehir'],
+    'caykur rizespor': ['rize'],
+    'mke ankaragucu': ['ankara gucu'],
+    'fatih karagumruk': ['fkg'],
+    'mersin idman yurdu': ['miy'],
+}
+
+def normalize_name(text: str) -> str:
+    """Case- and diacritic-insensitive form of a team name or user text"""
+    text = text.translate(TURKISH_FOLD).lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+class TeamResolver:
+    """Maps free-form team names in user text to team ids.
+
+    The index of normalized names and aliases is built once, so every
+    statistics query can then filter on the exact team_id.
+    """
+    def __init__(self, teams: Iterable[Tuple[str, str]]):
+        self.names: Dict[str, str] = {}
+        self.index: Dict[str, str] = {}
+        self._normalized: List[Tuple[str, str]] = []
+
+        for team_id, name in teams:
+            self.names[team_id] = name
+            self._normalized.append((normalize_name(name), team_id))
+
+        # Most specific keys first: full names win over derived aliases
+        ambiguous = set()
+        for key, team_id in self._normalized:
+            self.index[key] = team_id
+        for key, team_id in self._normalized:
+            for alias in self._derived_aliases(key):
+                if alias in self.index and self.index[alias] != team_id:
+                    ambiguous.add(alias)
+                self.index.setdefault(alias, team_id)
+        for alias in ambiguous - {key for key, _ in self._normalized}:
+            del self.index[alias]
+        for key, aliases in TEAM_ALIASES.items():
+            team_id = self.index.get(key)
+            if team_id is not None:
+                for alias in aliases:
+                    self.index.setdefault(alias, team_id)
+
+    @staticmethod
+    def _derived_aliases(key: str) -> List[str]:
+        tokens = key.split()
+        aliases = []
+        stripped = [token for token in tokens if token not in GENERIC_TOKENS]
+        if stripped and stripped != tokens:
+            aliases.append(' '.join(stripped))
+        if len(stripped) > 1:
+            aliases.extend(token for token in stripped if len(token) >= 4)
+        return aliases
+
+    @classmethod
+    def from_database(cls, db=None) -> 'TeamResolver':
+        from football_db import get_database
+        return cls((db or get_database()).fetchall("SELECT id, name FROM teams"))
+
+    @classmethod
+    def from_engine(cls, engine) -> 'TeamResolver':
+        data = engine.data
+        return cls(zip(data.team_ids, data.team_names))
+
+    @staticmethod
+    def _key(text: str) -> str:
+        tokens = normalize_name(text).split()
+        while tokens and tokens[-1] in FILLER_TOKENS:
+            tokens.pop()
+        while tokens and tokens[0] in FILLER_TOKENS:
+            tokens.pop(0)
+        return ' '.join(tokens)
+
+    def resolve(self, text: str, partial: bool = True) -> Optional[str]:
+        """Return the team_id for a team name parsed out of a question, or
+        None if no team matches. The whole text (less filler words at its
+        ends) must be a name or alias; with partial, it may also be part of
+        one name ("fenerbah"), like the old ILIKE '%...%' match."""
+        key = self._key(text)
+        if not key:
+            return None
+        team_id = self.index.get(key)
+        if team_id is None:
+            # "istanbul basaksehir fk": an alias with the club suffix added
+            team_id = self.index.get(' '.join(token for token in key.split() if token not in GENERIC_TOKENS))
+        if team_id is not None or not partial:
+            return team_id
+
+        # Prefer names starting with the text, then the shortest name
+        candidates = [(not name.startswith(key), len(name), team_id)
+                      for name, team_id in self._normalized if key in name]
+        if candidates:
+            return min(candidates)[2]
+        return None
+
+    def _scan(self, text: str):
+        # (team_id, tokens) for each name or alias in the text, longest
+        # first, and (None, [token]) for every other word
+        tokens = normalize_name(text).split()
+        longest = max((len(key.split()) for key in self.index), default=0)
+        i = 0
+        while i < len(tokens):
+            for size in range(min(longest, len(tokens) - i), 0, -1):
+                team_id = self.index.get(' '.join(tokens[i:i + size]))
+                if team_id is not None:
+                    end = i + size
+                    # "istanbul basaksehir fk": the alias already became "basaksehir fk"
+                    if (end < len(tokens) and tokens[end] in GENERIC_TOKENS
+                            and normalize_name(self.names[team_id]).endswith(f" {tokens[end]}")):
+                        end += 1
+                    yield team_id, tokens[i:end]
+                    i = end
+                    break
+            else:
+                yield None, [tokens[i]]
+                i += 1
+
+    def find_in_text(self, text: str) -> Tuple[List[str], List[str]]:
+        """Teams named anywhere in free text (as whole words), in order, and
+        the words left over once their names are taken out"""
+        team_ids, rest = [], []
+        for team_id, tokens in self._scan(text):
+            if team_id is None:
+                rest.extend(tokens)
+            elif team_id not in team_ids:
+                team_ids.append(team_id)
+        return team_ids, rest
+
+    def canonicalize(self, text: str) -> str:
+        """Normalize text and replace every team name or alias in it with
+        the team's normalized full name"""
+        return ' '.join(normalize_name(self.names[team_id]) if team_id is not None else tokens[0]
+                        for team_id, tokens in self._scan(text))
+
+    def name(self, team_id: str) -> Optional[str]:
+        return self.names.get(team_id)
@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+import pytest
+
+# The modules live at the top of the repository
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+# Teams kept from the real data file for the test data set
+SAMPLE_TEAMS = {'Galatasaray', 'Fenerbahçe', 'Beşiktaş', 'Trabzonspor', 'Başakşehir FK', 'Konyaspor'}
+
+def sample_seasons(count=3):
+    """The newest seasons of turkish_football_data.json, with six teams each"""
+    with open(os.path.join(REPO, 'turkish_football_data.json'), encoding='utf-8') as file:
+        seasons = json.load(file)[:count]
+    return [{**season, 'teams': [team for team in season['teams'] if team['name'] in SAMPLE_TEAMS]}
+            for season in seasons]
+
+def write_json(path, seasons):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(seasons, file, ensure_ascii=False)
+    return str(path)
+
+@pytest.fixture
+def data_file(tmp_path):
+    return write_json(tmp_path / 'football_data.json', sample_seasons())
+
+@pytest.fixture
+def sqlite_path(tmp_path, monkeypatch):
+    """Point football_db and the import scripts at an empty SQLite file"""
+    import football_db
+    import import_data
+    path = str(tmp_path / 'football.sqlite3')
+    monkeypatch.setattr(football_db, 'BACKEND', 'sqlite')
+    monkeypatch.setattr(football_db, 'SQLITE_PATH', path)
+    monkeypatch.setattr(import_data, 'SQLITE_PATH', path)
+    # The import scripts read schema.sql from the working directory
+    monkeypatch.chdir(REPO)
+    return path
+
+@pytest.fixture
+def database(sqlite_path, data_file):
+    """SQLite database imported from data_file, as import_data.py --mode bulk does"""
+    import import_data
+    import_data.create_database()
+    import_data.apply_schema()
+    import_data.import_data_bulk(data_file)
+    return sqlite_path
@@ -0,0 +1,73 @@
+import json
+import pytest
+import answer_cache
+import import_data
+from answer_cache import AnswerCache
+from conftest import write_json
+from football_chatbot import FootballChatbot
+from football_db import SQLiteDatabase
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, 'monotonic', clock)
+    return clock
+
+def test_entries_expire(clock):
+    cache = AnswerCache(ttl=10)
+    cache.put('key', 'answer')
+    clock.now += 9
+    assert cache.get('key') == (True, 'answer')
+    clock.now += 2
+    assert cache.get('key') == (False, None)
+    assert cache.stats()['entries'] == 0
+
+def test_least_recently_used_is_evicted(clock):
+    cache = AnswerCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.stats()['evictions'] == 1
+
+def test_new_data_version_empties_the_cache(clock):
+    versions = [1]
+    cache = AnswerCache(version_source=lambda: versions[0], version_check_interval=5)
+    assert not cache.check_version()
+    cache.put('key', 'answer')
+
+    versions[0] = 2
+    # Polled at most every version_check_interval seconds
+    clock.now += 1
+    assert not cache.check_version()
+    assert cache.get('key') == (True, 'answer')
+    clock.now += 5
+    assert cache.check_version()
+    assert cache.get('key') == (False, None)
+    assert cache.stats()['invalidations'] == 1
+
+    clock.now += 5
+    assert not cache.check_version()
+
+def test_import_invalidates_chatbot_answers(database, data_file, tmp_path):
+    chatbot = FootballChatbot(db=SQLiteDatabase(database))
+    chatbot.cache.version_check_interval = 0
+    question = "How many goals did Galatasaray score in 24/25?"
+    assert "71" in chatbot.process_query(question)
+
+    with open(data_file, encoding='utf-8') as file:
+        seasons = json.load(file)
+    galatasaray = next(team for team in seasons[0]['teams'] if team['name'] == 'Galatasaray')
+    galatasaray['statistics']['goalsScored'] = 99
+    import_data.import_data_incremental(write_json(tmp_path / 'changed.json', seasons))
+    assert "99" in chatbot.process_query(question)
+    chatbot.db.close()
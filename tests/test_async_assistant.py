@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from football_db import close_database
+from llm_football_assistant import AsyncFootballAssistant
+from metrics import metrics
+from openai_stub import DEFAULT_ANSWER, DEFAULT_SQL, start_stub_server
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server()
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def traces(monkeypatch):
+    # Traces of the questions answered, as they are finished
+    finished = []
+    finish = metrics.finish
+
+    def record(trace):
+        finished.append(trace)
+        finish(trace)
+    monkeypatch.setattr(metrics, 'finish', record)
+    return finished
+
+@pytest.fixture
+def assistant(database, stub):
+    _, base_url = stub
+    assistant = AsyncFootballAssistant('test-key', sql_cache_path=None, base_url=base_url, router=False)
+    yield assistant
+    asyncio.run(assistant.aclose())
+    close_database()
+
+def test_streamed_answer_and_token_usage(assistant, stub, traces):
+    async def ask():
+        return [token async for token in assistant.stream_answer("How did Galatasaray do last season?", 'llm')]
+
+    tokens = asyncio.run(ask())
+    assert len(tokens) > 1
+    assert ''.join(tokens) == DEFAULT_ANSWER
+    server, _ = stub
+    assert server.requests == 2
+
+    trace, = traces
+    assert trace.error is None
+    assert trace.values['rows'] == 1
+    # Both calls report usage: the SQL call in its response, the streamed
+    # answer in a last chunk
+    assert trace.values['completion_tokens'] == len(DEFAULT_SQL.split()) + len(DEFAULT_ANSWER.split())
+    assert trace.values['prompt_tokens'] > 0
+    assert set(trace.stages) >= {'sql_cache', 'sql_generation', 'query', 'render', 'response_generation'}
+
+def test_answers_concurrently(assistant, stub, traces):
+    async def ask_all():
+        return await asyncio.gather(*(assistant.answer_question_async(f"Question {i} about Galatasaray", 'llm')
+                                      for i in range(4)))
+
+    assert asyncio.run(ask_all()) == [DEFAULT_ANSWER] * 4
+    assert len(traces) == 4
+    assert all(trace.values['completion_tokens'] > 0 for trace in traces)
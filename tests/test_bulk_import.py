@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+import football_db
+import import_data
+from conftest import REPO, sample_seasons, write_json
+from import_data import copy_rows, statistics_columns
+
+def dump(path):
+    """Seasons, teams and statistics of a database, keyed by source ids"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("""
+        SELECT s.year, s.source_id, s.league_id, t.id AS team_id, t.name, ts.*
+        FROM team_statistics ts JOIN seasons s ON s.id = ts.season_id JOIN teams t ON t.id = ts.team_id
+        ORDER BY s.year, t.id""").fetchall()
+    conn.close()
+    return [{key: row[key] for key in row.keys() if key not in ('id', 'season_id')} for row in rows]
+
+def test_columns_are_the_union_in_first_seen_order():
+    rows = [{'goalsScored': 1, 'shots': 2}, {'shots': 3, 'assists': 4}, {'goalsScored': 5}]
+    assert statistics_columns(rows) == ['goalsScored', 'shots', 'assists']
+
+def test_bulk_import_matches_row_by_row(sqlite_path, tmp_path, monkeypatch):
+    # Both read the full data file in the repository
+    import_data.create_database()
+    import_data.apply_schema()
+    import_data.import_data_bulk(os.path.join(REPO, 'turkish_football_data.json'))
+    bulk = dump(sqlite_path)
+
+    path = str(tmp_path / 'rows.sqlite3')
+    monkeypatch.setattr(football_db, 'SQLITE_PATH', path)
+    monkeypatch.setattr(import_data, 'SQLITE_PATH', path)
+    import_data.create_database()
+    import_data.apply_schema()
+    import_data.import_data()
+    assert bulk == dump(path)
+    with open(os.path.join(REPO, 'turkish_football_data.json'), encoding='utf-8') as file:
+        assert len(bulk) == sum(len(season['teams']) for season in json.load(file))
+
+def test_missing_statistics_are_null(sqlite_path, tmp_path):
+    seasons = sample_seasons(2)
+    galatasaray = next(team for team in seasons[0]['teams'] if team['name'] == 'Galatasaray')
+    del galatasaray['statistics']['shots']
+    import_data.create_database()
+    import_data.apply_schema()
+    import_data.import_data_bulk(write_json(tmp_path / 'partial.json', seasons))
+
+    rows = {(row['year'], row['name']): row for row in dump(sqlite_path)}
+    assert len(rows) == sum(len(season['teams']) for season in seasons)
+    assert rows[(seasons[0]['year'], 'Galatasaray')]['shots'] is None
+    assert rows[(seasons[1]['year'], 'Galatasaray')]['shots'] is not None
+    assert rows[(seasons[0]['year'], 'Galatasaray')]['goalsScored'] == galatasaray['statistics']['goalsScored']
+
+def test_second_file_is_appended(database, tmp_path):
+    # Season ids are allocated after the ones already in the database
+    season, = sample_seasons(1)
+    team = season['teams'][0]
+    # A new statistics id, as the source would give a new season's row
+    team['statistics']['id'] = 10 ** 6
+    newer = {**season, 'year': '27/28', 'teams': [team]}
+    import_data.import_data_bulk(write_json(tmp_path / 'newer.json', [newer]))
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM seasons").fetchone() == (4, 4)
+    assert conn.execute("SELECT COUNT(*) FROM team_statistics").fetchone() == (19,)
+    conn.close()
+
+class CopyCursor:
+    """Records what copy_rows sends to PostgreSQL"""
+    def copy_expert(self, query, file):
+        self.query = query
+        self.data = file.read()
+
+def test_postgres_rows_are_sent_as_csv(monkeypatch):
+    monkeypatch.setattr(import_data, 'using_sqlite', lambda: False)
+    cur = CopyCursor()
+    copy_rows(cur, 'teams', ['id', 'name'], [('1', 'Beşiktaş'), ('2', 'A, "B"'), ('3', None)])
+    assert cur.query == "COPY teams (id, name) FROM STDIN WITH (FORMAT csv)"
+    # None is an unquoted empty field, which COPY reads as NULL
+    assert cur.data.splitlines() == ['1,Beşiktaş', '2,"A, ""B"""', '3,']
@@ -0,0 +1,39 @@
+import json
+import pytest
+import football_db
+from import_data import check_consistency
+
+@pytest.fixture
+def expected(data_file):
+    # As import_data_parallel counts the seasons it hands to its workers
+    with open(data_file, encoding='utf-8') as file:
+        return {(season['year'], season['id']): len(season['teams']) for season in json.load(file)}
+
+@pytest.fixture
+def conn(database):
+    conn = football_db.connect()
+    yield conn
+    conn.close()
+
+def test_complete_import_passes(conn, expected):
+    assert check_consistency(conn.cursor(), expected) == []
+
+def test_missing_season(conn, expected):
+    # A season in the source file whose worker never loaded it
+    expected[('25/26', 99999)] = 6
+    assert check_consistency(conn.cursor(), expected) == ["season 25/26 (99999): expected 6 rows, found 0"]
+
+def test_mismatched_row_count(conn, expected):
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM team_statistics WHERE id = (
+            SELECT MIN(ts.id) FROM team_statistics ts JOIN seasons s ON s.id = ts.season_id
+            WHERE s.year = '24/25')""")
+    (key, count), = [(key, count) for key, count in expected.items() if key[0] == '24/25']
+    assert check_consistency(cur, expected) == [f"season 24/25 ({key[1]}): expected {count} rows, found {count - 1}"]
+
+def test_season_not_in_the_source(conn, expected):
+    cur = conn.cursor()
+    del expected[next(iter(expected))]
+    problems = check_consistency(cur, expected)
+    assert len(problems) == 1 and problems[0].endswith("not in the source file")
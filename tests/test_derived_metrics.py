@@ -0,0 +1,53 @@
+import sqlite3
+from derived_metrics import rank_rows
+from stats_engine import StatsEngine
+
+def test_ranks_per_season_with_ties_and_nulls():
+    rows = [
+        (1, 'a', 10, 1.5),
+        (1, 'b', 30, None),
+        (1, 'c', 10, 2.5),
+        (1, 'd', 5, 0.5),
+        (2, 'a', 1, 1.0),
+    ]
+    assert sorted(rank_rows(rows)) == [
+        (1, 'a', 2, 2),
+        (1, 'b', 1, None),
+        (1, 'c', 2, 1),
+        (1, 'd', 4, 3),
+        (2, 'a', 1, 1),
+    ]
+
+def test_ranks_match_sqlite_rank(tmp_path):
+    rows = [(season, f"t{team}", (team * 7) % 5 or None, (team * 3) % 4)
+            for season in (1, 2) for team in range(12)]
+    conn = sqlite3.connect(str(tmp_path / 'ranks.sqlite3'))
+    conn.execute("CREATE TABLE t (season_id, team_id, x, y)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", rows)
+    expected = conn.execute("""
+        SELECT season_id, team_id,
+               CASE WHEN x IS NOT NULL THEN RANK() OVER (PARTITION BY season_id, x IS NULL ORDER BY x DESC) END,
+               CASE WHEN y IS NOT NULL THEN RANK() OVER (PARTITION BY season_id, y IS NULL ORDER BY y DESC) END
+        FROM t""").fetchall()
+    conn.close()
+    assert sorted(rank_rows(rows)) == sorted(expected)
+
+def test_league_positions_match_the_engine(database, data_file):
+    conn = sqlite3.connect(database)
+    rows = conn.execute("""
+        SELECT t.id, s.year, m.league_position, ts.goalsScored - ts.goalsConceded, ts.goalsScored
+        FROM team_season_metrics m
+        JOIN team_statistics ts ON ts.season_id = m.season_id AND ts.team_id = m.team_id
+        JOIN teams t ON t.id = m.team_id
+        JOIN seasons s ON s.id = m.season_id""").fetchall()
+    conn.close()
+
+    engine = StatsEngine.from_json(data_file)
+    for team_id, year, position, _, _ in rows:
+        assert engine.select(['league_position'], [team_id], year)[0][2] == position
+
+    # Ranked by goal difference, then goals scored
+    for year in {row[1] for row in rows}:
+        table = sorted((row for row in rows if row[1] == year), key=lambda row: row[2])
+        assert [row[2] for row in table] == list(range(1, len(table) + 1))
+        assert [(row[3], row[4]) for row in table] == sorted(((row[3], row[4]) for row in table), reverse=True)
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+from football_service import FootballService
+
+class BlockingChatbot:
+    """Answers once release is set, as a chatbot stuck on a slow query would"""
+    cache = None
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def process_query(self, question):
+        self.release.wait(5)
+        return f"Answer to {question}"
+
+class BlockingAssistant:
+    executor = None
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.finished = False
+
+    async def answer_question_async(self, question, mode='auto'):
+        await self.release.wait()
+        self.finished = True
+        return f"Assistant answer to {question}"
+
+def body(question, **options):
+    return json.dumps({'question': question, **options}).encode('utf-8')
+
+async def wait_until(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+async def post(port, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"POST /query HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                 + f"Content-Length: {len(payload)}\r\n\r\n".encode('latin-1') + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(content)
+
+def test_busy_server_answers_503():
+    chatbot = BlockingChatbot()
+    service = FootballService(chatbot, workers=1, max_pending=1, timeout=5)
+
+    async def run():
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        first = asyncio.ensure_future(post(port, body("first")))
+        await wait_until(lambda: service.pending == 1)
+        status, headers, payload = await post(port, body("second"))
+        chatbot.release.set()
+        first_status, _, first_payload = await first
+        server.close()
+        await server.wait_closed()
+        return status, headers, payload, first_status, first_payload
+
+    status, headers, payload, first_status, first_payload = asyncio.run(run())
+    assert status == 503
+    assert headers['Retry-After'] == '1'
+    assert 'busy' in payload['error']
+    assert (first_status, first_payload['answer']) == (200, "Answer to first")
+    assert service.counters['rejected'] == 1
+    service.executor.shutdown()
+
+def test_timed_out_question_keeps_its_slot():
+    chatbot = BlockingChatbot()
+    service = FootballService(chatbot, workers=1, max_pending=1, timeout=0.05)
+
+    async def run():
+        status, payload, _ = await service.query(body("slow"))
+        assert status == 504
+        # The worker thread is still busy, so the slot is too
+        assert service.pending == 1
+        assert (await service.query(body("next")))[0] == 503
+        chatbot.release.set()
+        await wait_until(lambda: service.pending == 0)
+
+    asyncio.run(run())
+    assert service.counters['timeouts'] == 1
+    service.executor.shutdown()
+
+def test_timed_out_assistant_question_keeps_its_slot():
+    service = FootballService(BlockingChatbot(), workers=1, max_pending=1, timeout=0.05)
+
+    async def run():
+        service.assistant = assistant = BlockingAssistant()
+        status, _, _ = await service.query(body("slow", assistant=True))
+        assert status == 504
+        # Not cancelled by the timeout: the answer is still being worked on
+        assert service.pending == 1
+        assert (await service.query(body("next", assistant=True)))[0] == 503
+        assistant.release.set()
+        await wait_until(lambda: service.pending == 0)
+        assert assistant.finished
+
+    asyncio.run(run())
+    service.executor.shutdown()
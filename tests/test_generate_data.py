@@ -0,0 +1,13 @@
+import pytest
+from generate_data import MAX_SEASONS, season_years
+from seasons import season_start_year
+
+def test_season_years_keep_their_order():
+    years = season_years(MAX_SEASONS)
+    assert (years[0], years[-1]) == ('24/25', '50/51')
+    start_years = [season_start_year(year) for year in years]
+    assert start_years == list(range(2024, 2024 - MAX_SEASONS, -1))
+
+def test_seasons_that_would_wrap_are_refused():
+    with pytest.raises(ValueError):
+        season_years(MAX_SEASONS + 1)
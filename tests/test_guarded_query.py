@@ -0,0 +1,40 @@
+import pytest
+from football_db import QueryRejected, SQLiteDatabase
+
+CROSS_JOIN = "SELECT COUNT(*) FROM team_statistics a, team_statistics b, team_statistics c"
+
+@pytest.fixture
+def db(database):
+    db = SQLiteDatabase(database)
+    yield db
+    db.close()
+
+def test_rows_are_capped(db):
+    columns, rows, truncated = db.fetch_guarded("SELECT name FROM teams ORDER BY name", max_rows=5)
+    assert columns == ['name']
+    assert len(rows) == 5 and truncated
+    _, rows, truncated = db.fetch_guarded("SELECT name FROM teams ORDER BY name", max_rows=100)
+    assert len(rows) == 6 and not truncated
+
+def test_expensive_query_is_rejected(db):
+    with pytest.raises(QueryRejected, match="too expensive"):
+        db.fetch_guarded(CROSS_JOIN, max_cost=10)
+    # The same query fits a larger limit, and ordinary lookups fit a small one
+    assert db.fetch_guarded(CROSS_JOIN, max_cost=1e6)[1] == [(18 ** 3,)]
+    assert db.fetch_guarded("SELECT * FROM teams WHERE name = 'Galatasaray'", max_cost=10)[1]
+
+def test_slow_query_times_out(db):
+    slow = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT MAX(i) FROM n"
+    with pytest.raises(Exception, match="statement timeout") as error:
+        db.fetch_guarded(slow, max_cost=1e12, timeout_ms=50)
+    assert not isinstance(error.value, QueryRejected)
+
+@pytest.mark.parametrize('query', [
+    "DELETE FROM teams",
+    "SELECT 1; DROP TABLE teams",
+    "UPDATE teams SET name = 'x'",
+])
+def test_writes_are_refused(db, query):
+    with pytest.raises(ValueError):
+        db.fetch_guarded(query)
+    assert len(db.fetch_guarded("SELECT id FROM teams")[1]) == 6
@@ -0,0 +1,75 @@
+import json
+import sqlite3
+import pytest
+from conftest import sample_seasons, write_json
+import import_data
+from import_data import statistics_hash
+
+def fetch(path, query, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+def data_version(path):
+    return fetch(path, "SELECT version FROM data_version")[0][0]
+
+def statistics(path, team_name, year, *columns):
+    return fetch(path, f"""
+        SELECT {', '.join(f'ts.{column}' for column in columns)}
+        FROM team_statistics ts
+        JOIN teams t ON t.id = ts.team_id
+        JOIN seasons s ON s.id = ts.season_id
+        WHERE t.name = ? AND s.year = ?""", (team_name, year))[0]
+
+@pytest.fixture
+def seasons(data_file):
+    with open(data_file, encoding='utf-8') as file:
+        return json.load(file)
+
+def team(seasons, name, year='24/25'):
+    season = next(season for season in seasons if season['year'] == year)
+    return next(team for team in season['teams'] if team['name'] == name)
+
+def test_hash_ignores_key_order_and_key_columns():
+    stats = {'goalsScored': 71, 'goalsConceded': 29}
+    assert statistics_hash(stats) == statistics_hash({'goalsConceded': 29, 'goalsScored': 71})
+    assert statistics_hash(stats) == statistics_hash({**stats, 'team_id': '3061', 'stats_hash': 'x'})
+    assert statistics_hash(stats) != statistics_hash({**stats, 'goalsScored': 72})
+
+def test_unchanged_file_writes_nothing(database, data_file):
+    version = data_version(database)
+    rows = fetch(database, "SELECT * FROM team_statistics ORDER BY id")
+    import_data.import_data_incremental(data_file)
+    assert data_version(database) == version
+    assert fetch(database, "SELECT * FROM team_statistics ORDER BY id") == rows
+
+def test_changed_rows_are_upserted(database, seasons, tmp_path):
+    version = data_version(database)
+    galatasaray = team(seasons, 'Galatasaray')
+    galatasaray['statistics']['goalsScored'] += 10
+    # A statistic dropped from the source is cleared, not left stale
+    del galatasaray['statistics']['assists']
+    fenerbahce = statistics(database, 'Fenerbahçe', '24/25', 'goalsScored', 'assists', 'stats_hash')
+
+    import_data.import_data_incremental(write_json(tmp_path / 'changed.json', seasons))
+
+    goals, assists = statistics(database, 'Galatasaray', '24/25', 'goalsScored', 'assists')
+    assert (goals, assists) == (galatasaray['statistics']['goalsScored'], None)
+    assert statistics(database, 'Fenerbahçe', '24/25', 'goalsScored', 'assists', 'stats_hash') == fenerbahce
+    assert data_version(database) > version
+    # The season's derived metrics follow the new figures
+    difference = fetch(database, """
+        SELECT m.goal_difference FROM team_season_metrics m
+        JOIN teams t ON t.id = m.team_id JOIN seasons s ON s.id = m.season_id
+        WHERE t.name = 'Galatasaray' AND s.year = '24/25'""")[0][0]
+    assert difference == goals - galatasaray['statistics']['goalsConceded']
+
+def test_new_season_is_inserted(database, seasons, tmp_path):
+    season_count = fetch(database, "SELECT COUNT(*) FROM seasons")[0][0]
+    seasons = sample_seasons(len(seasons) + 1)
+    import_data.import_data_incremental(write_json(tmp_path / 'more.json', seasons))
+    assert fetch(database, "SELECT COUNT(*) FROM seasons")[0][0] == season_count + 1
+    assert statistics(database, 'Galatasaray', '21/22', 'goalsScored') == \
+        (team(seasons, 'Galatasaray', '21/22')['statistics']['goalsScored'],)
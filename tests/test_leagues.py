@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import pytest
+import import_data
+from conftest import REPO, SAMPLE_TEAMS, sample_seasons, write_json
+from football_chatbot import FootballChatbot
+from football_db import SQLiteDatabase
+from stats_engine import StatsEngine
+
+QUESTIONS = [
+    "Which team scored the most goals?",
+    "Which team scored the most goals in 24/25?",
+    "Which team conceded the fewest goals in 23/24?",
+    "top 3 teams by goal difference",
+    "top 10 teams by shots in 24/25",
+]
+
+@pytest.fixture
+def league_data_file(tmp_path):
+    """The sample seasons, plus a second league playing 24/25 with six
+    other clubs (their 21/22 figures)"""
+    with open(os.path.join(REPO, 'turkish_football_data.json'), encoding='utf-8') as file:
+        other = next(season for season in json.load(file) if season['year'] == '21/22')
+    teams = [team for team in other['teams'] if team['name'] not in SAMPLE_TEAMS][:6]
+    second = {'year': '24/25', 'id': other['id'], 'league': '1. Lig', 'teams': teams}
+    return write_json(tmp_path / 'leagues.json', sample_seasons() + [second])
+
+@pytest.fixture
+def league_database(sqlite_path, league_data_file):
+    import_data.create_database()
+    import_data.apply_schema()
+    import_data.import_data_bulk(league_data_file)
+    return sqlite_path
+
+def test_second_league_is_imported(league_database):
+    conn = sqlite3.connect(league_database)
+    rows = conn.execute("""
+        SELECT l.id, l.name, COUNT(*) FROM seasons s JOIN leagues l ON l.id = s.league_id
+        GROUP BY l.id, l.name ORDER BY l.id""").fetchall()
+    conn.close()
+    assert rows == [(1, 'Süper Lig', 3), (2, '1. Lig', 1)]
+
+def test_leaders_rank_the_default_league(league_database, league_data_file):
+    db = SQLiteDatabase(league_database)
+    chatbot = FootballChatbot(db=db, cache=False)
+    engine_chatbot = FootballChatbot(engine=StatsEngine.from_json(league_data_file), cache=False)
+    with open(league_data_file, encoding='utf-8') as file:
+        other_teams = {team['name'] for team in json.load(file)[-1]['teams']}
+    for question in QUESTIONS:
+        answer = chatbot.process_query(question)
+        assert answer == engine_chatbot.process_query(question), question
+        assert "No data" not in answer
+        assert not any(name in answer for name in other_teams), question
+    db.close()
+
+def test_leaders_follow_league_positions(league_database):
+    db = SQLiteDatabase(league_database)
+    chatbot = FootballChatbot(db=db, cache=False)
+    conn = sqlite3.connect(league_database)
+    table = [name for name, in conn.execute("""
+        SELECT t.name FROM team_season_metrics m
+        JOIN teams t ON t.id = m.team_id JOIN seasons s ON s.id = m.season_id
+        WHERE s.year = '24/25' AND s.league_id = 1
+        ORDER BY m.league_position, t.name""")]
+    conn.close()
+    leaders = chatbot.get_stat_leaders('goal_difference', '24/25', limit=len(table))
+    assert [line.split('. ', 1)[1].rsplit(':', 1)[0] for line in leaders.splitlines()[1:]] == table
+    db.close()
@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import sqlite3
+import pytest
+import football_db
+import import_data
+from conftest import REPO
+from football_chatbot import FootballChatbot
+from football_db import SQLiteDatabase, table_columns
+from import_data import statistics_hash
+from migrate_schema import migrate_schema, needs_migration
+from sqlite_backend import translate_schema
+
+QUESTIONS = [
+    "show stats for Galatasaray",
+    "compare Galatasaray vs Fenerbahce in 22/23",
+    "What's the form of Beşiktaş?",
+    "How many goals did Konyaspor score in 23/24?",
+    "Which team scored the most goals?",
+    "top 3 teams by goal difference in 23/24",
+]
+
+def old_schema():
+    """schema.sql as it was before leagues and season start years"""
+    with open(os.path.join(REPO, 'schema.sql')) as file:
+        schema_sql = translate_schema(file.read())
+    schema_sql = re.sub(r"CREATE TABLE IF NOT EXISTS leagues.*?;\s*INSERT INTO leagues.*?;", "",
+                        schema_sql, flags=re.DOTALL)
+    schema_sql = re.sub(r"\s*league_id INTEGER NOT NULL DEFAULT 1 REFERENCES leagues\(id\),", "", schema_sql)
+    schema_sql = re.sub(r",\s*start_year INTEGER GENERATED ALWAYS AS \(.*?\) STORED", "", schema_sql,
+                        flags=re.DOTALL)
+    schema_sql = re.sub(r"\s*start_year INTEGER NOT NULL,", "", schema_sql)
+    schema_sql = schema_sql.replace("UNIQUE(season_id, team_id, start_year)", "UNIQUE(season_id, team_id)")
+    return re.sub(r"CREATE INDEX[^;]*(start_year|league_id)[^;]*;", "", schema_sql)
+
+def create_old_database(path, data_file):
+    with open(data_file, encoding='utf-8') as file:
+        seasons = json.load(file)
+    conn = sqlite3.connect(path)
+    conn.executescript(old_schema())
+    columns = [column for column in (row[1] for row in conn.execute("PRAGMA table_info(team_statistics)"))
+               if column.lower() not in ('id', 'season_id', 'team_id', 'stats_hash')]
+    for season_id, season in enumerate(seasons, 1):
+        conn.execute("INSERT INTO seasons (id, year, source_id) VALUES (?, ?, ?)",
+                     (season_id, season['year'], season['id']))
+        for team in season['teams']:
+            conn.execute("INSERT OR REPLACE INTO teams (id, name) VALUES (?, ?)", (team['id'], team['name']))
+            stats = {key.lower(): value for key, value in team['statistics'].items()}
+            conn.execute(
+                f"INSERT INTO team_statistics (season_id, team_id, stats_hash, {', '.join(columns)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(columns))})",
+                [season_id, team['id'], statistics_hash(team['statistics'])] +
+                [stats.get(column.lower()) for column in columns]
+            )
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def old_database(tmp_path, monkeypatch, sqlite_path, data_file):
+    path = str(tmp_path / 'old.sqlite3')
+    monkeypatch.setattr(football_db, 'SQLITE_PATH', path)
+    monkeypatch.setattr(import_data, 'SQLITE_PATH', path)
+    create_old_database(path, data_file)
+    return path
+
+def test_old_layout_is_detected(old_database):
+    conn = football_db.connect()
+    assert needs_migration(conn.cursor())
+    conn.close()
+
+def test_migration_adds_leagues_and_start_years(old_database):
+    migrate_schema()
+    conn = football_db.connect()
+    cur = conn.cursor()
+    assert not needs_migration(cur)
+    assert 'start_year' in table_columns(cur, 'team_statistics')
+    cur.execute("SELECT DISTINCT league_id FROM seasons")
+    assert cur.fetchall() == [(1,)]
+    cur.execute("""
+        SELECT COUNT(*) FROM team_statistics ts JOIN seasons s ON s.id = ts.season_id
+        WHERE ts.start_year IS NULL OR ts.start_year != s.start_year""")
+    assert cur.fetchone()[0] == 0
+    cur.execute("SELECT name FROM leagues WHERE id = 1")
+    assert cur.fetchone() is not None
+    conn.close()
+    # Converted databases are left alone
+    migrate_schema()
+
+def test_migrated_database_answers_like_a_new_one(database, old_database, data_file):
+    fresh = SQLiteDatabase(database)
+    expected = [FootballChatbot(db=fresh, cache=False).process_query(question) for question in QUESTIONS]
+    fresh.close()
+
+    # As import_data.py --mode incremental upgrades an existing database
+    migrate_schema()
+    import_data.apply_schema()
+    import_data.import_data_incremental(data_file)
+    migrated = SQLiteDatabase(old_database)
+    chatbot = FootballChatbot(db=migrated, cache=False)
+    assert [chatbot.process_query(question) for question in QUESTIONS] == expected
+    migrated.close()
@@ -0,0 +1,73 @@
+import pytest
+from football_chatbot import FootballChatbot
+from football_db import SQLiteDatabase
+from metrics import metrics
+from question_router import QuestionRouter
+
+# Questions the rule-based lookup would answer only in part
+LLM_QUESTIONS = [
+    "show stats for Galatasaray and Fenerbahce",
+    "How many goals did Galatasaray score against Fenerbahce?",
+    "how many goals did galatasaray score in their last 5 games",
+    "what was galatasaray's possession in 23/24 compared to 22/23",
+    "show form of galatasaray over the last three seasons",
+    "Which teams had the most yellow cards over the years?",
+]
+
+RULE_QUESTIONS = [
+    ("show stats for Galatasaray", 'stats'),
+    ("Show me statistics for Fenerbahçe in 23/24", 'stats'),
+    ("compare gs vs fb", 'compare'),
+    ("What's the form of Beşiktaş?", 'form'),
+    ("How many goals did Galatasaray score in 24/25?", 'stat'),
+    ("How many yellow cards did Besiktas get in 23/24?", 'stat'),
+    ("Which team scored the most goals in 23/24?", 'leaders'),
+]
+
+@pytest.fixture
+def router(database):
+    db = SQLiteDatabase(database)
+    yield QuestionRouter(FootballChatbot(db=db, cache=False))
+    db.close()
+
+@pytest.mark.parametrize('question', LLM_QUESTIONS)
+def test_partial_lookups_go_to_the_llm(router, question):
+    intent = router.chatbot.parse_query(question)
+    assert intent is None or intent.confidence < router.threshold
+    assert router.route(question) is None
+
+@pytest.mark.parametrize('question, name', RULE_QUESTIONS)
+def test_lookups_are_answered_by_rules(router, question, name):
+    intent = router.chatbot.parse_query(question)
+    assert intent.name == name
+    assert intent.confidence >= router.threshold
+    answer = router.route(question)
+    assert answer is not None and "No data" not in answer
+
+def test_only_whole_names_get_full_confidence(router):
+    assert router.chatbot.parse_query("show stats for Galatasaray").confidence == 1.0
+    # Part of a name still finds the team, but not with certainty
+    assert router.chatbot.parse_query("show stats for Galata").confidence < router.threshold
+
+def test_counts_per_path(router):
+    router.answer("show stats for Galatasaray", lambda question: "llm")
+    assert router.answer(LLM_QUESTIONS[0], lambda question: "llm") == "llm"
+    stats = router.stats()
+    assert (stats['rules']['count'], stats['llm']['count']) == (1, 1)
+
+def test_failures_are_counted(router, monkeypatch):
+    errors = metrics.counters.get('router.errors', 0)
+
+    def broken(question):
+        raise RuntimeError("parser failed")
+    with monkeypatch.context() as patch:
+        patch.setattr(router.chatbot, 'parse_query', broken)
+        with metrics.trace('test', "show stats for Galatasaray") as trace:
+            assert router.route("show stats for Galatasaray") is None
+    assert trace.events['router_errors'] == 1
+
+    monkeypatch.setattr(router.chatbot, 'answer_intent_with_error',
+                        lambda intent: ("An error occurred", RuntimeError("query failed")))
+    assert router.route("show stats for Galatasaray") is None
+    assert router.stats()['errors'] == 2
+    assert metrics.counters['router.errors'] == errors + 2
@@ -0,0 +1,43 @@
+import decimal
+import json
+from result_renderer import encode_result
+
+COLUMNS = ['name', 'year', 'goalsscored']
+ROWS = [(f"Team {i}", '23/24', 40 + i) for i in range(100)]
+
+def test_small_result_is_kept_whole():
+    payload = json.loads(encode_result(COLUMNS, ROWS[:3]))
+    assert payload == {'columns': COLUMNS, 'rows': [list(row) for row in ROWS[:3]]}
+
+def test_rows_are_dropped_to_fit_the_budget():
+    # One token per character, so the budget is easy to reason about
+    text = encode_result(COLUMNS, ROWS, max_tokens=500, count_tokens=len)
+    payload = json.loads(text)
+    assert len(text) <= 500
+    kept = len(payload['rows'])
+    assert 0 < kept < len(ROWS)
+    assert payload['rows'] == [list(row) for row in ROWS[:kept]]
+    assert payload['omitted_rows'] == len(ROWS) - kept
+
+def test_search_keeps_the_most_rows_that_fit():
+    for budget in (100, 200, 1000, 3000):
+        measured = {}
+
+        def count_tokens(text):
+            measured[len(json.loads(text)['rows'])] = len(text)
+            return len(text)
+
+        text = encode_result(COLUMNS, ROWS, max_tokens=budget, count_tokens=count_tokens)
+        kept = len(json.loads(text)['rows'])
+        assert len(text) <= budget
+        if kept < len(ROWS):
+            assert measured[kept + 1] > budget
+
+def test_truncated_results_say_so():
+    payload = json.loads(encode_result(COLUMNS, ROWS[:2], truncated=True))
+    assert payload['more_rows_in_database'] is True
+    assert payload['omitted_rows'] == 0
+
+def test_decimals_and_errors():
+    assert json.loads(encode_result(['rate'], [(decimal.Decimal('52.12346'),)]))['rows'] == [[52.1235]]
+    assert json.loads(encode_result([], [], error=ValueError("  bad query  "))) == {'error': 'bad query'}
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from conftest import sample_seasons, write_json
+from football_chatbot import FootballChatbot
+from snapshot import Snapshot, write_snapshot
+from stats_engine import StatsEngine
+
+@pytest.fixture
+def league_data_file(tmp_path):
+    # The oldest season belongs to a second league
+    seasons = sample_seasons(4)
+    seasons[-1]['league'] = '1. Lig'
+    return write_json(tmp_path / 'leagues.json', seasons)
+
+@pytest.fixture
+def engines(tmp_path, league_data_file):
+    engine = StatsEngine.from_json(league_data_file)
+    path = str(tmp_path / 'football.snap')
+    write_snapshot(engine, path)
+    return engine, StatsEngine.from_snapshot(path)
+
+def test_snapshot_holds_the_same_data(engines):
+    engine, snapshot_engine = engines
+    data, loaded = engine.data, snapshot_engine.data
+    assert loaded.team_ids == data.team_ids
+    assert loaded.team_names == data.team_names
+    assert loaded.years == data.years
+    assert loaded.integer_columns == data.integer_columns
+    assert set(loaded.columns) == set(data.columns)
+    for column, values in data.columns.items():
+        np.testing.assert_array_equal(loaded.columns[column], values, err_msg=column)
+    for name in ('team_rows', 'season_rows', 'league_rows'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(data, name), err_msg=name)
+
+def test_snapshot_answers_like_the_json_engine(engines):
+    engine, snapshot_engine = engines
+    team_ids = engine.team_ids
+    assert snapshot_engine.select(['goalsScored', 'averageBallPossession', 'league_position'], team_ids) == \
+        engine.select(['goalsScored', 'averageBallPossession', 'league_position'], team_ids)
+    for season in (None, *engine.years):
+        assert snapshot_engine.top('goalsScored', season) == engine.top('goalsScored', season)
+        assert snapshot_engine.top('yellowCards', season, ascending=True) == \
+            engine.top('yellowCards', season, ascending=True)
+
+    questions = ["show stats for Galatasaray", "compare gs vs fb in 23/24", "form of Konyaspor",
+                 "How many goals did Trabzonspor score in 21/22?", "Which team scored the most goals?",
+                 "teams similar to Galatasaray in 23/24"]
+    json_chatbot = FootballChatbot(engine=engine, cache=False)
+    snapshot_chatbot = FootballChatbot(engine=snapshot_engine, cache=False)
+    for question in questions:
+        assert snapshot_chatbot.process_query(question) == json_chatbot.process_query(question), question
+
+def test_arrays_are_read_only(tmp_path, engines):
+    engine, _ = engines
+    path = str(tmp_path / 'football.snap')
+    write_snapshot(engine, path)
+    snapshot = Snapshot(path)
+    assert not snapshot.block('team_rows').flags.writeable
+    assert not snapshot.columns['goalsscored'].flags.writeable
+
+def test_other_files_are_refused(tmp_path, league_data_file):
+    with pytest.raises(ValueError):
+        Snapshot(league_data_file)
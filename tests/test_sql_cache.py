@@ -0,0 +1,28 @@
+import pytest
+from sql_cache import SQLCache, normalize_question
+from team_resolver import TeamResolver
+
+@pytest.fixture
+def resolver():
+    return TeamResolver([('1', 'Galatasaray'), ('2', 'Fenerbahçe'), ('3', 'Beşiktaş')])
+
+def test_rephrasings_share_a_key(resolver):
+    key = normalize_question("Galatasaray's goals in 2023/24?", resolver)
+    assert normalize_question("  GS goals in 23-24 ", resolver) == key
+    assert normalize_question("galatasaray goals in 23/24", resolver) == key
+
+def test_comparison_operators_are_kept(resolver):
+    questions = ["teams with goals > 50", "teams with goals < 50", "teams with goals >= 50",
+                 "teams with goals = 50", "teams with goals 50"]
+    keys = {normalize_question(question, resolver) for question in questions}
+    assert len(keys) == len(questions)
+
+def test_decimal_points_are_kept(resolver):
+    assert normalize_question("rating above 6.5") != normalize_question("rating above 65")
+
+def test_cache_entries_per_key(tmp_path, resolver):
+    cache = SQLCache(str(tmp_path / 'cache.sqlite3'), version='v1')
+    cache.put(normalize_question("teams with goals > 50", resolver), "SELECT 1")
+    assert cache.get(normalize_question("Teams with goals > 50?", resolver)) == "SELECT 1"
+    assert cache.get(normalize_question("teams with goals < 50", resolver)) is None
+    cache.close()
@@ -0,0 +1,40 @@
+import pytest
+from sql_grammar import build_select_grammar, check_read_only, extract_sql
+
+@pytest.mark.parametrize('query', [
+    "SELECT name FROM teams;",
+    "  select name from teams  ",
+    "WITH t AS (SELECT 1) SELECT * FROM t",
+    # Keywords inside string literals are harmless
+    "SELECT name FROM teams WHERE name = 'DROP TABLE teams'",
+])
+def test_read_only_queries_pass(query):
+    assert check_read_only(query) == query.strip().rstrip(';').strip()
+
+@pytest.mark.parametrize('query', [
+    "",
+    ";",
+    "DROP TABLE teams",
+    "SELECT 1; DROP TABLE teams",
+    "UPDATE teams SET name = 'x'",
+    "SELECT * INTO copy FROM teams",
+    "WITH gone AS (DELETE FROM teams RETURNING *) SELECT * FROM gone",
+    "SELECT pg_sleep(10)",
+    "EXPLAIN ANALYZE DELETE FROM teams",
+])
+def test_writes_and_several_statements_are_refused(query):
+    with pytest.raises(ValueError):
+        check_read_only(query)
+
+def test_extract_sql_from_a_code_fence():
+    text = "Here is the query:\n```sql\nSELECT name FROM teams;\n```\nIt lists the teams."
+    assert extract_sql(text) == "SELECT name FROM teams"
+
+def test_extract_sql_stops_at_prose():
+    assert extract_sql("SELECT name\nFROM teams\n\nThis returns every team") == "SELECT name\nFROM teams"
+
+def test_grammar_lists_the_given_columns():
+    grammar = build_select_grammar(['goalsscored', 'goalsscoredinsidebox'])
+    column_rule = next(line for line in grammar.splitlines() if line.startswith('column ::='))
+    # Longest first, so a prefix never shadows a longer name
+    assert column_rule.index('"goalsscoredinsidebox"') < column_rule.index('"goalsscored"')
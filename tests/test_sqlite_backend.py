@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import pytest
+from conftest import REPO
+from football_chatbot import FootballChatbot
+from football_db import SQLiteDatabase
+from sqlite_backend import translate, translate_schema
+from stats_engine import StatsEngine
+
+@pytest.mark.parametrize('query, expected', [
+    ("SELECT name FROM teams WHERE id = %s", "SELECT name FROM teams WHERE id = ?"),
+    ("SELECT name FROM teams WHERE id = $1 OR id = $2", "SELECT name FROM teams WHERE id = ?1 OR id = ?2"),
+    ("SELECT name FROM teams WHERE id = ANY($1)",
+     "SELECT name FROM teams WHERE id IN (SELECT value FROM json_each(?1))"),
+    ("SELECT x::float / NULLIF(y, 0) FROM t", "SELECT CAST(x AS REAL) / NULLIF(y, 0) FROM t"),
+    ("SELECT ROUND(AVG(x)::numeric, 2) FROM t", "SELECT ROUND(CAST(AVG(x) AS REAL), 2) FROM t"),
+    ("SELECT (a + b)::integer FROM t", "SELECT CAST((a + b) AS INTEGER) FROM t"),
+    ("SELECT name FROM teams WHERE name ILIKE %s", "SELECT name FROM teams WHERE name LIKE ?"),
+    ("SELECT id FROM s WHERE source_id IS NOT DISTINCT FROM %s", "SELECT id FROM s WHERE source_id IS ?"),
+    ("UPDATE d SET updated_at = now()", "UPDATE d SET updated_at = CURRENT_TIMESTAMP"),
+])
+def test_translate(query, expected):
+    assert translate(query) == expected
+
+def test_string_literals_are_left_alone():
+    assert translate("SELECT 'a::int ILIKE $1' FROM t WHERE name = %s") == \
+        "SELECT 'a::int ILIKE $1' FROM t WHERE name = ?"
+    # psycopg2 unescapes %% only in queries with parameters
+    assert translate("SELECT '50%%' FROM t WHERE id = %s") == "SELECT '50%' FROM t WHERE id = ?"
+    assert translate("SELECT '50%%' FROM t", has_params=False) == "SELECT '50%%' FROM t"
+
+def test_schema_applies_to_sqlite(tmp_path):
+    with open(os.path.join(REPO, 'schema.sql')) as file:
+        schema_sql = translate_schema(file.read())
+    conn = sqlite3.connect(str(tmp_path / 'schema.sqlite3'))
+    conn.executescript(schema_sql)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'leagues', 'seasons', 'teams', 'team_statistics', 'team_season_metrics', 'data_version'} <= tables
+    conn.execute("INSERT INTO seasons (year) VALUES ('99/00'), ('2023/24')")
+    assert conn.execute("SELECT start_year FROM seasons ORDER BY id").fetchall() == [(1999,), (2023,)]
+    conn.close()
+
+QUESTIONS = [
+    "show stats for Galatasaray",
+    "Show me statistics for Fenerbahçe in 23/24",
+    "compare Galatasaray vs Fenerbahce in 22/23",
+    "What's the form of Beşiktaş?",
+    "How many yellow cards did Besiktas get in 23/24?",
+    "What was Trabzonspor's average possession in 24/25?",
+    "Which team scored the most goals in 23/24?",
+    "Which team conceded the fewest goals?",
+    "top 3 teams by shots on target in 22/23",
+]
+
+def test_answers_match_the_json_engine(database, data_file):
+    db = SQLiteDatabase(database)
+    sqlite_chatbot = FootballChatbot(db=db, cache=False)
+    engine_chatbot = FootballChatbot(engine=StatsEngine.from_json(data_file), cache=False)
+    for question in QUESTIONS:
+        answer = sqlite_chatbot.process_query(question)
+        assert "No data" not in answer and "error" not in answer
+        assert answer == engine_chatbot.process_query(question), question
+    db.close()
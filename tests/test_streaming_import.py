@@ -0,0 +1,36 @@
+import json
+import pytest
+from conftest import write_json
+from import_data import iter_records, iter_seasons
+
+def test_small_chunks_decode_every_season(data_file):
+    with open(data_file, encoding='utf-8') as file:
+        expected = json.load(file)
+    # Seasons span many reads, and Turkish names span read boundaries
+    assert list(iter_seasons(data_file, chunk_size=7)) == expected
+    assert list(iter_seasons(data_file)) == expected
+
+def test_records_flatten_seasons(data_file):
+    records = list(iter_records(data_file))
+    with open(data_file, encoding='utf-8') as file:
+        seasons = json.load(file)
+    assert len(records) == sum(len(season['teams']) for season in seasons)
+    header, team, statistics = records[0]
+    assert header == {'year': seasons[0]['year'], 'id': seasons[0]['id']}
+    assert team == {'id': seasons[0]['teams'][0]['id'], 'name': seasons[0]['teams'][0]['name']}
+    assert statistics == seasons[0]['teams'][0]['statistics']
+
+def test_empty_array(tmp_path):
+    assert list(iter_seasons(write_json(tmp_path / 'empty.json', []))) == []
+
+def test_not_an_array(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_seasons(write_json(tmp_path / 'object.json', {'year': '24/25'})))
+
+def test_truncated_file(tmp_path, data_file):
+    with open(data_file, encoding='utf-8') as file:
+        text = file.read()
+    path = tmp_path / 'truncated.json'
+    path.write_text(text[:len(text) // 2], encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_seasons(str(path), chunk_size=64))
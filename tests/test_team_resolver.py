@@ -0,0 +1,46 @@
+import pytest
+from team_resolver import TeamResolver, normalize_name
+
+@pytest.fixture
+def resolver():
+    return TeamResolver([('1', 'Galatasaray'), ('2', 'Fenerbahçe'), ('3', 'Beşiktaş'),
+                         ('4', 'Başakşehir FK'), ('5', 'Çaykur Rizespor'),
+                         ('6', 'Ankara Demirspor'), ('7', 'Ankara Keçiörengücü')])
+
+def test_turkish_letters_fold_to_ascii():
+    assert normalize_name('İSTANBUL Başakşehir') == 'istanbul basaksehir'
+    assert normalize_name('Çaykur  Rizespor!') == 'caykur rizespor'
+    assert normalize_name('Keçiörengücü') == 'keciorengucu'
+
+@pytest.mark.parametrize('text, team_id', [
+    ('Galatasaray', '1'), ('GALATASARAY', '1'), ('fenerbahce', '2'), ('Besiktas', '3'),
+    ('gs', '1'), ('cimbom', '1'), ('fb', '2'), ('bjk', '3'), ('rize', '5'),
+    # Club suffix left out, or added to an alias
+    ('basaksehir', '4'), ('istanbul basaksehir', '4'), ('istanbul basaksehir fk', '4'),
+    # Filler words at the ends of a parsed span
+    ('the fb', '2'), ('galatasaray in', '1'),
+])
+def test_names_and_aliases(resolver, text, team_id):
+    assert resolver.resolve(text, partial=False) == team_id
+
+def test_part_of_a_name_only_with_partial(resolver):
+    assert resolver.resolve('fenerbah') == '2'
+    assert resolver.resolve('fenerbah', partial=False) is None
+
+def test_shared_derived_alias_is_dropped(resolver):
+    # "ankara" is in two names, so it names neither
+    assert resolver.resolve('ankara', partial=False) is None
+    assert resolver.resolve('demirspor', partial=False) == '6'
+
+def test_extra_words_are_not_a_team(resolver):
+    assert resolver.resolve('galatasaray and fenerbahce', partial=False) is None
+    assert resolver.resolve('gs in 23/24', partial=False) is None
+
+def test_find_in_text_reports_leftover_words(resolver):
+    teams, rest = resolver.find_in_text('How many goals did Galatasaray score against Fenerbahçe?')
+    assert teams == ['1', '2']
+    assert rest == ['how', 'many', 'goals', 'did', 'score', 'against']
+    assert resolver.find_in_text('istanbul basaksehir fk goals') == (['4'], ['goals'])
+
+def test_canonicalize(resolver):
+    assert resolver.canonicalize('Cimbom vs FB goals') == 'galatasaray vs fenerbahce goals'